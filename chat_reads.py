@@ -0,0 +1,105 @@
+"""
+Chat Reads: per-user read watermarks for conversations
+A user has read everything up to conversation_reads.last_read_message_id, so
+unread counts are an index range over messages(conversation_id, id) and
+marking read is a single upsert.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, exists, func, select
+from sqlalchemy.orm import Session
+
+from models import (
+    ConversationParticipantORM, ConversationReadORM, MessageORM, MessageHiddenORM
+)
+
+
+def _insert(db: Session):
+    """INSERT construct with ON CONFLICT support for the active database"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(ConversationReadORM)
+
+
+def _upsert_forward(stmt):
+    """On conflict, move the watermark forward only"""
+    new_value = stmt.excluded.last_read_message_id
+    return stmt.on_conflict_do_update(
+        index_elements=[ConversationReadORM.user_id, ConversationReadORM.conversation_id],
+        set_={
+            "last_read_message_id": case(
+                (new_value > ConversationReadORM.last_read_message_id, new_value),
+                else_=ConversationReadORM.last_read_message_id
+            ),
+            "updated_at": datetime.utcnow()
+        }
+    )
+
+
+def unread_counts(db: Session, user_id: int, conversation_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """Unread messages from others per conversation, for the user's conversations"""
+    query = db.query(
+        MessageORM.conversation_id, func.count(MessageORM.id)
+    ).join(
+        ConversationParticipantORM,
+        and_(
+            ConversationParticipantORM.conversation_id == MessageORM.conversation_id,
+            ConversationParticipantORM.user_id == user_id
+        )
+    ).outerjoin(
+        ConversationReadORM,
+        and_(
+            ConversationReadORM.conversation_id == MessageORM.conversation_id,
+            ConversationReadORM.user_id == user_id
+        )
+    ).filter(
+        MessageORM.id > func.coalesce(ConversationReadORM.last_read_message_id, 0),
+        MessageORM.sender_id != user_id,
+        ~exists().where(
+            MessageHiddenORM.message_id == MessageORM.id,
+            MessageHiddenORM.user_id == user_id
+        )
+    )
+    if conversation_ids is not None:
+        query = query.filter(MessageORM.conversation_id.in_(conversation_ids))
+    return dict(query.group_by(MessageORM.conversation_id).all())
+
+
+def mark_read(db: Session, user_id: int, conversation_id: int, message_id: Optional[int] = None):
+    """
+    Move the user's watermark to message_id (default: the latest message). The
+    watermark lands on the conversation's latest message at or before message_id,
+    so an id from another conversation or from the future cannot mark unsent
+    messages as read. The caller commits.
+    """
+    latest = select(func.coalesce(func.max(MessageORM.id), 0)).where(
+        MessageORM.conversation_id == conversation_id
+    )
+    if message_id is not None:
+        latest = latest.where(MessageORM.id <= message_id)
+    db.execute(_upsert_forward(_insert(db).values(
+        user_id=user_id,
+        conversation_id=conversation_id,
+        last_read_message_id=latest.scalar_subquery(),
+        updated_at=datetime.utcnow()
+    )))
+
+
+def mark_all_read(db: Session, user_id: int):
+    """Move the user's watermark to the latest message in every conversation. The caller commits."""
+    latest = select(
+        ConversationParticipantORM.user_id,
+        ConversationParticipantORM.conversation_id,
+        select(func.coalesce(func.max(MessageORM.id), 0)).where(
+            MessageORM.conversation_id == ConversationParticipantORM.conversation_id
+        ).scalar_subquery(),
+        func.current_timestamp()
+    ).where(
+        ConversationParticipantORM.user_id == user_id
+    )
+    db.execute(_upsert_forward(_insert(db).from_select(
+        ["user_id", "conversation_id", "last_read_message_id", "updated_at"], latest
+    )))
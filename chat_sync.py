@@ -0,0 +1,115 @@
+"""
+Chat Sync: change log behind incremental chat sync
+Every write that a client has to mirror (new message, delete, hide, join,
+leave) appends a row to chat_changes in the same transaction. Clients keep the
+id of the last change they applied and ask for everything after it.
+
+Change ids come from the single chat_sync_clock row rather than the table's
+autoincrement. A writer holds that row's lock until it commits, so ids become
+visible in commit order: once a reader sees change N, every change below N is
+committed. With a plain sequence, a transaction could commit N + 1 before N and
+a client that moved its watermark past N would never see it.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import or_, and_, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import ChatChangeORM, ChatSyncClockORM, ConversationParticipantORM
+
+MESSAGE = "message"
+DELETE = "delete"
+HIDE = "hide"
+JOIN = "join"
+LEAVE = "leave"
+
+CLOCK_ID = 1
+
+
+def _claim_change_id(db: Session) -> int:
+    """
+    Take the next change id. The UPDATE locks the clock row until the caller's
+    transaction ends, which serializes chat writers for that short while.
+    """
+    claimed = db.query(ChatSyncClockORM).filter(ChatSyncClockORM.id == CLOCK_ID).update({
+        ChatSyncClockORM.last_change_id: ChatSyncClockORM.last_change_id + 1
+    }, synchronize_session=False)
+    if not claimed:
+        # First change on this database: start after any existing changes
+        try:
+            with db.begin_nested():
+                db.add(ChatSyncClockORM(
+                    id=CLOCK_ID,
+                    last_change_id=db.query(func.max(ChatChangeORM.id)).scalar() or 0
+                ))
+        except IntegrityError:
+            pass  # Another writer created it first
+        return _claim_change_id(db)
+    return db.query(ChatSyncClockORM.last_change_id).filter(ChatSyncClockORM.id == CLOCK_ID).scalar()
+
+
+def record_change(
+    db: Session,
+    conversation_id: int,
+    kind: str,
+    message_id: Optional[int] = None,
+    user_id: Optional[int] = None
+):
+    """Append a change to the log. The caller commits."""
+    db.add(ChatChangeORM(
+        id=_claim_change_id(db),
+        conversation_id=conversation_id,
+        kind=kind,
+        message_id=message_id,
+        user_id=user_id,
+        created_at=datetime.utcnow()
+    ))
+
+
+def current_watermark(db: Session) -> int:
+    return db.query(func.max(ChatChangeORM.id)).scalar() or 0
+
+
+def purge_changes(db: Session, older_than: datetime) -> int:
+    """
+    Delete changes recorded before older_than, always keeping the newest one so
+    purged ranges stay detectable. The caller commits.
+    """
+    newest = current_watermark(db)
+    return db.query(ChatChangeORM).filter(
+        ChatChangeORM.created_at < older_than,
+        ChatChangeORM.id < newest
+    ).delete(synchronize_session=False)
+
+
+def is_purged(db: Session, since: int) -> bool:
+    """
+    Whether changes right after `since` have been purged, so the client has
+    to resync. Change ids have no gaps, as a rolled back change gives its id back.
+    """
+    oldest = db.query(func.min(ChatChangeORM.id)).scalar()
+    return oldest is not None and since + 1 < oldest
+
+
+def changes_since(db: Session, user_id: int, since: int, limit: int) -> List[ChatChangeORM]:
+    """
+    Changes after `since` that concern the user, oldest first: everything in
+    the conversations they are in, except other users' hides, plus changes
+    addressed to them (their own hides, and joins/leaves of conversations they
+    are no longer part of). Fetches limit + 1 rows so callers can tell if more remain.
+    """
+    my_conversations = select(ConversationParticipantORM.conversation_id).where(
+        ConversationParticipantORM.user_id == user_id
+    )
+    return db.query(ChatChangeORM).filter(
+        ChatChangeORM.id > since,
+        or_(
+            ChatChangeORM.user_id == user_id,
+            and_(
+                ChatChangeORM.conversation_id.in_(my_conversations),
+                ChatChangeORM.kind != HIDE
+            )
+        )
+    ).order_by(ChatChangeORM.id).limit(limit + 1).all()
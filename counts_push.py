@@ -0,0 +1,144 @@
+"""
+Counts Push: delivers notification counter changes to connected clients
+Write paths publish the ids of users whose counters changed (see
+notification_counters.py). Each worker collects those ids for a short debounce
+window, reads the counters of its locally watching users in one query and
+sends each watcher only the fields that changed since it was last told.
+
+Watchers are signaling sockets ("counts" messages on /ws/signaling) and
+long-poll requests on /notifications/counts/poll.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from decouple import config
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from event_bus import bus
+import notification_counters
+
+logger = logging.getLogger(__name__)
+
+COUNTS_PUSH_DEBOUNCE = config("COUNTS_PUSH_DEBOUNCE", default=0.5, cast=float)
+COUNTS_POLL_TIMEOUT = config("COUNTS_POLL_TIMEOUT", default=25, cast=int)
+
+Deliver = Callable[[Dict[str, int]], Awaitable[None]]
+
+
+def _load_counts(user_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    db = SessionLocal()
+    try:
+        return notification_counters.get_many(db, user_ids)
+    finally:
+        db.close()
+
+
+def _load_user_counts(user_id: int) -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        return notification_counters.get_counts(db, user_id)
+    finally:
+        db.close()
+
+
+class CountsWatcher:
+    """One client waiting for counter changes, with the counts it last received"""
+
+    def __init__(self, user_id: int, deliver: Deliver):
+        self.user_id = user_id
+        self.deliver = deliver
+        self.last: Dict[str, int] = {}
+
+    def diff(self, counts: Dict[str, int]) -> Dict[str, int]:
+        return {field: value for field, value in counts.items() if self.last.get(field) != value}
+
+
+class CountsPusher:
+    def __init__(self, debounce: float = COUNTS_PUSH_DEBOUNCE, event_bus=None):
+        self.debounce = debounce
+        self.watchers: Dict[int, List[CountsWatcher]] = {}
+        self._dirty: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.bus = event_bus or bus
+        self.bus.subscribe(notification_counters.COUNTS_CHANNEL, self._on_counts_event)
+
+    async def watch(self, user_id: int, deliver: Deliver, send_initial: bool = True) -> CountsWatcher:
+        """Register a watcher, optionally sending it the full current counts first"""
+        watcher = CountsWatcher(user_id, deliver)
+        self.watchers.setdefault(user_id, []).append(watcher)
+        if send_initial:
+            counts = await run_in_threadpool(_load_user_counts, user_id)
+            await self._send(watcher, counts)
+        return watcher
+
+    def unwatch(self, watcher: CountsWatcher):
+        watchers = self.watchers.get(watcher.user_id)
+        if watchers and watcher in watchers:
+            watchers.remove(watcher)
+            if not watchers:
+                del self.watchers[watcher.user_id]
+
+    async def wait_for_change(self, user_id: int, known: Dict[str, int], timeout: float) -> Dict[str, int]:
+        """
+        Long-poll: return the user's counts as soon as they differ from known,
+        or after timeout with the counts unchanged.
+        """
+        changed = asyncio.Event()
+
+        async def deliver(diff: Dict[str, int]):
+            changed.set()
+
+        # Watch before reading so a change in between is not missed
+        watcher = await self.watch(user_id, deliver, send_initial=False)
+        try:
+            counts = await run_in_threadpool(_load_user_counts, user_id)
+            watcher.last = dict(counts)
+            if any(counts.get(field) != value for field, value in known.items()):
+                return counts
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            return dict(watcher.last)
+        finally:
+            self.unwatch(watcher)
+
+    async def _on_counts_event(self, event: dict):
+        if event.get("all"):
+            users: Iterable[int] = list(self.watchers)
+        else:
+            users = [u for u in event.get("user_ids", []) if u in self.watchers]
+        if not users:
+            return
+        self._dirty.update(users)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.debounce)
+        users, self._dirty = list(self._dirty), set()
+        self._flush_task = None
+        try:
+            counts = await run_in_threadpool(_load_counts, users)
+        except Exception as e:
+            logger.error(f"Failed to load notification counts: {e}")
+            return
+        for user_id, user_counts in counts.items():
+            for watcher in list(self.watchers.get(user_id, [])):
+                await self._send(watcher, user_counts)
+
+    async def _send(self, watcher: CountsWatcher, counts: Dict[str, int]):
+        diff = watcher.diff(counts)
+        if not diff:
+            return
+        watcher.last.update(diff)
+        try:
+            await watcher.deliver(diff)
+        except Exception as e:
+            logger.warning(f"Dropping counts watcher for user {watcher.user_id}: {e!r}")
+            self.unwatch(watcher)
+
+
+pusher = CountsPusher()
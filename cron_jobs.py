@@ -1,42 +1,139 @@
 """
 Daily Alert System: Checks for missed task updates
 Run this daily to update task alert counts and toggle red lines.
+Also reconciles the notification counters and task subtree rollups against
+their source tables, respaces board ranks that grew too long and purges
+expired chat changes, job history and sent deadline notices.
+
+The API schedules these itself (see register_jobs and scheduler.py); running
+this file runs them all once by hand.
 """
+import time
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from decouple import config
+from sqlalchemy import update, or_, func
 from database import SessionLocal
-from models import TaskORM, TaskUpdateORM, FamilyMemberORM
+from models import TaskORM, JobRunORM, DeadlineNoticeORM
+import notification_counters
+import chat_sync
+import task_rollups
+import ranking
+
+ALERT_CHECK_INTERVAL = config("ALERT_CHECK_INTERVAL", default=24 * 3600, cast=int)
+COUNTER_RECONCILE_INTERVAL = config("COUNTER_RECONCILE_INTERVAL", default=3600, cast=int)
+ROLLUP_RECONCILE_INTERVAL = config("ROLLUP_RECONCILE_INTERVAL", default=24 * 3600, cast=int)
+RANK_REBALANCE_INTERVAL = config("RANK_REBALANCE_INTERVAL", default=3600, cast=int)
+RETENTION_PURGE_INTERVAL = config("RETENTION_PURGE_INTERVAL", default=24 * 3600, cast=int)
+CHAT_CHANGES_RETENTION_DAYS = config("CHAT_CHANGES_RETENTION_DAYS", default=30, cast=int)
+JOB_RUNS_RETENTION_DAYS = config("JOB_RUNS_RETENTION_DAYS", default=30, cast=int)
+DEADLINE_NOTICES_RETENTION_DAYS = config("DEADLINE_NOTICES_RETENTION_DAYS", default=30, cast=int)
 
 def check_task_updates():
     db = SessionLocal()
+    started = time.monotonic()
     try:
-        # Get all approved, active tasks (pending or in_progress)
-        tasks = db.query(TaskORM).filter(
-            TaskORM.is_approved == True,
-            TaskORM.status.in_(['pending', 'in_progress'])
-        ).all()
-        
+        # One UPDATE over approved, active tasks (pending or in_progress) with no
+        # progress update in the last 24 hours; add_task_progress keeps
+        # last_progress_at current so no per-task lookup is needed
         yesterday = datetime.utcnow() - timedelta(days=1)
         
-        for task in tasks:
-            # Check for updates in the last 24 hours
-            recent_update = db.query(TaskUpdateORM).filter(
-                TaskUpdateORM.task_id == task.id,
-                TaskUpdateORM.created_at >= yesterday
-            ).first()
-            
-            if not recent_update:
-                # Increment alert count if no update found
-                task.alert_count += 1
-                db.commit()
-                print(f"Alert: Task '{task.title}' missed daily update. Alert count: {task.alert_count}")
-                
-        print("✓ Daily task update check completed.")
+        result = db.execute(
+            update(TaskORM).where(
+                TaskORM.is_approved == True,
+                TaskORM.status.in_(['pending', 'in_progress']),
+                or_(TaskORM.last_progress_at.is_(None), TaskORM.last_progress_at < yesterday)
+            ).values(alert_count=func.coalesce(TaskORM.alert_count, 0) + 1)
+        )
+        db.commit()
+        
+        touched = result.rowcount
+        elapsed = time.monotonic() - started
+        print(f"✓ Daily task update check completed. Alerts raised: {touched} ({elapsed:.2f}s)")
+        return {"touched": touched, "elapsed": elapsed}
     except Exception as e:
         print(f"✗ Error in daily check: {e}")
         db.rollback()
+        raise
     finally:
         db.close()
 
+def reconcile_notification_counters():
+    db = SessionLocal()
+    try:
+        # Recount every user's badges and rewrite only the rows that drifted
+        repaired = notification_counters.refresh(db)
+        db.commit()
+        print(f"✓ Notification counters reconciled. Repaired: {repaired}")
+        return {"repaired": repaired}
+    except Exception as e:
+        print(f"✗ Error reconciling notification counters: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def reconcile_task_rollups():
+    db = SessionLocal()
+    try:
+        # Re-sum every subtree and rewrite only the rollups that drifted
+        repaired = task_rollups.recompute(db)
+        db.commit()
+        print(f"✓ Task rollups reconciled. Repaired: {repaired}")
+        return {"repaired": repaired}
+    except Exception as e:
+        print(f"✗ Error reconciling task rollups: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def rebalance_task_ranks():
+    db = SessionLocal()
+    try:
+        # Only columns with overlong or missing ranks are rewritten
+        written = ranking.rebalance(db)
+        db.commit()
+        print(f"✓ Task ranks rebalanced. Columns: {len(written)}, tasks: {sum(written.values())}")
+        return written
+    except Exception as e:
+        print(f"✗ Error rebalancing task ranks: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def purge_expired_records():
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        changes = chat_sync.purge_changes(db, now - timedelta(days=CHAT_CHANGES_RETENTION_DAYS))
+        runs = db.query(JobRunORM).filter(
+            JobRunORM.started_at < now - timedelta(days=JOB_RUNS_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+        notices = db.query(DeadlineNoticeORM).filter(
+            DeadlineNoticeORM.sent_at < now - timedelta(days=DEADLINE_NOTICES_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+        db.commit()
+        print(f"✓ Retention purge completed. Chat changes: {changes}, job runs: {runs}, deadline notices: {notices}")
+        return {"chat_changes": changes, "job_runs": runs, "deadline_notices": notices}
+    except Exception as e:
+        print(f"✗ Error purging expired records: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def register_jobs(scheduler):
+    """Schedule the periodic jobs on the API's in-process scheduler"""
+    scheduler.add_job("task_alerts", ALERT_CHECK_INTERVAL, check_task_updates)
+    scheduler.add_job("counter_reconcile", COUNTER_RECONCILE_INTERVAL, reconcile_notification_counters)
+    scheduler.add_job("rollup_reconcile", ROLLUP_RECONCILE_INTERVAL, reconcile_task_rollups)
+    scheduler.add_job("rank_rebalance", RANK_REBALANCE_INTERVAL, rebalance_task_ranks)
+    scheduler.add_job("retention_purge", RETENTION_PURGE_INTERVAL, purge_expired_records)
+
 if __name__ == "__main__":
     check_task_updates()
+    reconcile_notification_counters()
+    reconcile_task_rollups()
+    rebalance_task_ranks()
+    purge_expired_records()
@@ -0,0 +1,336 @@
+"""
+Deadline Scheduler: on-time deadline reminders and overdue notices
+Every worker keeps a min-heap of the reminder and overdue times of unfinished
+tasks whose deadline falls within the loaded window. The window is filled by
+range scans over the tasks(deadline, id) index, one new slice at a time as
+time moves on, so the table is never rescanned. Task writes publish the ids
+they touched on the event bus once committed, and every worker re-reads just
+those rows to update its heap.
+
+Only the worker holding the "deadline_scheduler" lease (see scheduler.py)
+sends notices. Each (task, kind, deadline) is first claimed in
+deadline_notices, so a notice goes out once even across restarts and leader
+changes. Notices reach the task's assignees over /ws/signaling as
+{"type": "task_deadline", ...} messages.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from decouple import config
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from event_bus import bus
+from models import TaskORM, DeadlineNoticeORM
+from scheduler import acquire_lease, release_lease
+import notification_counters
+from routers.live_calling import manager as signaling
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_SCHEDULER_ENABLED = config("DEADLINE_SCHEDULER_ENABLED", default=True, cast=bool)
+# Reminders go out this long before the deadline, or as soon as a deadline
+# closer than that is set
+DEADLINE_REMINDER_LEAD = config("DEADLINE_REMINDER_LEAD", default=24 * 3600, cast=int)
+# How far ahead of the reminder times the heap is filled
+DEADLINE_HORIZON = config("DEADLINE_HORIZON", default=6 * 3600, cast=int)
+# Overdue notices missed by up to this long, e.g. while restarting, are still
+# sent; missed reminders are sent until the deadline itself has passed
+DEADLINE_CATCHUP = config("DEADLINE_CATCHUP", default=3600, cast=int)
+DEADLINE_LEASE_TTL = config("DEADLINE_LEASE_TTL", default=30, cast=int)
+
+# Event bus channel carrying the ids of tasks whose deadline or status may have changed
+DEADLINE_CHANNEL = "task_deadlines"
+LEASE_NAME = "deadline_scheduler"
+
+REMINDER = "reminder"
+OVERDUE = "overdue"
+COMPLETED = "completed"
+
+_CHANGED = "deadline_scheduler.changed"
+
+# (fire at, task id, kind, deadline)
+Entry = Tuple[datetime, int, str, datetime]
+
+
+def _insert(db: Session):
+    """INSERT construct with ON CONFLICT support for the active database"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(DeadlineNoticeORM)
+
+
+def _load_window(start: datetime, end: datetime) -> List[Tuple[int, datetime]]:
+    db = SessionLocal()
+    try:
+        return db.query(TaskORM.id, TaskORM.deadline).filter(
+            TaskORM.deadline >= start,
+            TaskORM.deadline < end,
+            TaskORM.status != COMPLETED
+        ).all()
+    finally:
+        db.close()
+
+
+def _load_tasks(task_ids: List[int]) -> Dict[int, Tuple[Optional[datetime], str]]:
+    db = SessionLocal()
+    try:
+        return {
+            task_id: (deadline, status) for task_id, deadline, status in
+            db.query(TaskORM.id, TaskORM.deadline, TaskORM.status).filter(TaskORM.id.in_(task_ids))
+        }
+    finally:
+        db.close()
+
+
+def _renew_lease(ttl: float) -> bool:
+    db = SessionLocal()
+    try:
+        return acquire_lease(db, LEASE_NAME, ttl)
+    finally:
+        db.close()
+
+
+def _release_lease():
+    db = SessionLocal()
+    try:
+        release_lease(db, LEASE_NAME)
+    finally:
+        db.close()
+
+
+def _claim(entries: List[Entry]) -> List[dict]:
+    """
+    Record the notices in deadline_notices, skipping any already sent, and
+    return the claimed ones with the task title and recipients.
+    """
+    db = SessionLocal()
+    try:
+        claimed = []
+        for _, task_id, kind, deadline in entries:
+            result = db.execute(
+                _insert(db).values(task_id=task_id, kind=kind, deadline=deadline).on_conflict_do_nothing(
+                    index_elements=["task_id", "kind", "deadline"]
+                )
+            )
+            if result.rowcount:
+                claimed.append((task_id, kind, deadline))
+        db.commit()
+        if not claimed:
+            return []
+
+        tasks = {
+            task.id: task for task in
+            db.query(TaskORM).filter(TaskORM.id.in_({task_id for task_id, _, _ in claimed}))
+        }
+        notices = []
+        for task_id, kind, deadline in claimed:
+            task = tasks.get(task_id)
+            if task is None:
+                continue
+            notices.append({
+                "message": {
+                    "type": "task_deadline",
+                    "kind": kind,
+                    "task_id": task_id,
+                    "title": task.title,
+                    "deadline": deadline.isoformat(),
+                },
+                "user_ids": sorted(notification_counters.task_users(db, task_id, task.assigned_to)),
+            })
+        return notices
+    finally:
+        db.close()
+
+
+class DeadlineScheduler:
+    def __init__(
+        self,
+        lead: float = DEADLINE_REMINDER_LEAD,
+        horizon: float = DEADLINE_HORIZON,
+        catchup: float = DEADLINE_CATCHUP,
+        lease_ttl: float = DEADLINE_LEASE_TTL,
+        event_bus=None
+    ):
+        self.lead = timedelta(seconds=lead)
+        self.horizon = timedelta(seconds=horizon)
+        self.catchup = timedelta(seconds=catchup)
+        self.lease_ttl = lease_ttl
+        self.heap: List[Entry] = []
+        # The deadline each task in the window is scheduled for; heap entries
+        # for any other deadline are stale and skipped
+        self.deadlines: Dict[int, datetime] = {}
+        self.loaded_until: Optional[datetime] = None
+        self.leader = False
+        self.sent = 0
+        self._wakeup = asyncio.Event()
+        # Window loads and change events each read the database first; taking
+        # them in turn keeps an older read from overwriting a newer one
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.bus = event_bus or bus
+        self.bus.subscribe(DEADLINE_CHANNEL, self._on_tasks_changed)
+
+    def schedule(self, task_id: int, deadline: datetime, now: datetime):
+        if deadline < now - self.catchup:
+            self.deadlines.pop(task_id, None)  # Long overdue, nothing left to send
+            return
+        self.deadlines[task_id] = deadline
+        if deadline > now:
+            # A deadline already inside the lead time gets its reminder right away
+            self._push(max(deadline - self.lead, now), task_id, REMINDER, deadline, now)
+        self._push(deadline, task_id, OVERDUE, deadline, now)
+
+    def _push(self, at: datetime, task_id: int, kind: str, deadline: datetime, now: datetime):
+        if at >= now - self.catchup:
+            heapq.heappush(self.heap, (at, task_id, kind, deadline))
+
+    def unschedule(self, task_id: int):
+        self.deadlines.pop(task_id, None)
+
+    def _current(self, entry: Entry) -> bool:
+        return self.deadlines.get(entry[1]) == entry[3]
+
+    def pop_due(self, now: datetime) -> List[Entry]:
+        """Remove and return the live entries due by now"""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if self._current(entry):
+                due.append(entry)
+                if entry[2] == OVERDUE:
+                    self.deadlines.pop(entry[1], None)
+        return due
+
+    def drop_late(self, now: datetime):
+        """
+        Drop the entries too late to be worth sending: overdue notices missed by
+        more than the catch-up time, reminders once their deadline has passed.
+        """
+        for entry in self.pop_due(now - self.catchup):
+            if entry[2] == REMINDER and entry[3] > now:
+                heapq.heappush(self.heap, entry)
+
+    def next_at(self) -> Optional[datetime]:
+        while self.heap and not self._current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    async def extend(self, now: datetime):
+        """Load the next slice of deadlines once the window runs low"""
+        end = now + self.lead + self.horizon
+        if self.loaded_until is None:
+            start = now - self.catchup
+        elif end - self.loaded_until >= self.horizon / 2:
+            start = self.loaded_until
+        else:
+            return
+        async with self._lock:
+            for task_id, deadline in await run_in_threadpool(_load_window, start, end):
+                if self.deadlines.get(task_id) != deadline:
+                    self.schedule(task_id, deadline, now)
+            self.loaded_until = end
+
+    async def _on_tasks_changed(self, event: dict):
+        if self.loaded_until is None:
+            return  # Not started; the first window load will see the change
+        task_ids = event.get("task_ids", [])
+        async with self._lock:
+            tasks = await run_in_threadpool(_load_tasks, task_ids)
+            now = datetime.utcnow()
+            for task_id in task_ids:
+                deadline, status = tasks.get(task_id, (None, None))
+                if deadline is None or status == COMPLETED or deadline >= self.loaded_until:
+                    # Gone, done, or later than the window; a later slice picks it up
+                    self.unschedule(task_id)
+                elif self.deadlines.get(task_id) != deadline:
+                    self.schedule(task_id, deadline, now)
+        self._wakeup.set()
+
+    async def _fire(self, entries: List[Entry]):
+        notices = await run_in_threadpool(_claim, entries)
+        for notice in notices:
+            for user_id in notice["user_ids"]:
+                await signaling.send_personal_message(notice["message"], user_id)
+            self.sent += 1
+            logger.info(f"Task {notice['message']['task_id']} {notice['message']['kind']} sent to {notice['user_ids']}")
+
+    async def tick(self):
+        now = datetime.utcnow()
+        self.leader = await run_in_threadpool(_renew_lease, self.lease_ttl)
+        await self.extend(now)
+        self.drop_late(now)
+        if self.leader:
+            due = self.pop_due(now)
+            if due:
+                await self._fire(due)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Deadline scheduler tick failed: {e}", exc_info=True)
+
+            # Wake for the next entry, a task change or the next lease renewal
+            timeout = self.lease_ttl / 3
+            next_at = self.next_at() if self.leader else None
+            if next_at is not None:
+                timeout = min(timeout, max((next_at - datetime.utcnow()).total_seconds(), 0))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        if not DEADLINE_SCHEDULER_ENABLED:
+            logger.info("Deadline scheduler disabled")
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self.leader:
+            await run_in_threadpool(_release_lease)
+            self.leader = False
+
+    def stats(self) -> dict:
+        return {
+            "leader": self.leader,
+            "scheduled_tasks": len(self.deadlines),
+            "heap": len(self.heap),
+            "loaded_until": self.loaded_until,
+            "sent": self.sent,
+        }
+
+
+def tasks_changed(db: Session, task_ids: Iterable[int]):
+    """Tell every worker's scheduler to re-read these tasks once the transaction commits"""
+    db.info.setdefault(_CHANGED, set()).update(task_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changed(session: Session):
+    changed = session.info.pop(_CHANGED, None)
+    if changed:
+        bus.publish_threadsafe(DEADLINE_CHANNEL, {"task_ids": sorted(changed)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed(session: Session):
+    session.info.pop(_CHANGED, None)
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -0,0 +1,236 @@
+"""
+Event Bus: cross-worker pub/sub for real-time delivery
+Gunicorn runs several workers and each one holds its own sockets, so events are
+published through the bus and every worker delivers them to its local sockets.
+
+Backends (EVENT_BUS_BACKEND):
+  local    - single process / tests; handlers are called directly
+  postgres - LISTEN/NOTIFY on the application database
+Defaults to postgres when DATABASE_URL points at Postgres, otherwise local.
+"""
+import asyncio
+import base64
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from decouple import config
+
+import database
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[None]]
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+# Larger events are split into base64 chunks of this many bytes, which stay
+# under the limit once wrapped in their envelope
+NOTIFY_CHUNK_BYTES = 5600
+# Events still being reassembled, oldest evicted first
+MAX_PENDING_CHUNKED = 100
+CHANNEL_PREFIX = "tg_"
+
+
+class LocalEventBus:
+    """In-process bus: the single-worker fast path, also used for SQLite and tests"""
+
+    distributed = False
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._loop = None
+
+    async def publish(self, channel: str, payload: dict):
+        await self._dispatch(channel, payload)
+
+    def publish_threadsafe(self, channel: str, payload: dict):
+        """Publish from synchronous code running in the threadpool"""
+        if self._loop is None or self._loop.is_closed():
+            logger.debug(f"Event bus not running, dropping event on '{channel}'")
+            return
+        asyncio.run_coroutine_threadsafe(self.publish(channel, payload), self._loop)
+
+    async def _dispatch(self, channel: str, payload: dict):
+        for handler in self._handlers.get(channel, []):
+            try:
+                await handler(payload)
+            except Exception as e:
+                logger.error(f"Event handler for '{channel}' failed: {e}", exc_info=True)
+
+
+class PostgresEventBus(LocalEventBus):
+    """
+    LISTEN/NOTIFY bus. Events are delivered locally straight away and NOTIFY
+    carries them to the other workers; each worker skips its own notifications.
+    Events too large for one NOTIFY are sent as chunks in a single transaction,
+    so they arrive together, and reassembled by the receivers.
+    """
+
+    distributed = True
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+        self.origin = uuid.uuid4().hex
+        self._listen_conn = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+        self._listener_task: Optional[asyncio.Task] = None
+        # Chunks received so far, by (origin, event id)
+        self._pending: "OrderedDict[Tuple[str, str], List[Optional[str]]]" = OrderedDict()
+
+    def subscribe(self, channel: str, handler: Handler):
+        is_new = channel not in self._handlers
+        super().subscribe(channel, handler)
+        if is_new and self._listener_task is not None:
+            # The listening connection is busy waiting for notifications, so
+            # reconnect and LISTEN on the full channel set instead
+            self._listener_task.cancel()
+            self._listener_task = self._loop.create_task(self._listen_forever())
+
+    async def start(self):
+        await super().start()
+        self._listener_task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            self._listener_task = None
+        for conn in (self._listen_conn, self._publish_conn):
+            if conn is not None:
+                await conn.close()
+        self._listen_conn = self._publish_conn = None
+        await super().stop()
+
+    async def publish(self, channel: str, payload: dict):
+        await self._dispatch(channel, payload)
+
+        bodies = self._encode(payload)
+
+        import psycopg
+
+        async with self._publish_lock:
+            try:
+                if self._publish_conn is None or self._publish_conn.closed:
+                    self._publish_conn = await psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+                async with self._publish_conn.transaction():
+                    for body in bodies:
+                        await self._publish_conn.execute(
+                            "SELECT pg_notify(%s, %s)", (CHANNEL_PREFIX + channel, body)
+                        )
+            except Exception as e:
+                logger.error(f"Failed to publish event on '{channel}': {e}")
+                self._publish_conn = None
+
+    def _encode(self, payload: dict) -> List[str]:
+        """NOTIFY bodies for an event: the event itself, or its chunks if too large"""
+        body = json.dumps({"origin": self.origin, "payload": payload}, default=str)
+        raw = body.encode()
+        if len(raw) <= NOTIFY_PAYLOAD_LIMIT:
+            return [body]
+
+        event_id = uuid.uuid4().hex
+        parts = [raw[i:i + NOTIFY_CHUNK_BYTES] for i in range(0, len(raw), NOTIFY_CHUNK_BYTES)]
+        return [
+            json.dumps({
+                "origin": self.origin,
+                "chunk": {"id": event_id, "index": index, "count": len(parts)},
+                "data": base64.b64encode(part).decode()
+            })
+            for index, part in enumerate(parts)
+        ]
+
+    def _reassemble(self, event: dict) -> Optional[dict]:
+        """Store a chunk; returns the whole event once its last chunk is in"""
+        chunk = event["chunk"]
+        key = (event.get("origin"), chunk["id"])
+        parts = self._pending.get(key)
+        if parts is None:
+            parts = self._pending[key] = [None] * chunk["count"]
+            if len(self._pending) > MAX_PENDING_CHUNKED:
+                dropped, _ = self._pending.popitem(last=False)
+                logger.warning(f"Dropping incomplete chunked event {dropped[1]}")
+        parts[chunk["index"]] = event["data"]
+        if any(part is None for part in parts):
+            return None
+
+        del self._pending[key]
+        return json.loads(b"".join(base64.b64decode(part) for part in parts))
+
+    async def _listen(self, channel: str):
+        from psycopg import sql
+
+        await self._listen_conn.execute(
+            sql.SQL("LISTEN {}").format(sql.Identifier(CHANNEL_PREFIX + channel))
+        )
+
+    async def _listen_forever(self):
+        import psycopg
+
+        delay = 1
+        while True:
+            try:
+                self._listen_conn = await psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+                for channel in list(self._handlers):
+                    await self._listen(channel)
+                delay = 1
+                logger.info("Event bus listening for notifications")
+                async for notify in self._listen_conn.notifies():
+                    await self._on_notify(notify.channel, notify.payload)
+            except asyncio.CancelledError:
+                if self._listen_conn is not None:
+                    await self._listen_conn.close()
+                    self._listen_conn = None
+                raise
+            except Exception as e:
+                logger.error(f"Event bus listener lost its connection: {e}")
+            self._listen_conn = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def _on_notify(self, channel: str, body: str):
+        try:
+            event = json.loads(body)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed notification on '{channel}'")
+            return
+        if event.get("origin") == self.origin:
+            return  # Already delivered locally
+        if "chunk" in event:
+            try:
+                event = self._reassemble(event)
+            except (KeyError, IndexError, TypeError, ValueError):
+                logger.warning(f"Ignoring malformed chunk on '{channel}'")
+                return
+            if event is None:
+                return
+        await self._dispatch(channel[len(CHANNEL_PREFIX):], event.get("payload") or {})
+
+
+def create_event_bus():
+    backend = config("EVENT_BUS_BACKEND", default="")
+    url = database.DATABASE_URL or ""
+    if not backend:
+        backend = "postgres" if url.startswith("postgresql") else "local"
+
+    if backend == "postgres":
+        # psycopg wants a plain libpq URL, not the SQLAlchemy dialect form
+        return PostgresEventBus(url.replace("postgresql+psycopg://", "postgresql://", 1))
+    if backend == "local":
+        return LocalEventBus()
+    raise ValueError(f"Unknown EVENT_BUS_BACKEND: {backend}")
+
+
+bus = create_event_bus()
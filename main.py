@@ -11,6 +11,12 @@ import os
 from database import get_db, init_db, SessionLocal
 from models import FamilyMemberORM
 from auth import get_password_hash
+from team_chat import add_team_member
+from event_bus import bus
+from scheduler import scheduler
+import cron_jobs
+from deadline_scheduler import deadline_scheduler
+from routers.live_calling import manager as signaling
 
 # =============================================================================
 # App Configuration
@@ -79,6 +85,42 @@ def on_startup():
     create_default_admin()
 
 
+@app.on_event("startup")
+async def start_event_bus():
+    """Start cross-worker delivery of real-time events and signaling presence"""
+    await bus.start()
+    await signaling.start_presence()
+
+
+@app.on_event("shutdown")
+async def stop_event_bus():
+    await signaling.stop_presence()
+    await bus.stop()
+
+
+@app.on_event("startup")
+async def start_scheduler():
+    """Run periodic jobs; a lease per job keeps them to one worker at a time"""
+    cron_jobs.register_jobs(scheduler)
+    await scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+
+
+@app.on_event("startup")
+async def start_deadline_scheduler():
+    """Send deadline reminders and overdue notices as they come due"""
+    await deadline_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_deadline_scheduler():
+    await deadline_scheduler.stop()
+
+
 def create_default_admin():
     """Create default admin user from environment variables or use defaults"""
     admin_email = config("DEFAULT_ADMIN_EMAIL", default="admin@thegreatest.app")
@@ -108,6 +150,8 @@ def create_default_admin():
             is_online=False
         )
         db.add(admin)
+        db.flush()
+        add_team_member(db, admin.id)
         db.commit()
         print(f"[OK] Default admin '{admin_username}' created successfully.")
     except Exception as e:
@@ -0,0 +1,67 @@
+"""
+Migration script to replace per-announcement read rows with a per-user watermark.
+Adds family_members.last_seen_announcement_id, sets it to the end of each user's
+contiguous run of read announcements and keeps only the out-of-order reads above
+it in announcement_reads. Safe to run more than once.
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+
+
+def migrate():
+    columns = {c["name"] for c in inspect(engine).get_columns("family_members")}
+
+    with engine.begin() as conn:
+        if "last_seen_announcement_id" not in columns:
+            print("Adding last_seen_announcement_id column to family_members...")
+            conn.execute(text(
+                "ALTER TABLE family_members ADD COLUMN last_seen_announcement_id INTEGER NOT NULL DEFAULT 0"
+            ))
+
+        print("Computing announcement watermarks...")
+        result = conn.execute(text("""
+            UPDATE family_members SET last_seen_announcement_id = COALESCE(
+                (SELECT MIN(a.id) FROM announcements a
+                 WHERE a.id > family_members.last_seen_announcement_id
+                 AND NOT EXISTS (
+                     SELECT 1 FROM announcement_reads r
+                     WHERE r.announcement_id = a.id AND r.user_id = family_members.id
+                 )) - 1,
+                (SELECT MAX(id) FROM announcements),
+                0
+            )
+            WHERE EXISTS (
+                SELECT 1 FROM announcement_reads r
+                WHERE r.user_id = family_members.id
+                AND r.announcement_id > family_members.last_seen_announcement_id
+            )
+        """))
+        print(f"  [OK] Updated {result.rowcount} users")
+
+        result = conn.execute(text("""
+            DELETE FROM announcement_reads WHERE announcement_id <= (
+                SELECT last_seen_announcement_id FROM family_members
+                WHERE family_members.id = announcement_reads.user_id
+            )
+        """))
+        print(f"  [OK] Removed {result.rowcount} read rows covered by watermarks")
+
+        result = conn.execute(text("""
+            DELETE FROM announcement_reads WHERE id NOT IN (
+                SELECT MIN(id) FROM announcement_reads GROUP BY user_id, announcement_id
+            )
+        """))
+        print(f"  [OK] Removed {result.rowcount} duplicate read rows")
+
+        print("Creating ix_announcement_reads_user_id_announcement_id...")
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_announcement_reads_user_id_announcement_id "
+            "ON announcement_reads (user_id, announcement_id)"
+        ))
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,34 @@
+"""
+Migration script to create conversation_reads and seed a read watermark for
+every participant from the legacy messages.is_read flag. Safe to run more than once.
+"""
+from sqlalchemy import text
+
+from database import engine
+from models import ConversationReadORM
+
+
+def migrate():
+    print("Creating conversation_reads table...")
+    ConversationReadORM.__table__.create(bind=engine, checkfirst=True)
+
+    with engine.begin() as conn:
+        # is_read was shared by all recipients, so the best available watermark
+        # is the newest message in the conversation that somebody marked read
+        result = conn.execute(text(
+            "INSERT INTO conversation_reads (user_id, conversation_id, last_read_message_id, updated_at) "
+            "SELECT p.user_id, p.conversation_id, "
+            "  COALESCE((SELECT MAX(m.id) FROM messages m "
+            "            WHERE m.conversation_id = p.conversation_id AND m.is_read = TRUE), 0), "
+            "  CURRENT_TIMESTAMP "
+            "FROM conversation_participants p "
+            "WHERE NOT EXISTS (SELECT 1 FROM conversation_reads r "
+            "                  WHERE r.user_id = p.user_id AND r.conversation_id = p.conversation_id)"
+        ))
+        print(f"  [OK] Seeded {result.rowcount} read watermarks")
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
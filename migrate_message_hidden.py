@@ -0,0 +1,51 @@
+"""
+Migration script to move "delete for me" data from messages.deleted_for_ids
+into the message_hidden table. Safe to run more than once.
+"""
+from sqlalchemy import text
+
+from database import engine
+from models import MessageHiddenORM
+
+
+def migrate():
+    print("Creating message_hidden table...")
+    MessageHiddenORM.__table__.create(bind=engine, checkfirst=True)
+
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, deleted_for_ids FROM messages "
+            "WHERE deleted_for_ids IS NOT NULL AND deleted_for_ids != ''"
+        )).fetchall()
+
+        existing = set(conn.execute(text(
+            "SELECT user_id, message_id FROM message_hidden"
+        )).fetchall())
+        # deleted_for_ids still names users deleted since; message_hidden has a foreign key
+        user_ids = set(conn.execute(text("SELECT id FROM family_members")).scalars())
+
+        new_rows = []
+        skipped = 0
+        for message_id, deleted_for_ids in rows:
+            for user_id in deleted_for_ids.split(","):
+                user_id = user_id.strip()
+                if not user_id.isdigit():
+                    continue
+                key = (int(user_id), message_id)
+                if key[0] not in user_ids:
+                    skipped += 1
+                elif key not in existing:
+                    existing.add(key)
+                    new_rows.append({"user_id": key[0], "message_id": key[1]})
+
+        if new_rows:
+            conn.execute(MessageHiddenORM.__table__.insert(), new_rows)
+        print(f"  [OK] Backfilled {len(new_rows)} hidden message rows from {len(rows)} messages")
+        if skipped:
+            print(f"  [OK] Skipped {skipped} ids of users that no longer exist")
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,21 @@
+"""
+Migration script to add the (conversation_id, id) index used by message pagination.
+Run this script once to update the database schema.
+"""
+from sqlalchemy import text
+
+from database import engine
+
+
+def migrate():
+    with engine.begin() as conn:
+        print("Creating ix_messages_conversation_id_id...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_messages_conversation_id_id "
+            "ON messages (conversation_id, id)"
+        ))
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,45 @@
+"""
+Migration script to add per-conversation message sequence numbers.
+Adds conversations.last_seq and messages.seq, then numbers existing messages
+in id order within each conversation. Safe to run more than once.
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+
+
+def migrate():
+    inspector = inspect(engine)
+    conversation_columns = {c["name"] for c in inspector.get_columns("conversations")}
+    message_columns = {c["name"] for c in inspector.get_columns("messages")}
+
+    with engine.begin() as conn:
+        if "last_seq" not in conversation_columns:
+            print("Adding last_seq column to conversations...")
+            conn.execute(text("ALTER TABLE conversations ADD COLUMN last_seq INTEGER DEFAULT 0"))
+        if "seq" not in message_columns:
+            print("Adding seq column to messages...")
+            conn.execute(text("ALTER TABLE messages ADD COLUMN seq INTEGER"))
+
+        print("Numbering existing messages...")
+        result = conn.execute(text("""
+            UPDATE messages SET seq = (
+                SELECT COUNT(*) FROM messages m2
+                WHERE m2.conversation_id = messages.conversation_id
+                AND m2.id <= messages.id
+            )
+            WHERE seq IS NULL
+        """))
+        print(f"  [OK] Numbered {result.rowcount} messages")
+
+        conn.execute(text("""
+            UPDATE conversations SET last_seq = COALESCE(
+                (SELECT MAX(seq) FROM messages WHERE messages.conversation_id = conversations.id), 0
+            )
+        """))
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
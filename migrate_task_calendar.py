@@ -0,0 +1,21 @@
+"""
+Migration script to add the (proposed_deadline, id) index that the task
+calendar scans next to the existing (deadline, id) one. Safe to run more than once.
+"""
+from sqlalchemy import text
+
+from database import engine
+
+
+def migrate():
+    with engine.begin() as conn:
+        print("Creating ix_tasks_proposed_deadline_id...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_proposed_deadline_id ON tasks (proposed_deadline, id)"
+        ))
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,37 @@
+"""
+Migration script to add the task_dependencies indexes behind the dependency graph:
+UNIQUE (task_id, depends_on_id) and (depends_on_id). Duplicate edges are
+removed first, keeping the oldest row of each. Safe to run more than once.
+"""
+from sqlalchemy import text
+
+from database import engine
+
+
+def migrate():
+    with engine.begin() as conn:
+        print("Removing duplicate dependencies...")
+        result = conn.execute(text("""
+            DELETE FROM task_dependencies
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM task_dependencies GROUP BY task_id, depends_on_id
+            )
+        """))
+        print(f"  [OK] Removed {result.rowcount} duplicate rows")
+
+        print("Creating ix_task_dependencies_task_id_depends_on_id...")
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_task_dependencies_task_id_depends_on_id "
+            "ON task_dependencies (task_id, depends_on_id)"
+        ))
+        print("Creating ix_task_dependencies_depends_on_id...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_task_dependencies_depends_on_id "
+            "ON task_dependencies (depends_on_id)"
+        ))
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
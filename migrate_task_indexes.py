@@ -0,0 +1,55 @@
+"""
+Migration script to add the indexes behind task filtering, sorting and pagination.
+Creates the indexes below, as declared on tasks and task_assignees, where they
+do not exist yet. The julianday() ones are created on SQLite only.
+On PostgreSQL they are built CONCURRENTLY, so the tasks tables stay writable
+while the script runs.
+Run this script once to update the database schema.
+"""
+from sqlalchemy.schema import CreateIndex
+
+from database import engine
+from models import TaskORM, TaskAssigneeORM
+
+INDEXES = (
+    "ix_tasks_created_at_id",
+    "ix_tasks_updated_at_id",
+    "ix_tasks_deadline_id",
+    "ix_tasks_is_approved_created_at_id",
+    "ix_tasks_status_created_at_id",
+    "ix_tasks_assigned_to_status",
+    "ix_tasks_team_id",
+    "ix_tasks_parent_id",
+    "ix_task_assignees_task_id",
+    "ix_task_assignees_user_id_task_id",
+)
+
+SQLITE_INDEXES = (
+    "ix_tasks_created_at_julianday_id",
+    "ix_tasks_updated_at_julianday_id",
+    "ix_tasks_deadline_julianday_id",
+    "ix_tasks_is_approved_created_at_julianday_id",
+    "ix_tasks_status_created_at_julianday_id",
+)
+
+
+def migrate():
+    declared = {
+        index.name: index
+        for table in (TaskORM.__table__, TaskAssigneeORM.__table__)
+        for index in table.indexes
+    }
+    names = INDEXES + (SQLITE_INDEXES if engine.dialect.name == "sqlite" else ())
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. IF NOT EXISTS
+    # rather than checkfirst, which does not see SQLite's expression indexes.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name in names:
+            print(f"Creating {name}...")
+            index = declared[name]
+            index.dialect_kwargs["postgresql_concurrently"] = True
+            conn.execute(CreateIndex(index, if_not_exists=True))
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,38 @@
+"""
+Migration script to add tasks.last_progress_at, used by the daily alert job.
+Backfills it from the latest task_updates row of each task. Safe to run more than once.
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+
+
+def migrate():
+    columns = {c["name"] for c in inspect(engine).get_columns("tasks")}
+
+    with engine.begin() as conn:
+        if "last_progress_at" not in columns:
+            print("Adding last_progress_at column to tasks...")
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN last_progress_at TIMESTAMP"))
+
+        print("Backfilling last_progress_at...")
+        result = conn.execute(text("""
+            UPDATE tasks SET last_progress_at = (
+                SELECT MAX(created_at) FROM task_updates WHERE task_updates.task_id = tasks.id
+            )
+            WHERE last_progress_at IS NULL
+            AND EXISTS (SELECT 1 FROM task_updates WHERE task_updates.task_id = tasks.id)
+        """))
+        print(f"  [OK] Backfilled {result.rowcount} tasks")
+
+        print("Creating ix_tasks_status_last_progress_at...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_status_last_progress_at "
+            "ON tasks (status, last_progress_at)"
+        ))
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
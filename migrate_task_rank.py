@@ -0,0 +1,38 @@
+"""
+Migration script to add tasks.rank, the manual order of tasks within a status
+column, with its (status, rank, id) index. Existing tasks get evenly spaced
+ranks in id order. Safe to run more than once.
+"""
+from sqlalchemy import inspect, text
+
+from database import engine, SessionLocal
+import ranking
+
+
+def migrate():
+    columns = {c["name"] for c in inspect(engine).get_columns("tasks")}
+
+    with engine.begin() as conn:
+        if "rank" not in columns:
+            print("Adding rank column to tasks...")
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN rank VARCHAR(255)"))
+
+        print("Creating ix_tasks_status_rank_id...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_status_rank_id ON tasks (status, rank, id)"
+        ))
+
+    print("Ranking existing tasks...")
+    db = SessionLocal()
+    try:
+        written = ranking.rebalance(db)
+        db.commit()
+        print(f"  [OK] Ranked {sum(written.values())} tasks in {len(written)} columns")
+    finally:
+        db.close()
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
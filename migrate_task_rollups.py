@@ -0,0 +1,27 @@
+"""
+Migration script to create task_rollups and fill it from the task tree.
+Safe to run more than once; later runs only correct rows that drifted.
+"""
+from database import engine, SessionLocal
+from models import TaskRollupORM
+import task_rollups
+
+
+def migrate():
+    print("Creating task_rollups table...")
+    TaskRollupORM.__table__.create(bind=engine, checkfirst=True)
+
+    print("Computing subtree rollups...")
+    db = SessionLocal()
+    try:
+        written = task_rollups.recompute(db)
+        db.commit()
+        print(f"  [OK] Wrote {written} rollups")
+    finally:
+        db.close()
+
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
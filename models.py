@@ -1,7 +1,7 @@
 """
 SQLAlchemy ORM Models and Pydantic Schemas
 """
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, Index, text
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.sql import func
 from database import Base
@@ -30,6 +30,8 @@ class FamilyMemberORM(Base):
     is_active = Column(Boolean, default=True)
     is_online = Column(Boolean, default=False)
     last_seen = Column(DateTime, nullable=True)
+    # Every announcement up to this id has been read (see announcement_reads for later ones)
+    last_seen_announcement_id = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -49,6 +51,7 @@ class ConversationORM(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=True)
+    last_seq = Column(Integer, default=0)  # Sequence number of the latest socket event
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -74,6 +77,10 @@ class ConversationParticipantORM(Base):
 class MessageORM(Base):
     """Chat Message table"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination of a conversation's history walks this index
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
@@ -82,8 +89,9 @@ class MessageORM(Base):
     sender_id = Column(Integer, ForeignKey("family_members.id", ondelete="CASCADE"))
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"))
     reply_to_id = Column(Integer, ForeignKey("messages.id"), nullable=True)
-    deleted_for_ids = Column(Text, nullable=True)  # Comma-separated user IDs
-    is_read = Column(Boolean, default=False)
+    seq = Column(Integer, nullable=True)  # Per-conversation sequence number
+    deleted_for_ids = Column(Text, nullable=True)  # Legacy CSV of user IDs, superseded by message_hidden
+    is_read = Column(Boolean, default=False)  # Legacy global flag, superseded by conversation_reads
     created_at = Column(DateTime, server_default=func.now())
 
     # Relationships
@@ -92,9 +100,69 @@ class MessageORM(Base):
     replies = relationship("MessageORM", backref=backref('parent', remote_side=[id]))
 
 
+class MessageHiddenORM(Base):
+    """Messages a user deleted for themselves ("delete for me")"""
+    __tablename__ = "message_hidden"
+    __table_args__ = (
+        Index("ix_message_hidden_message_id", "message_id"),
+    )
+
+    user_id = Column(Integer, ForeignKey("family_members.id", ondelete="CASCADE"), primary_key=True)
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), primary_key=True)
+    hidden_at = Column(DateTime, server_default=func.now())
+
+
+class ChatChangeORM(Base):
+    """Append-only log of chat changes; its id (from chat_sync_clock) is the watermark for delta sync"""
+    __tablename__ = "chat_changes"
+    __table_args__ = (
+        Index("ix_chat_changes_conversation_id_id", "conversation_id", "id"),
+        Index("ix_chat_changes_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)  # message, delete, hide, join, leave
+    message_id = Column(Integer, nullable=True)  # No FK: tombstones outlive the message
+    user_id = Column(Integer, nullable=True)  # Set for hide (private to the user), join and leave
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class ChatSyncClockORM(Base):
+    """Single row handing out chat_changes ids in commit order"""
+    __tablename__ = "chat_sync_clock"
+
+    id = Column(Integer, primary_key=True)  # Always 1
+    last_change_id = Column(Integer, nullable=False, default=0)
+
+
+class NotificationCounterORM(Base):
+    """Per-user notification badge counts, maintained by the write paths"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("family_members.id", ondelete="CASCADE"), primary_key=True)
+    messages = Column(Integer, nullable=False, default=0)
+    profile = Column(Integer, nullable=False, default=0)
+    home = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class ConversationReadORM(Base):
+    """Per-user read watermark for each conversation"""
+    __tablename__ = "conversation_reads"
+
+    user_id = Column(Integer, ForeignKey("family_members.id", ondelete="CASCADE"), primary_key=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    last_read_message_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class AnnouncementReadORM(Base):
-    """Track read status of announcements"""
+    """Announcements read out of order, above the user's last_seen_announcement_id"""
     __tablename__ = "announcement_reads"
+    __table_args__ = (
+        Index("ix_announcement_reads_user_id_announcement_id", "user_id", "announcement_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("family_members.id", ondelete="CASCADE"), nullable=False)
@@ -151,6 +219,30 @@ class ProjectORM(Base):
 class TaskORM(Base):
     """Tasks table"""
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Task list filters and sorts (see routers/tasks.py)
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        Index("ix_tasks_deadline_id", "deadline", "id"),
+        Index("ix_tasks_proposed_deadline_id", "proposed_deadline", "id"),
+        Index("ix_tasks_is_approved_created_at_id", "is_approved", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tasks_assigned_to_status", "assigned_to", "status"),
+        Index("ix_tasks_team_id", "team_id"),
+        Index("ix_tasks_parent_id", "parent_id"),
+        Index("ix_tasks_status_last_progress_at", "status", "last_progress_at"),
+        Index("ix_tasks_status_rank_id", "status", "rank", "id"),
+        # SQLite sorts timestamps as julianday() values, see sort_column
+        Index("ix_tasks_created_at_julianday_id", text("julianday(created_at)"), "id").ddl_if(dialect="sqlite"),
+        Index("ix_tasks_updated_at_julianday_id", text("julianday(updated_at)"), "id").ddl_if(dialect="sqlite"),
+        Index("ix_tasks_deadline_julianday_id", text("julianday(deadline)"), "id").ddl_if(dialect="sqlite"),
+        Index(
+            "ix_tasks_is_approved_created_at_julianday_id", "is_approved", text("julianday(created_at)"), "id"
+        ).ddl_if(dialect="sqlite"),
+        Index(
+            "ix_tasks_status_created_at_julianday_id", "status", text("julianday(created_at)"), "id"
+        ).ddl_if(dialect="sqlite"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -168,6 +260,8 @@ class TaskORM(Base):
     timeline_notes = Column(Text, nullable=True)
     proposed_deadline = Column(DateTime, nullable=True)
     timeline_status = Column(String(50), default="pending") # pending, confirmed, rejected
+    last_progress_at = Column(DateTime, nullable=True)  # Time of the latest task_updates row
+    rank = Column(String(255), nullable=True)  # Manual order within a status column, see ranking.py
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -188,9 +282,29 @@ class TaskORM(Base):
     dependency_refs = relationship("TaskDependencyORM", foreign_keys="[TaskDependencyORM.task_id]", back_populates="task_obj", cascade="all, delete-orphan")
 
 
+class TaskRollupORM(Base):
+    """Aggregates over a task and all of its subtasks, maintained by the write paths"""
+    __tablename__ = "task_rollups"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    tasks = Column(Integer, nullable=False, default=0)  # Tasks in the subtree, itself included
+    progress = Column(Integer, nullable=False, default=0)  # Sum of progress
+    estimated_hours = Column(Float, nullable=False, default=0)
+    actual_hours = Column(Float, nullable=False, default=0)
+    pending = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    on_hold = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class TaskAssigneeORM(Base):
     """Junction table for multiple assignees on a task"""
     __tablename__ = "task_assignees"
+    __table_args__ = (
+        Index("ix_task_assignees_task_id", "task_id"),
+        Index("ix_task_assignees_user_id_task_id", "user_id", "task_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
@@ -204,6 +318,10 @@ class TaskAssigneeORM(Base):
 class TaskDependencyORM(Base):
     """Junction table for task dependencies"""
     __tablename__ = "task_dependencies"
+    __table_args__ = (
+        Index("ix_task_dependencies_task_id_depends_on_id", "task_id", "depends_on_id", unique=True),
+        Index("ix_task_dependencies_depends_on_id", "depends_on_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
@@ -503,3 +621,44 @@ class ConversationResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class JobLeaseORM(Base):
+    """Lease deciding which worker runs a scheduled job (see scheduler.py)"""
+    __tablename__ = "job_leases"
+
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(100), nullable=True)
+    acquired_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+
+class JobRunORM(Base):
+    """History of scheduled job runs"""
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        Index("ix_job_runs_name_id", "name", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    holder = Column(String(100), nullable=True)
+    status = Column(String(20), nullable=False, default="running")  # running, success, error
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    result = Column(Text, nullable=True)  # JSON summary, or the error message
+
+
+class DeadlineNoticeORM(Base):
+    """Deadline reminders and overdue notices already sent, one per task, kind and deadline"""
+    __tablename__ = "deadline_notices"
+    __table_args__ = (
+        Index("ix_deadline_notices_task_id_kind_deadline", "task_id", "kind", "deadline", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)  # reminder, overdue
+    deadline = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,205 @@
+"""
+Notification Counters: per-user badge counts kept in notification_counters
+Write paths bump or recount the affected users in the same transaction, so
+/notifications/counts is a primary-key read. refresh() recomputes counts from
+the source tables; the reconcile job runs it for everyone to repair drift.
+Once a transaction that touched counters commits, the affected user ids are
+published on the event bus so connected clients get pushed the new counts.
+
+  messages - unread chat messages above the user's read watermarks
+  profile  - pending tasks assigned to the user
+  home     - announcements the user has not read
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import and_, event, exists, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from event_bus import bus
+import task_members
+from models import (
+    NotificationCounterORM, FamilyMemberORM,
+    ConversationParticipantORM, ConversationReadORM, MessageORM, MessageHiddenORM,
+    TaskAssigneeORM, AnnouncementORM, AnnouncementReadORM
+)
+
+COUNTERS = ("messages", "profile", "home")
+
+# Event bus channel announcing which users' counters changed
+COUNTS_CHANNEL = "counts"
+# Beyond this many users, announce "everyone" to stay within NOTIFY limits
+MAX_PUBLISHED_USERS = 500
+
+_TOUCHED = "notification_counters.touched"
+ALL_USERS = "*"
+
+UserIds = Optional[Union[Iterable[int], Select]]
+
+
+def _unread_messages(user_id):
+    return select(func.count(MessageORM.id)).join(
+        ConversationParticipantORM,
+        and_(
+            ConversationParticipantORM.conversation_id == MessageORM.conversation_id,
+            ConversationParticipantORM.user_id == user_id
+        )
+    ).outerjoin(
+        ConversationReadORM,
+        and_(
+            ConversationReadORM.conversation_id == MessageORM.conversation_id,
+            ConversationReadORM.user_id == user_id
+        )
+    ).where(
+        MessageORM.id > func.coalesce(ConversationReadORM.last_read_message_id, 0),
+        MessageORM.sender_id != user_id,
+        ~exists().where(
+            MessageHiddenORM.message_id == MessageORM.id,
+            MessageHiddenORM.user_id == user_id
+        ).correlate_except(MessageHiddenORM)
+    ).scalar_subquery()
+
+
+def _pending_tasks(user_id):
+    return task_members.count_user_tasks(user_id, status="pending")
+
+
+def _unread_announcements(user_id):
+    watermark = select(FamilyMemberORM.last_seen_announcement_id).where(
+        FamilyMemberORM.id == user_id
+    ).correlate_except(FamilyMemberORM).scalar_subquery()
+    return select(func.count(AnnouncementORM.id)).where(
+        AnnouncementORM.id > func.coalesce(watermark, 0),
+        ~exists().where(
+            AnnouncementReadORM.announcement_id == AnnouncementORM.id,
+            AnnouncementReadORM.user_id == user_id
+        ).correlate_except(AnnouncementReadORM)
+    ).scalar_subquery()
+
+
+_SOURCES = {
+    "messages": _unread_messages,
+    "profile": _pending_tasks,
+    "home": _unread_announcements,
+}
+
+
+def _touch(db: Session, user_ids: Iterable):
+    db.info.setdefault(_TOUCHED, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_touched(session: Session):
+    touched = session.info.pop(_TOUCHED, None)
+    if not touched:
+        return
+    if ALL_USERS in touched or len(touched) > MAX_PUBLISHED_USERS:
+        bus.publish_threadsafe(COUNTS_CHANNEL, {"all": True})
+    else:
+        bus.publish_threadsafe(COUNTS_CHANNEL, {"user_ids": sorted(touched)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_touched(session: Session):
+    session.info.pop(_TOUCHED, None)
+
+
+def _scope(column, user_ids: UserIds):
+    if user_ids is None:
+        return True
+    if not isinstance(user_ids, Select):
+        user_ids = list(user_ids)
+    return column.in_(user_ids)
+
+
+def refresh(db: Session, user_ids: UserIds = None, fields: Iterable[str] = COUNTERS) -> int:
+    """
+    Recount the given counters for user_ids (every active user when None),
+    creating missing rows. Only rows that drifted are written. Returns the
+    number of rows corrected. The caller commits.
+    """
+    fields = list(fields)
+    if not fields:
+        return 0
+    if isinstance(user_ids, Select):
+        user_ids = list(db.execute(user_ids).scalars())
+
+    missing = select(FamilyMemberORM.id).where(
+        _scope(FamilyMemberORM.id, user_ids),
+        ~exists().where(NotificationCounterORM.user_id == FamilyMemberORM.id)
+    )
+    if user_ids is None:
+        missing = missing.where(FamilyMemberORM.is_active == True)
+    db.execute(insert(NotificationCounterORM).from_select(["user_id"], missing))
+
+    counter = NotificationCounterORM.__table__.c
+    values = {field: _SOURCES[field](counter.user_id) for field in fields}
+    drifted = or_(*[counter[field] != value for field, value in values.items()])
+    result = db.execute(
+        update(NotificationCounterORM.__table__).where(
+            _scope(counter.user_id, user_ids), drifted
+        ).values(updated_at=datetime.utcnow(), **values)
+    )
+    if result.rowcount:
+        _touch(db, [ALL_USERS] if user_ids is None else user_ids)
+    return result.rowcount
+
+
+def bump_messages(db: Session, conversation_id: int, sender_id: int):
+    """A new message: one more unread for every other participant. The caller commits."""
+    recipients = [user_id for (user_id,) in db.query(ConversationParticipantORM.user_id).filter(
+        ConversationParticipantORM.conversation_id == conversation_id,
+        ConversationParticipantORM.user_id != sender_id
+    )]
+    if not recipients:
+        return
+    db.execute(
+        update(NotificationCounterORM.__table__).where(
+            NotificationCounterORM.user_id.in_(recipients)
+        ).values(messages=NotificationCounterORM.messages + 1, updated_at=datetime.utcnow())
+    )
+    _touch(db, recipients)
+
+
+def bump_home(db: Session):
+    """A new announcement: one more unread for everyone. The caller commits."""
+    db.execute(
+        update(NotificationCounterORM.__table__).values(
+            home=NotificationCounterORM.home + 1, updated_at=datetime.utcnow()
+        )
+    )
+    _touch(db, [ALL_USERS])
+
+
+def participants_of(conversation_id: int) -> Select:
+    """User ids in a conversation, for passing to refresh()"""
+    return select(ConversationParticipantORM.user_id).where(
+        ConversationParticipantORM.conversation_id == conversation_id
+    )
+
+
+def task_users(db: Session, task_id: Union[int, Iterable[int]], *user_ids: Optional[int]) -> set:
+    """
+    The task's assignees plus user_ids: everyone whose pending-task count it
+    can affect. Takes a list of task ids too, for bulk changes.
+    """
+    task_ids = [task_id] if isinstance(task_id, int) else list(task_id)
+    assignees = db.query(TaskAssigneeORM.user_id).filter(TaskAssigneeORM.task_id.in_(task_ids))
+    return {u for u in user_ids if u} | {user_id for (user_id,) in assignees}
+
+
+def get_counts(db: Session, user_id: int) -> Dict[str, int]:
+    """Read a user's counters, computing them on first use"""
+    row = db.get(NotificationCounterORM, user_id)
+    if row is None:
+        refresh(db, [user_id])
+        db.commit()
+        row = db.get(NotificationCounterORM, user_id)
+    return {field: getattr(row, field) for field in COUNTERS}
+
+
+def get_many(db: Session, user_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """Counters for several users in one query; users without a row are omitted"""
+    rows = db.query(NotificationCounterORM).filter(NotificationCounterORM.user_id.in_(user_ids))
+    return {row.user_id: {field: getattr(row, field) for field in COUNTERS} for row in rows}
@@ -0,0 +1,29 @@
+"""
+Cursor Pagination Helpers
+Opaque keyset cursors shared by the list endpoints.
+"""
+import base64
+import json
+
+from fastapi import HTTPException
+
+# Response header carrying the cursor for the next page (CORS exposes all headers)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(data: dict) -> str:
+    """Encode a keyset position into an opaque, URL-safe cursor string"""
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor, rejecting anything malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return data
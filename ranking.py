@@ -0,0 +1,140 @@
+"""
+Ranking: fractional index keys for manual task ordering
+A rank is a string of base-36 digits read as a fraction (0.xyz...) and
+compared as a plain string. There is always room for another key between
+two keys, so moving a task rewrites that task's rank and nothing else. Keys
+never end in "0", which would let two strings stand for the same fraction,
+and use only digits and lowercase letters so any collation orders them the
+same way.
+
+Repeated moves into the same gap make keys longer. rebalance() respaces a
+status column once its keys pass RANK_MAX_LENGTH; the scheduler runs it
+periodically.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from decouple import config
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from models import TaskORM
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+RANK_MAX_LENGTH = config("RANK_MAX_LENGTH", default=12, cast=int)
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    """A key strictly between low and high ("" is the start, None the end)"""
+    if high is not None:
+        # Keep the common prefix, treating missing digits of low as zeros
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else "0") == high[n]:
+            n += 1
+        if n:
+            return high[:n] + _midpoint(low[n:], high[n:])
+
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high else BASE
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    # Adjacent digits: a longer high still leaves its first digit in between
+    if high and len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def _after(rank: str) -> str:
+    """A short key after rank, for appending to the end of a column"""
+    for i, char in enumerate(rank):
+        if char != DIGITS[-1]:
+            return rank[:i] + DIGITS[DIGITS.index(char) + 1]
+    return rank + DIGITS[BASE // 2]
+
+
+def rank_between(before: Optional[str], after: Optional[str]) -> str:
+    """A key that sorts after `before` and before `after`; None stands for either end"""
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Ranks out of order: {before!r} >= {after!r}")
+    if after is None:
+        return _after(before or "")
+    return _midpoint(before or "", after)
+
+
+def spaced_ranks(count: int) -> List[str]:
+    """count evenly spaced keys of the shortest width that fits them"""
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * BASE ** width // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
+
+
+def last_rank(db: Session, status: Optional[str]) -> Optional[str]:
+    return db.query(func.max(TaskORM.rank)).filter(TaskORM.status == status).scalar()
+
+
+def rank_for_new_task(db: Session, status: Optional[str]) -> str:
+    """A rank placing a new task at the end of its status column"""
+    return ranks_at_end(db, status, 1)[0]
+
+
+def ranks_at_end(db: Session, status: Optional[str], count: int) -> List[str]:
+    """
+    count ranks placing tasks, in order, at the end of a status column. Tasks
+    changing column take these too: ranks are only unique within a column.
+    """
+    ranks, rank = [], last_rank(db, status)
+    for _ in range(count):
+        rank = rank_between(rank, None)
+        ranks.append(rank)
+    return ranks
+
+
+def rebalance(db: Session, statuses: Optional[Iterable[str]] = None, max_length: int = RANK_MAX_LENGTH) -> Dict[str, int]:
+    """
+    Respace the ranks of the given status columns, or of every column with a
+    key longer than max_length, a task without a rank or two tasks sharing one. The order within
+    each column is kept (unranked tasks go last, by id). Returns the number
+    of tasks written per status. The caller commits.
+    """
+    if statuses is None:
+        statuses = [
+            status for (status,) in db.query(TaskORM.status).filter(
+                TaskORM.status.isnot(None)
+            ).group_by(TaskORM.status).having(
+                (func.max(func.length(TaskORM.rank)) > max_length) |
+                (func.count(TaskORM.rank) < func.count()) |
+                (func.count(TaskORM.rank.distinct()) < func.count(TaskORM.rank))
+            )
+        ]
+
+    table = TaskORM.__table__
+    written = {}
+    for status in statuses:
+        rows = db.query(TaskORM.id, TaskORM.rank).filter(
+            TaskORM.status == status
+        ).order_by(TaskORM.rank.asc().nulls_last(), TaskORM.id).all()
+        changed = [
+            {"row_id": task_id, "rank": rank}
+            for (task_id, old_rank), rank in zip(rows, spaced_ranks(len(rows)))
+            if rank != old_rank
+        ]
+        if changed:
+            # Leaves updated_at alone: respacing is not a change to the task
+            db.execute(
+                update(table).where(table.c.id == bindparam("row_id")).values(
+                    rank=bindparam("rank"), updated_at=table.c.updated_at
+                ),
+                changed
+            )
+        written[status] = len(changed)
+    return written
@@ -13,6 +13,7 @@ from models import (
     RoleRequestORM, DeletedProjectORM, AdminAuditLogORM, RoleDefinitionORM
 )
 from auth import get_current_admin, get_internal_admin
+from team_chat import add_team_member, remove_team_member
 
 router = APIRouter()
 
@@ -335,12 +336,20 @@ def update_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    was_active = user.is_active
+    
     # Whitelist allowed fields
     allowed_fields = ['username', 'email', 'full_name', 'phone', 'role', 'is_active']
     for field, value in update_data.items():
         if field in allowed_fields:
             setattr(user, field, value)
     
+    # Keep team chat membership in step with activation
+    if user.is_active and not was_active:
+        add_team_member(db, user.id)
+    elif was_active and not user.is_active:
+        remove_team_member(db, user.id)
+    
     db.commit()
     return {"message": "User updated successfully"}
 
@@ -357,6 +366,8 @@ def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    remove_team_member(db, user.id)
+    
     if hard_delete:
         db.delete(user)
         db.commit()
@@ -493,14 +504,26 @@ def admin_delete_message(
     db: Session = Depends(get_db)
 ):
     """Hard delete a message (admin)"""
-    from models import MessageORM
+    from models import MessageORM, MessageHiddenORM
+    from routers.chat import claim_seq, broadcast_delete
+    import chat_sync
+    import notification_counters
     
     msg = db.query(MessageORM).filter(MessageORM.id == message_id).first()
     if not msg:
         raise HTTPException(status_code=404, detail="Message not found")
     
+    conversation_id, message_seq = msg.conversation_id, msg.seq
+    seq = claim_seq(db, conversation_id)
+    db.query(MessageHiddenORM).filter(MessageHiddenORM.message_id == msg.id).delete()
+    chat_sync.record_change(db, conversation_id, chat_sync.DELETE, message_id=msg.id)
     db.delete(msg)
+    db.flush()
+    notification_counters.refresh(
+        db, notification_counters.participants_of(conversation_id), ("messages",)
+    )
     db.commit()
+    broadcast_delete(conversation_id, message_id, message_seq, seq)
     
     return {"message": "Message deleted successfully"}
 # =============================================================================
@@ -550,6 +573,15 @@ def health_check_storage(
     }
 
 
+@router.get("/health/sockets")
+def health_check_sockets(
+    current_admin: FamilyMember = Depends(get_current_admin)
+):
+    """Chat socket queue depth and delivery counters on this worker"""
+    from ws import manager
+    return manager.metrics()
+
+
 @router.get("/health/all")
 def health_check_all(
     current_admin: FamilyMember = Depends(get_current_admin),
@@ -10,6 +10,7 @@ from datetime import datetime
 from database import get_db
 from models import FamilyMemberORM, FamilyMember, AnnouncementORM
 from auth import get_current_admin
+import notification_counters
 
 router = APIRouter()
 
@@ -92,6 +93,7 @@ def create_announcement(
         created_by=current_admin.id
     )
     db.add(db_announcement)
+    notification_counters.bump_home(db)
     db.commit()
     db.refresh(db_announcement)
     
@@ -168,6 +170,8 @@ def delete_announcement(
         raise HTTPException(status_code=404, detail="Announcement not found")
     
     db.delete(db_announcement)
+    db.flush()
+    notification_counters.refresh(db, fields=("home",))
     db.commit()
     
     return {"message": "Announcement deleted successfully"}
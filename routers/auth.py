@@ -9,6 +9,7 @@ from pydantic import BaseModel
 from database import get_db
 from models import FamilyMemberORM
 from auth import create_access_token, get_password_hash, verify_password, ACCESS_TOKEN_EXPIRE_MINUTES
+from team_chat import add_team_member
 
 router = APIRouter()
 
@@ -77,6 +78,8 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
+    db.flush()
+    add_team_member(db, db_user.id)
     db.commit()
     db.refresh(db_user)
     
@@ -1,21 +1,41 @@
 """
 Chat Router: Conversations and Messages endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import or_, and_, exists, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Dict
 from datetime import datetime
+import json
+import logging
 
-from database import get_db
+from database import get_db, SessionLocal
 from models import (
     FamilyMemberORM, FamilyMember, 
-    ConversationORM, ConversationParticipantORM, MessageORM
+    ConversationORM, ConversationParticipantORM, MessageORM, MessageHiddenORM
 )
 from auth import get_current_user
+from team_chat import get_team_conversation, add_team_member, is_participant
+import chat_sync
+import chat_reads
+import notification_counters
+from pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from routers.live_calling import get_current_user_ws
+from ws import manager
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+MESSAGE_PAGE_DEFAULT = 50
+MESSAGE_PAGE_MAX = 200
+CONVERSATION_PAGE_DEFAULT = 30
+CONVERSATION_PAGE_MAX = 100
+SYNC_BATCH_DEFAULT = 500
+SYNC_BATCH_MAX = 2000
+
 
 # =============================================================================
 # Request/Response Schemas
@@ -43,6 +63,7 @@ class MessageResponse(BaseModel):
     sender_username: str
     conversation_id: int
     reply_to_id: Optional[int] = None
+    seq: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -67,6 +88,146 @@ class ConversationResponse(BaseModel):
         from_attributes = True
 
 
+class ConversationSummary(BaseModel):
+    id: int
+    title: Optional[str] = None
+    participants: List[ParticipantInfo]
+    last_message: Optional[MessageResponse] = None
+    unread_count: int = 0
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class Tombstone(BaseModel):
+    message_id: int
+    conversation_id: int
+    scope: str  # "all" (deleted for everyone) or "me" (deleted for this user)
+    deleted_at: datetime
+
+
+class MembershipChange(BaseModel):
+    conversation_id: int
+    user_id: int
+    action: str  # "join" or "leave"
+    changed_at: datetime
+
+
+class SyncResponse(BaseModel):
+    messages: List[MessageResponse]
+    tombstones: List[Tombstone]
+    memberships: List[MembershipChange]
+    next_since: int
+    has_more: bool
+    resync: bool = False
+
+
+# =============================================================================
+# Helper Functions
+# =============================================================================
+
+def visible_to(user_id: int):
+    """SQL anti-join excluding messages the user deleted for themselves"""
+    return ~exists().where(
+        MessageHiddenORM.message_id == MessageORM.id,
+        MessageHiddenORM.user_id == user_id
+    )
+
+
+def serialize_messages(messages: List[MessageORM], db: Session) -> List[MessageResponse]:
+    """Build message responses, loading all senders with a single query"""
+    sender_ids = {m.sender_id for m in messages}
+    usernames = {}
+    if sender_ids:
+        usernames = dict(db.query(FamilyMemberORM.id, FamilyMemberORM.username).filter(
+            FamilyMemberORM.id.in_(sender_ids)
+        ).all())
+
+    return [
+        MessageResponse(
+            id=msg.id,
+            content=msg.content,
+            message_type=msg.message_type,
+            file_url=msg.file_url,
+            sender_id=msg.sender_id,
+            sender_username=usernames.get(msg.sender_id, "Unknown"),
+            conversation_id=msg.conversation_id,
+            reply_to_id=msg.reply_to_id,
+            seq=msg.seq,
+            created_at=msg.created_at
+        )
+        for msg in messages
+    ]
+
+
+def load_participants(db: Session, conversation_ids: List[int]) -> Dict[int, List[ParticipantInfo]]:
+    """Participants of several conversations, keyed by conversation, in one query"""
+    participants: Dict[int, List[ParticipantInfo]] = {cid: [] for cid in conversation_ids}
+    if not conversation_ids:
+        return participants
+
+    rows = db.query(
+        ConversationParticipantORM.conversation_id,
+        FamilyMemberORM.id,
+        FamilyMemberORM.username,
+        FamilyMemberORM.full_name
+    ).join(
+        FamilyMemberORM, FamilyMemberORM.id == ConversationParticipantORM.user_id
+    ).filter(
+        ConversationParticipantORM.conversation_id.in_(conversation_ids)
+    ).all()
+
+    for conversation_id, user_id, username, full_name in rows:
+        participants[conversation_id].append(ParticipantInfo(
+            id=user_id,
+            username=username,
+            full_name=full_name
+        ))
+    return participants
+
+
+def fetch_message_page(
+    db: Session,
+    conversation_id: int,
+    user_id: int,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = MESSAGE_PAGE_DEFAULT
+):
+    """
+    Keyset page over (conversation_id, id), returned oldest first.
+
+    Without before_id/after_id the newest `limit` messages are returned.
+    Returns (messages, next_cursor); next_cursor is None when the page is the last
+    one in the requested direction.
+    """
+    query = db.query(MessageORM).filter(
+        MessageORM.conversation_id == conversation_id,
+        visible_to(user_id)
+    )
+
+    if after_id is not None:
+        rows = query.filter(MessageORM.id > after_id).order_by(
+            MessageORM.id.asc()
+        ).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor({
+            "conversation_id": conversation_id, "after_id": rows[-1].id
+        }) if has_more else None
+        return rows, next_cursor
+
+    if before_id is not None:
+        query = query.filter(MessageORM.id < before_id)
+    rows = query.order_by(MessageORM.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    next_cursor = encode_cursor({
+        "conversation_id": conversation_id, "before_id": rows[0].id
+    }) if has_more else None
+    return rows, next_cursor
+
+
 # =============================================================================
 # Endpoints
 # =============================================================================
@@ -94,6 +255,7 @@ def create_conversation(
         user_id=current_user.id
     )
     db.add(current_participant)
+    chat_sync.record_change(db, db_conv.id, chat_sync.JOIN, user_id=current_user.id)
     
     # Add other participants
     participants = []
@@ -105,6 +267,7 @@ def create_conversation(
                 user_id=user_id
             )
             db.add(participant)
+            chat_sync.record_change(db, db_conv.id, chat_sync.JOIN, user_id=user_id)
             participants.append(ParticipantInfo(
                 id=user.id,
                 username=user.username,
@@ -152,45 +315,130 @@ def get_conversations(
         ConversationORM.id.in_(conv_ids)
     ).all()
     
-    result = []
-    for conv in conversations:
-        # Get participants
-        participants = []
-        for p in conv.participants:
-            user = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == p.user_id).first()
-            if user:
-                participants.append(ParticipantInfo(
-                    id=user.id,
-                    username=user.username,
-                    full_name=user.full_name
-                ))
-        
-        # Get messages
-        messages = []
-        for msg in conv.messages:
-            sender = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == msg.sender_id).first()
-            messages.append(MessageResponse(
-                id=msg.id,
-                content=msg.content,
-                message_type=msg.message_type,
-                file_url=msg.file_url,
-                sender_id=msg.sender_id,
-                sender_username=sender.username if sender else "Unknown",
-                conversation_id=msg.conversation_id,
-                reply_to_id=msg.reply_to_id,
-                created_at=msg.created_at
-            ))
-        
-        result.append(ConversationResponse(
+    participants = load_participants(db, conv_ids)
+
+    # Get messages of all conversations at once
+    all_messages = db.query(MessageORM).filter(
+        MessageORM.conversation_id.in_(conv_ids),
+        visible_to(current_user.id)
+    ).order_by(MessageORM.id).all()
+
+    messages_by_conv: Dict[int, List[MessageResponse]] = {cid: [] for cid in conv_ids}
+    for msg in serialize_messages(all_messages, db):
+        messages_by_conv[msg.conversation_id].append(msg)
+
+    return [
+        ConversationResponse(
             id=conv.id,
             title=conv.title,
-            participants=participants,
-            messages=messages,
+            participants=participants[conv.id],
+            messages=messages_by_conv[conv.id],
             created_at=conv.created_at,
             updated_at=conv.updated_at
+        )
+        for conv in conversations
+    ]
+
+
+@router.get("/conversations/summaries", response_model=List[ConversationSummary])
+def get_conversation_summaries(
+    response: Response,
+    limit: int = Query(CONVERSATION_PAGE_DEFAULT, ge=1, le=CONVERSATION_PAGE_MAX),
+    cursor: Optional[str] = None,
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sidebar view of the current user's conversations, most recently active first.
+
+    Each entry carries the participants, the last visible message and the unread
+    count, fetched with a fixed number of set-based queries per page. When more
+    conversations exist, the X-Next-Cursor header holds the cursor for the next page.
+    """
+    # Conversations that were never updated sort by when they were created
+    active_at = func.coalesce(ConversationORM.updated_at, ConversationORM.created_at)
+    query = db.query(ConversationORM).join(
+        ConversationParticipantORM,
+        ConversationParticipantORM.conversation_id == ConversationORM.id
+    ).filter(
+        ConversationParticipantORM.user_id == current_user.id
+    )
+
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            updated_at = datetime.fromisoformat(position["updated_at"])
+            last_id = int(position["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(or_(
+            active_at < updated_at,
+            and_(active_at == updated_at, ConversationORM.id < last_id)
         ))
-    
-    return result
+
+    conversations = query.order_by(
+        active_at.desc(), ConversationORM.id.desc()
+    ).limit(limit + 1).all()
+
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        last = conversations[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({
+            "updated_at": (last.updated_at or last.created_at).isoformat(), "id": last.id
+        })
+
+    conv_ids = [c.id for c in conversations]
+    if not conv_ids:
+        return []
+
+    participants = load_participants(db, conv_ids)
+
+    # Last visible message per conversation
+    last_ids = db.query(func.max(MessageORM.id)).filter(
+        MessageORM.conversation_id.in_(conv_ids),
+        visible_to(current_user.id)
+    ).group_by(MessageORM.conversation_id)
+    last_messages = db.query(MessageORM).filter(MessageORM.id.in_(last_ids)).all()
+    last_by_conv = {m.conversation_id: m for m in serialize_messages(last_messages, db)}
+
+    # Unread messages from other participants, per conversation
+    unread = chat_reads.unread_counts(db, current_user.id, conv_ids)
+
+    return [
+        ConversationSummary(
+            id=conv.id,
+            title=conv.title,
+            participants=participants[conv.id],
+            last_message=last_by_conv.get(conv.id),
+            unread_count=unread.get(conv.id, 0),
+            created_at=conv.created_at,
+            updated_at=conv.updated_at or conv.created_at
+        )
+        for conv in conversations
+    ]
+
+
+def claim_seq(db: Session, conversation_id: int, updated_at: Optional[datetime] = None) -> int:
+    """
+    Claim the next sequence number of a conversation's socket events; the row
+    lock serializes concurrent writers. updated_at also marks it active.
+    """
+    db.query(ConversationORM).filter(ConversationORM.id == conversation_id).update({
+        ConversationORM.last_seq: func.coalesce(ConversationORM.last_seq, 0) + 1,
+        ConversationORM.updated_at: updated_at or ConversationORM.updated_at
+    }, synchronize_session=False)
+    return db.query(ConversationORM.last_seq).filter(ConversationORM.id == conversation_id).scalar()
+
+
+def broadcast_delete(conversation_id: int, message_id: int, message_seq: Optional[int], seq: int):
+    """Tell subscribers a message was deleted for everyone, once that is committed"""
+    manager.broadcast_threadsafe(json.dumps({
+        "type": "delete",
+        "conversation_id": conversation_id,
+        "seq": seq,
+        "message_id": message_id,
+        "message_seq": message_seq
+    }), conversation_id, seq=seq)
 
 
 @router.post("/messages", response_model=MessageResponse)
@@ -214,6 +462,9 @@ def send_message(
     if not participant:
         raise HTTPException(status_code=403, detail="Not authorized to send message in this conversation")
     
+    now = datetime.utcnow()
+    seq = claim_seq(db, conv.id, updated_at=now)
+    
     # Create message
     db_msg = MessageORM(
         content=msg.content,
@@ -222,39 +473,56 @@ def send_message(
         sender_id=current_user.id,
         conversation_id=msg.conversation_id,
         reply_to_id=msg.reply_to_id,
-        created_at=datetime.utcnow()
+        seq=seq,
+        created_at=now
     )
     db.add(db_msg)
-    
-    # Update conversation timestamp
-    conv.updated_at = datetime.utcnow()
+    db.flush()
+    chat_sync.record_change(db, db_msg.conversation_id, chat_sync.MESSAGE, message_id=db_msg.id)
+    notification_counters.bump_messages(db, db_msg.conversation_id, current_user.id)
     
     db.commit()
     db.refresh(db_msg)
     
-    # Get sender username
-    sender = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == current_user.id).first()
+    response = serialize_messages([db_msg], db)[0]
     
-    return MessageResponse(
-        id=db_msg.id,
-        content=db_msg.content,
-        message_type=db_msg.message_type,
-        file_url=db_msg.file_url,
-        sender_id=db_msg.sender_id,
-        sender_username=sender.username if sender else "Unknown",
-        conversation_id=db_msg.conversation_id,
-        reply_to_id=db_msg.reply_to_id,
-        created_at=db_msg.created_at
-    )
+    # Push to subscribers now that the message is committed
+    manager.broadcast_threadsafe(json.dumps({
+        "type": "message",
+        "conversation_id": response.conversation_id,
+        "seq": response.seq,
+        "message": response.model_dump(mode="json")
+    }), response.conversation_id, seq=response.seq)
+    
+    return response
 
 
 @router.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
 def get_messages(
     conversation_id: int,
+    response: Response,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(MESSAGE_PAGE_DEFAULT, ge=1, le=MESSAGE_PAGE_MAX),
+    cursor: Optional[str] = None,
     current_user: FamilyMember = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get messages for a conversation"""
+    """
+    Get a page of messages for a conversation, oldest first.
+
+    Without arguments the newest `limit` messages are returned. `before_id` scrolls
+    back, `after_id` fetches newer messages. When more messages exist in that
+    direction, an opaque cursor is returned in the X-Next-Cursor header; pass it
+    back as `cursor` to continue.
+    """
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("conversation_id") != conversation_id:
+            raise HTTPException(status_code=400, detail="Cursor does not belong to this conversation")
+        before_id = position.get("before_id")
+        after_id = position.get("after_id")
+
     # Check if conversation exists
     conv = db.query(ConversationORM).filter(ConversationORM.id == conversation_id).first()
     if not conv:
@@ -269,34 +537,103 @@ def get_messages(
     if not participant:
         raise HTTPException(status_code=403, detail="Not authorized to view this conversation")
     
-    # Get messages
-    all_messages = db.query(MessageORM).filter(
-        MessageORM.conversation_id == conversation_id
-    ).order_by(MessageORM.created_at).all()
+    messages, next_cursor = fetch_message_page(
+        db, conversation_id, current_user.id,
+        before_id=before_id, after_id=after_id, limit=limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
-    # Filter out messages deleted for this user
+    return serialize_messages(messages, db)
+
+
+@router.post("/conversations/{conversation_id}/read")
+def mark_conversation_read(
+    conversation_id: int,
+    message_id: Optional[int] = Query(None, ge=1),
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Mark a conversation read up to message_id, or up to its latest message.
+    The read position only ever moves forward.
+    """
+    if not is_participant(db, conversation_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a participant in this conversation")
+
+    chat_reads.mark_read(db, current_user.id, conversation_id, message_id)
+    notification_counters.refresh(db, [current_user.id], ("messages",))
+    db.commit()
+    return {"status": "success"}
+
+
+@router.get("/sync", response_model=SyncResponse)
+def sync_changes(
+    since: Optional[int] = None,
+    limit: int = Query(SYNC_BATCH_DEFAULT, ge=1, le=SYNC_BATCH_MAX),
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Everything that changed in the user's conversations after watermark `since`:
+    new messages, tombstones for deleted messages and membership changes.
+
+    Call without `since` to get the current watermark, then keep passing back
+    `next_since`. When `has_more` is true, call again straight away. When
+    `resync` is true, `since` is older than the retained change log: reload the
+    conversations and continue from `next_since`.
+    """
+    if since is None:
+        return SyncResponse(
+            messages=[], tombstones=[], memberships=[],
+            next_since=chat_sync.current_watermark(db), has_more=False
+        )
+
+    if chat_sync.is_purged(db, since):
+        return SyncResponse(
+            messages=[], tombstones=[], memberships=[],
+            next_since=chat_sync.current_watermark(db), has_more=False, resync=True
+        )
+
+    changes = chat_sync.changes_since(db, current_user.id, since, limit)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # Messages that were deleted since are skipped; their tombstone follows in the batch
+    message_ids = [c.message_id for c in changes if c.kind == chat_sync.MESSAGE]
     messages = []
-    for m in all_messages:
-        deleted_ids = m.deleted_for_ids.split(",") if m.deleted_for_ids else []
-        if str(current_user.id) not in deleted_ids:
-            messages.append(m)
-    
-    result = []
-    for msg in messages:
-        sender = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == msg.sender_id).first()
-        result.append(MessageResponse(
-            id=msg.id,
-            content=msg.content,
-            message_type=msg.message_type,
-            file_url=msg.file_url,
-            sender_id=msg.sender_id,
-            sender_username=sender.username if sender else "Unknown",
-            conversation_id=msg.conversation_id,
-            reply_to_id=msg.reply_to_id,
-            created_at=msg.created_at
-        ))
-    
-    return result
+    if message_ids:
+        messages = db.query(MessageORM).filter(
+            MessageORM.id.in_(message_ids),
+            visible_to(current_user.id)
+        ).order_by(MessageORM.id).all()
+
+    tombstones = [
+        Tombstone(
+            message_id=c.message_id,
+            conversation_id=c.conversation_id,
+            scope="all" if c.kind == chat_sync.DELETE else "me",
+            deleted_at=c.created_at
+        )
+        for c in changes if c.kind in (chat_sync.DELETE, chat_sync.HIDE)
+    ]
+    memberships = [
+        MembershipChange(
+            conversation_id=c.conversation_id,
+            user_id=c.user_id,
+            action=c.kind,
+            changed_at=c.created_at
+        )
+        for c in changes if c.kind in (chat_sync.JOIN, chat_sync.LEAVE)
+    ]
+
+    return SyncResponse(
+        messages=serialize_messages(messages, db),
+        tombstones=tombstones,
+        memberships=memberships,
+        next_since=changes[-1].id if changes else since,
+        has_more=has_more
+    )
 
 
 @router.delete("/messages/{message_id}")
@@ -332,110 +669,114 @@ def delete_message(
         # However, to avoid breaking reply chains or "phantom" messages, often we just set content to "[Deleted]" or remove it.
         # But commonly "Delete for all" removes the row if we don't care about history.
         # Let's remove the row.
+        conversation_id, message_seq = msg.conversation_id, msg.seq
+        seq = claim_seq(db, conversation_id)
+        db.query(MessageHiddenORM).filter(MessageHiddenORM.message_id == msg.id).delete()
+        chat_sync.record_change(db, conversation_id, chat_sync.DELETE, message_id=msg.id)
         db.delete(msg)
+        db.flush()
+        notification_counters.refresh(
+            db, notification_counters.participants_of(conversation_id), ("messages",)
+        )
         db.commit()
+        broadcast_delete(conversation_id, message_id, message_seq, seq)
         return {"status": "deleted_for_all"}
 
     elif delete_type == "for_me":
-        # Add user ID to deleted_for_ids
-        current_deleted_ids = msg.deleted_for_ids.split(",") if msg.deleted_for_ids else []
-        if str(current_user.id) not in current_deleted_ids:
-            current_deleted_ids.append(str(current_user.id))
-            msg.deleted_for_ids = ",".join(current_deleted_ids)
+        # One row per (user, message); a concurrent duplicate just hits the primary key
+        db.add(MessageHiddenORM(user_id=current_user.id, message_id=msg.id))
+        chat_sync.record_change(
+            db, msg.conversation_id, chat_sync.HIDE, message_id=msg.id, user_id=current_user.id
+        )
+        try:
+            db.flush()
+            notification_counters.refresh(db, [current_user.id], ("messages",))
             db.commit()
+        except IntegrityError:
+            db.rollback()
         return {"status": "deleted_for_me"}
     
     raise HTTPException(status_code=400, detail="Invalid delete_type")
 @router.get("/team-conversation", response_model=ConversationResponse)
 def get_or_create_team_conversation(
+    response: Response,
+    limit: int = Query(MESSAGE_PAGE_DEFAULT, ge=1, le=MESSAGE_PAGE_MAX),
     current_user: FamilyMember = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get or create the global team conversation that includes ALL users.
+
+    Membership is kept current by the user create/activate/deactivate hooks in
+    team_chat, so this only returns the participants and the newest page of
+    messages. Older messages are loaded from the messages endpoint with the
+    cursor in the X-Next-Cursor header.
     """
-    team_title = "THE GREATEST TEAM"
-    
-    # Try to find existing team conversation by title
-    team_conv = db.query(ConversationORM).filter(
-        ConversationORM.title == team_title
-    ).first()
-    
-    if not team_conv:
-        # Create it if it doesn't exist
-        team_conv = ConversationORM(
-            title=team_title,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        db.add(team_conv)
-        db.commit()
-        db.refresh(team_conv)
+    team_conv = get_team_conversation(db)
     
-    # Ensure current user is a participant
-    participant = db.query(ConversationParticipantORM).filter(
-        ConversationParticipantORM.conversation_id == team_conv.id,
-        ConversationParticipantORM.user_id == current_user.id
-    ).first()
+    # Ensure current user is a participant (covers users created before the hooks)
+    if current_user.is_active and not is_participant(db, team_conv.id, current_user.id):
+        add_team_member(db, current_user.id)
+    db.commit()  # Also keeps the conversation if this request created it
     
-    if not participant:
-        participant = ConversationParticipantORM(
-            conversation_id=team_conv.id,
-            user_id=current_user.id
-        )
-        db.add(participant)
-        db.commit()
-    
-    # Ensure all other active users are also participants (sync logic)
-    # This keeps the team chat populated automatically
-    all_users = db.query(FamilyMemberORM).filter(FamilyMemberORM.is_active == True).all()
-    existing_participant_ids = db.query(ConversationParticipantORM.user_id).filter(
-        ConversationParticipantORM.conversation_id == team_conv.id
-    ).all()
-    existing_participant_ids = [p[0] for p in existing_participant_ids]
-    
-    for u in all_users:
-        if u.id not in existing_participant_ids:
-            new_p = ConversationParticipantORM(
-                conversation_id=team_conv.id,
-                user_id=u.id
-            )
-            db.add(new_p)
-    
-    db.commit()
-    db.refresh(team_conv)
-    
-    # Construct response
-    participants = []
-    for p in team_conv.participants:
-        user = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == p.user_id).first()
-        if user:
-            participants.append(ParticipantInfo(
-                id=user.id,
-                username=user.username,
-                full_name=user.full_name
-            ))
-            
-    messages = []
-    for msg in team_conv.messages:
-        sender = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == msg.sender_id).first()
-        messages.append(MessageResponse(
-            id=msg.id,
-            content=msg.content,
-            message_type=msg.message_type,
-            file_url=msg.file_url,
-            sender_id=msg.sender_id,
-            sender_username=sender.username if sender else "Unknown",
-            conversation_id=msg.conversation_id,
-            reply_to_id=msg.reply_to_id,
-            created_at=msg.created_at
-        ))
+    participants = load_participants(db, [team_conv.id])[team_conv.id]
+    messages, next_cursor = fetch_message_page(db, team_conv.id, current_user.id, limit=limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
     return ConversationResponse(
         id=team_conv.id,
         title=team_conv.title,
         participants=participants,
-        messages=messages,
+        messages=serialize_messages(messages, db),
         created_at=team_conv.created_at,
         updated_at=team_conv.updated_at
     )
+
+
+@router.websocket("/ws/{conversation_id}")
+async def conversation_socket(
+    websocket: WebSocket,
+    conversation_id: int,
+    token: Optional[str] = Query(None),
+    last_seq: Optional[int] = Query(None)
+):
+    """
+    Real-time feed of a conversation. Each new message arrives as
+    {"type": "message", "conversation_id", "seq", "message"}, and a message
+    deleted for everyone as {"type": "delete", "conversation_id", "seq",
+    "message_id", "message_seq"}, message_seq being the deleted message's own
+    seq. seq increases by one per event so clients can spot gaps.
+
+    When reconnecting, pass the last seq received as `last_seq` to have the
+    missed events replayed. If they are no longer buffered, a
+    {"type": "resync"} event is sent instead and the client should fetch the
+    gap from /chat/sync, which also carries deletions.
+    """
+    user_id = await get_current_user_ws(token)
+    if not user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    db = SessionLocal()
+    try:
+        allowed = is_participant(db, conversation_id, user_id)
+        current_seq = db.query(ConversationORM.last_seq).filter(
+            ConversationORM.id == conversation_id
+        ).scalar()
+    finally:
+        db.close()
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await manager.connect(websocket, conversation_id, last_seq=last_seq, current_seq=current_seq or 0)
+    try:
+        while True:
+            # Nothing is expected from the client; reading keeps the socket alive
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        await manager.disconnect(websocket, conversation_id)
+    except Exception as e:
+        logger.error(f"Chat socket error in conversation {conversation_id}: {e}")
+        await manager.disconnect(websocket, conversation_id)
@@ -1,9 +1,13 @@
 """
 Live Calling Router: WebSocket Signaling for WebRTC
 """
+import asyncio
 import json
 import logging
-from typing import Dict, List, Optional
+import time
+import uuid
+from functools import partial
+from typing import Dict, List, Optional, Set, Tuple
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends, status
 from jose import JWTError, jwt
 from decouple import config
@@ -11,22 +15,81 @@ from decouple import config
 from auth import SECRET_KEY, ALGORITHM
 from database import SessionLocal
 from models import FamilyMemberORM
+from event_bus import bus
+from counts_push import pusher as counts_pusher
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Event bus channel carrying signaling messages between workers
+SIGNALING_CHANNEL = "signaling"
+# Event bus channel on which workers announce their connected users
+PRESENCE_CHANNEL = "presence"
+# Workers re-announce this often; a worker not heard from for three intervals
+# (e.g. it crashed) is treated as having no users
+SIGNALING_PRESENCE_INTERVAL = config("SIGNALING_PRESENCE_INTERVAL", default=30, cast=float)
+
 # =============================================================================
 # Connection Manager
 # =============================================================================
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, event_bus=None, presence_interval: float = SIGNALING_PRESENCE_INTERVAL):
         # Store active connections: {user_id: WebSocket}
         # Assuming one connection per user for simplicity.
         # If multiple tabs, we might need a list, but for calling, usually one active device is best.
         self.active_connections: Dict[int, WebSocket] = {}
+        self.worker = uuid.uuid4().hex
+        self.presence_interval = presence_interval
+        # Users connected to other workers: {worker: (user ids, when last announced)}
+        self.remote: Dict[str, Tuple[Set[int], float]] = {}
+        self._presence_task: Optional[asyncio.Task] = None
+        # The target may be connected to another worker, so route through the bus
+        self.bus = event_bus or bus
+        self.bus.subscribe(SIGNALING_CHANNEL, self._on_signaling_event)
+        self.bus.subscribe(PRESENCE_CHANNEL, self._on_presence_event)
+
+    async def start_presence(self):
+        """Ask the other workers for their users, then keep announcing ours"""
+        await self.bus.publish(PRESENCE_CHANNEL, {"worker": self.worker, "hello": True})
+        self._presence_task = asyncio.create_task(self._announce_forever())
+
+    async def stop_presence(self):
+        if self._presence_task:
+            self._presence_task.cancel()
+            self._presence_task = None
+        self.active_connections.clear()
+        await self.announce()
+
+    async def announce(self):
+        """Publish the full set of users connected to this worker"""
+        await self.bus.publish(PRESENCE_CHANNEL, {
+            "worker": self.worker, "users": list(self.active_connections)
+        })
+
+    async def _announce_forever(self):
+        while True:
+            await asyncio.sleep(self.presence_interval)
+            try:
+                await self.announce()
+            except Exception as e:
+                logger.error(f"Presence announcement failed: {e}")
+
+    async def _on_presence_event(self, event: dict):
+        worker = event["worker"]
+        if worker == self.worker:
+            return
+        if event.get("hello"):
+            # A worker just started and knows nobody yet
+            await self.announce()
+            return
+        users = set(event.get("users") or ())
+        if users:
+            self.remote[worker] = (users, time.monotonic())
+        else:
+            self.remote.pop(worker, None)
 
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
@@ -42,13 +105,31 @@ class ConnectionManager:
              pass
         self.active_connections[user_id] = websocket
         logger.info(f"User {user_id} connected to signaling.")
+        await self.announce()
 
-    def disconnect(self, user_id: int):
+    async def disconnect(self, user_id: int):
         if user_id in self.active_connections:
             del self.active_connections[user_id]
             logger.info(f"User {user_id} disconnected from signaling.")
+            await self.announce()
+
+    def is_reachable(self, user_id: int) -> bool:
+        """Whether the user is connected to this worker or, as last announced, another one"""
+        if user_id in self.active_connections:
+            return True
+        expired = time.monotonic() - 3 * self.presence_interval
+        return any(
+            user_id in users and announced > expired
+            for users, announced in self.remote.values()
+        )
 
     async def send_personal_message(self, message: dict, user_id: int):
+        await self.bus.publish(SIGNALING_CHANNEL, {"user_id": user_id, "message": message})
+
+    async def _on_signaling_event(self, event: dict):
+        await self._deliver(event["message"], event["user_id"])
+
+    async def _deliver(self, message: dict, user_id: int):
         if user_id in self.active_connections:
             websocket = self.active_connections[user_id]
             try:
@@ -93,6 +174,10 @@ async def get_current_user_ws(
     
     return None
 
+async def send_counts(websocket: WebSocket, counts: Dict[str, int]):
+    """Push changed notification counts to a signaling socket"""
+    await websocket.send_text(json.dumps({"type": "counts", "counts": counts}))
+
 # =============================================================================
 # WebSocket Endpoint
 # =============================================================================
@@ -101,6 +186,8 @@ async def get_current_user_ws(
 async def websocket_signaling(workspace: WebSocket, token: Optional[str] = Query(None)):
     """
     Signaling endpoint for WebRTC.
+    Also pushes {"type": "counts"} messages: the full notification counts on
+    connect, then only the counts that changed.
     """
     user_id = await get_current_user_ws(token)
     
@@ -110,6 +197,7 @@ async def websocket_signaling(workspace: WebSocket, token: Optional[str] = Query
         return
 
     await manager.connect(workspace, user_id)
+    counts_watcher = await counts_pusher.watch(user_id, partial(send_counts, workspace))
 
     try:
         while True:
@@ -138,7 +226,7 @@ async def websocket_signaling(workspace: WebSocket, token: Optional[str] = Query
                     }
                     
                     # Send to target
-                    if target_user_id in manager.active_connections:
+                    if manager.is_reachable(target_user_id):
                         await manager.send_personal_message(forward_payload, target_user_id)
                     else:
                         # Target not online
@@ -154,7 +242,9 @@ async def websocket_signaling(workspace: WebSocket, token: Optional[str] = Query
                 logger.error(f"Error handling message: {e}")
 
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        await manager.disconnect(user_id)
     except Exception as e:
         logger.error(f"WebSocket fatal error: {e}")
-        manager.disconnect(user_id)
+        await manager.disconnect(user_id)
+    finally:
+        counts_pusher.unwatch(counts_watcher)
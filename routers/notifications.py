@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Dict
+from sqlalchemy import func, exists
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, Optional
 
 from database import get_db
-from models import (
-    FamilyMember, MessageORM, TaskORM, TaskAssigneeORM, 
-    AnnouncementORM, AnnouncementReadORM
-)
+from models import FamilyMember, FamilyMemberORM, AnnouncementORM, AnnouncementReadORM
 from auth import get_current_user
+import chat_reads
+import notification_counters
+from counts_push import pusher as counts_pusher, COUNTS_POLL_TIMEOUT
 
 router = APIRouter()
 
@@ -18,51 +19,30 @@ def get_notification_counts(
     db: Session = Depends(get_db)
 ):
     """Get unread counts for messages, profile (tasks), and home (announcements)"""
-    
-    # 1. Unread Messages (where current user is NOT the sender, and is_read is False)
-    # This is tricky without a direct 'recipient' field on messages in a group chat context.
-    # Assuming for now we check messages in conversations the user is part of.
-    # Ideally, we should have a MessageRead status per user per message for group chats.
-    # For a simple "1-on-1" or small group style, we can check messages not sent by me.
-    
-    # Improved logic: Count unread messages in conversations where user is a participant.
-    # Since we don't have a 'MessageRead' table yet for detailed per-user tracking in groups,
-    # we'll use the 'is_read' flag which works best for 1-on-1s.
-    # For now, let's assume 'is_read' == False means unread for the recipient.
-    # (Refinement needed for group chats later).
-    
-    unread_messages = db.query(MessageORM).join(
-        MessageORM.conversation
-    ).filter(
-        MessageORM.sender_id != current_user.id,
-        MessageORM.is_read == False,
-        # Add filter to ensure user is in conversation if possible, 
-        # but for now let's trust the logic that users only get notified for their chats.
-    ).count()
+    # Counters are maintained by the chat, task and announcement write paths
+    # (see notification_counters.py), so this is a single primary-key read
+    return notification_counters.get_counts(db, current_user.id)
 
-    # 2. Pending Tasks (Profile)
-    # Tasks assigned to user that are in 'pending' status OR tasks that need user confirmation?
-    # Requirement: "something enter in user profile it will show notification"
-    # pending tasks + tasks with new updates? Start with pending tasks.
-    pending_tasks = db.query(TaskORM).outerjoin(TaskAssigneeORM).filter(
-        (TaskORM.assigned_to == current_user.id) | (TaskAssigneeORM.user_id == current_user.id),
-        TaskORM.status == 'pending'
-    ).distinct().count()
-
-    # 3. New Announcements (Home)
-    # Count total announcements - read announcements
-    total_announcements = db.query(AnnouncementORM).count()
-    read_announcements = db.query(AnnouncementReadORM).filter(
-        AnnouncementReadORM.user_id == current_user.id
-    ).count()
-    
-    unread_announcements = max(0, total_announcements - read_announcements)
+@router.get("/counts/poll")
+async def poll_notification_counts(
+    messages: Optional[int] = None,
+    profile: Optional[int] = None,
+    home: Optional[int] = None,
+    timeout: int = Query(COUNTS_POLL_TIMEOUT, ge=1, le=60),
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Long-poll fallback for clients without a signaling socket.
+    Pass the counts you already have; responds as soon as any of them differs,
+    or with the current counts after `timeout` seconds.
+    """
+    # Release the auth session's connection instead of holding it while waiting
+    db.close()
 
-    return {
-        "messages": unread_messages,
-        "profile": pending_tasks,
-        "home": unread_announcements
-    }
+    known = {"messages": messages, "profile": profile, "home": home}
+    known = {field: value for field, value in known.items() if value is not None}
+    return await counts_pusher.wait_for_change(current_user.id, known, timeout)
 
 @router.post("/messages/mark-read")
 def mark_messages_read(
@@ -70,12 +50,9 @@ def mark_messages_read(
     db: Session = Depends(get_db)
 ):
     """Mark all unread messages for this user as read"""
-    # Simply update all messages not sent by user to is_read=True
-    # This is a broad "mark all as read" for simplicity.
-    db.query(MessageORM).filter(
-        MessageORM.sender_id != current_user.id,
-        MessageORM.is_read == False
-    ).update({"is_read": True})
+    # Move the read watermark to the latest message in each of the user's conversations
+    chat_reads.mark_all_read(db, current_user.id)
+    notification_counters.refresh(db, [current_user.id], ("messages",))
     
     db.commit()
     return {"status": "success"}
@@ -86,22 +63,64 @@ def mark_announcements_read(
     db: Session = Depends(get_db)
 ):
     """Mark all announcements as read"""
-    # Find all announcements
-    all_announcements = db.query(AnnouncementORM).all()
-    
-    # Find already read
-    read_ids = [r.announcement_id for r in db.query(AnnouncementReadORM).filter(
-        AnnouncementReadORM.user_id == current_user.id
-    ).all()]
-    
-    # Add missing reads
-    new_reads = []
-    for ann in all_announcements:
-        if ann.id not in read_ids:
-            new_reads.append(AnnouncementReadORM(user_id=current_user.id, announcement_id=ann.id))
-    
-    if new_reads:
-        db.add_all(new_reads)
-        db.commit()
-        
+    # Move the watermark to the newest announcement; out-of-order reads below it are redundant
+    latest = db.query(func.coalesce(func.max(AnnouncementORM.id), 0)).scalar()
+    db.query(FamilyMemberORM).filter(FamilyMemberORM.id == current_user.id).update({
+        FamilyMemberORM.last_seen_announcement_id: latest,
+        FamilyMemberORM.updated_at: FamilyMemberORM.updated_at  # Not a profile change
+    }, synchronize_session=False)
+    db.query(AnnouncementReadORM).filter(
+        AnnouncementReadORM.user_id == current_user.id,
+        AnnouncementReadORM.announcement_id <= latest
+    ).delete(synchronize_session=False)
+
+    notification_counters.refresh(db, [current_user.id], ("home",))
+    db.commit()
+    return {"status": "success"}
+
+@router.post("/announcements/{announcement_id}/read")
+def mark_announcement_read(
+    announcement_id: int,
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark a single announcement as read"""
+    if not db.get(AnnouncementORM, announcement_id):
+        raise HTTPException(status_code=404, detail="Announcement not found")
+
+    watermark = db.query(FamilyMemberORM.last_seen_announcement_id).filter(
+        FamilyMemberORM.id == current_user.id
+    ).scalar() or 0
+    if announcement_id <= watermark:
+        return {"status": "success"}
+
+    # Read out of order: remember it above the watermark
+    db.add(AnnouncementReadORM(user_id=current_user.id, announcement_id=announcement_id))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return {"status": "success"}
+
+    # Advance the watermark over the contiguous run of read announcements
+    first_unread = db.query(func.min(AnnouncementORM.id)).filter(
+        AnnouncementORM.id > watermark,
+        ~exists().where(
+            AnnouncementReadORM.announcement_id == AnnouncementORM.id,
+            AnnouncementReadORM.user_id == current_user.id
+        )
+    ).scalar()
+    new_watermark = first_unread - 1 if first_unread else db.query(func.max(AnnouncementORM.id)).scalar()
+    if new_watermark > watermark:
+        db.query(FamilyMemberORM).filter(FamilyMemberORM.id == current_user.id).update({
+            FamilyMemberORM.last_seen_announcement_id: new_watermark,
+            FamilyMemberORM.updated_at: FamilyMemberORM.updated_at
+        }, synchronize_session=False)
+        db.query(AnnouncementReadORM).filter(
+            AnnouncementReadORM.user_id == current_user.id,
+            AnnouncementReadORM.announcement_id <= new_watermark
+        ).delete(synchronize_session=False)
+
+    notification_counters.refresh(db, [current_user.id], ("home",))
+    db.commit()
     return {"status": "success"}
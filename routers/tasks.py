@@ -1,18 +1,52 @@
 """
 Tasks Router: Task CRUD endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import exists, func, select, insert, update, bindparam, literal, union_all, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
 
 from database import get_db
-from models import FamilyMemberORM, FamilyMember, TaskORM, FileORM, TaskUpdateORM, TaskAssigneeORM
+from models import FamilyMemberORM, FamilyMember, TaskORM, FileORM, TaskUpdateORM, TaskAssigneeORM, TaskDependencyORM, DeadlineNoticeORM
 from auth import get_current_admin, get_current_user
+import notification_counters
+import task_graph
+import task_rollups
+import ranking
+import task_members
+import deadline_scheduler
+from pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
+TASK_PAGE_DEFAULT = 50
+TASK_PAGE_MAX = 200
+TASK_TREE_MAX_DEPTH = 50
+TASK_BULK_MAX = 500
+TASK_BOARD_DEFAULT = 20
+TASK_CALENDAR_MAX_DAYS = 366
+TASK_CALENDAR_MAX_ENTRIES = 1000
+
+# Deadline columns the calendar reads, each with its own (column, id) index
+CALENDAR_COLUMNS = {
+    "deadline": TaskORM.deadline,
+    "proposed_deadline": TaskORM.proposed_deadline,
+}
+
+# Sortable columns; each is paired with id as the keyset tiebreaker
+TASK_SORT_COLUMNS = {
+    "created_at": TaskORM.created_at,
+    "updated_at": TaskORM.updated_at,
+    "deadline": TaskORM.deadline,
+    "rank": TaskORM.rank,
+}
+# Sort columns that may be empty; their empty tasks are listed after the rest
+NULLABLE_SORT_COLUMNS = {"deadline", "rank"}
+
 
 # =============================================================================
 class TaskCreate(BaseModel):
@@ -26,6 +60,10 @@ class TaskCreate(BaseModel):
     estimated_days: Optional[int] = None
     timeline_confirmed_at: Optional[datetime] = None
     assigned_user_ids: Optional[List[int]] = None
+    parent_id: Optional[int] = None
+    progress: Optional[int] = Field(None, ge=0, le=100)
+    estimated_hours: Optional[float] = None
+    actual_hours: Optional[float] = None
 
 
 class TaskUpdate(BaseModel):
@@ -40,6 +78,33 @@ class TaskUpdate(BaseModel):
     timeline_confirmed_at: Optional[datetime] = None
     is_approved: Optional[bool] = None
     assigned_user_ids: Optional[List[int]] = None
+    parent_id: Optional[int] = None
+    progress: Optional[int] = Field(None, ge=0, le=100)
+    estimated_hours: Optional[float] = None
+    actual_hours: Optional[float] = None
+
+
+class TaskPatch(BaseModel):
+    id: int
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    is_approved: Optional[bool] = None
+    assigned_to: Optional[int] = None
+    assigned_user_ids: Optional[List[int]] = None
+    deadline: Optional[datetime] = None
+    progress: Optional[int] = Field(None, ge=0, le=100)
+    estimated_hours: Optional[float] = None
+    actual_hours: Optional[float] = None
+
+
+class TaskBulkRequest(BaseModel):
+    items: List[TaskPatch] = Field(..., min_length=1, max_length=TASK_BULK_MAX)
+
+
+class TaskMove(BaseModel):
+    status: Optional[str] = None  # Target column, the current one when omitted
+    after_id: Optional[int] = None  # Card to place this one after
+    before_id: Optional[int] = None  # Card to place this one before
 
 
 class TaskUpdateCreate(BaseModel):
@@ -54,6 +119,34 @@ class TaskUpdateResponse(BaseModel):
     created_at: datetime
 
 
+class DependencyCreate(BaseModel):
+    depends_on_id: int
+
+
+class GraphNode(BaseModel):
+    id: int
+    title: str
+    status: str
+    estimated_days: int
+    depends_on: List[int] = []
+    in_scope: bool = True  # False for prerequisites from outside the requested scope
+    earliest_start: Optional[int] = None
+    earliest_finish: Optional[int] = None
+    latest_start: Optional[int] = None
+    latest_finish: Optional[int] = None
+    slack: Optional[int] = None
+    critical: bool = False
+
+
+class TaskGraphResponse(BaseModel):
+    nodes: List[GraphNode]
+    order: List[int] = []
+    ready: List[int]
+    critical_path: List[int] = []
+    length: Optional[int] = None
+    cycle: Optional[List[int]] = None
+
+
 class UserInfo(BaseModel):
     id: int
     username: str
@@ -78,75 +171,303 @@ class TaskResponse(BaseModel):
     updated_at: Optional[datetime] = None
     priority: str = "medium"
     links: Optional[str] = None
-    priority: str = "medium"
-    links: Optional[str] = None
     files: List[dict] = []
     assignees: List[UserInfo] = []
+    timeline_notes: Optional[str] = None
+    proposed_deadline: Optional[datetime] = None
+    timeline_status: Optional[str] = None
+    parent_id: Optional[int] = None
+    progress: int = 0
+    estimated_hours: Optional[float] = None
+    actual_hours: Optional[float] = None
+    rank: Optional[str] = None
+
+
+class TaskBulkResult(BaseModel):
+    id: int
+    ok: bool
+    error: Optional[str] = None
+    task: Optional[TaskResponse] = None
+
+
+class TaskBulkResponse(BaseModel):
+    updated: int
+    results: List[TaskBulkResult]
+
+
+class BoardColumn(BaseModel):
+    status: str
+    total: int
+    tasks: List[TaskResponse]
+    next_cursor: Optional[str] = None  # For GET /tasks/?status=<status>, with the same filters and sort
+
+
+class TaskBoardResponse(BaseModel):
+    columns: List[BoardColumn]
+
+
+class CalendarEntry(BaseModel):
+    kind: str  # deadline or proposed_deadline
+    at: datetime
+    task: TaskResponse
+
+
+class CalendarDay(BaseModel):
+    day: date
+    deadline: int = 0
+    proposed_deadline: int = 0
+
+
+class TaskCalendarResponse(BaseModel):
+    entries: List[CalendarEntry] = []
+    days: List[CalendarDay] = []
+    truncated: bool = False
+
+
+class TaskRollup(BaseModel):
+    tasks: int
+    progress: float  # Average over the subtree
+    estimated_hours: float
+    actual_hours: float
+    status_counts: Dict[str, int]
+
+
+class TaskTreeNode(BaseModel):
+    id: int
+    parent_id: Optional[int] = None
+    title: str
+    status: str
+    progress: int = 0
+    estimated_hours: Optional[float] = None
+    actual_hours: Optional[float] = None
+    depth: int
+    rollup: Optional[TaskRollup] = None  # The task and all of its subtasks, however deep
+    children: List["TaskTreeNode"] = []
 
 
 # =============================================================================
 # Helper Functions
 # =============================================================================
 
-def get_task_response(task: TaskORM, db: Session) -> TaskResponse:
-    creator = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == task.created_by).first()
-    creator_info = UserInfo(
-        id=creator.id,
-        username=creator.username,
-        full_name=creator.full_name
-    ) if creator else UserInfo(id=0, username="Unknown", full_name="Unknown")
-    
-    assigned_user_info = None
-    if task.assigned_to:
-        assigned = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == task.assigned_to).first()
-        if assigned:
-            assigned_user_info = UserInfo(
-                id=assigned.id,
-                username=assigned.username,
-                full_name=assigned.full_name
-            )
-            
-    files = db.query(FileORM).filter(FileORM.task_id == task.id).all()
-    file_list = [
-        {
+def user_info(user: Optional[FamilyMemberORM]) -> UserInfo:
+    if not user:
+        return UserInfo(id=0, username="Unknown", full_name="Unknown")
+    return UserInfo(id=user.id, username=user.username, full_name=user.full_name)
+
+
+def get_task_responses(tasks: List[TaskORM], db: Session) -> List[TaskResponse]:
+    """
+    Serialize a list of tasks. Creators, assignees and files for the whole list
+    are loaded with one IN query each, however many tasks there are.
+    """
+    if not tasks:
+        return []
+    task_ids = [task.id for task in tasks]
+
+    assignee_rows = db.query(TaskAssigneeORM.task_id, TaskAssigneeORM.user_id).filter(
+        TaskAssigneeORM.task_id.in_(task_ids)
+    ).order_by(TaskAssigneeORM.id).all()
+
+    user_ids = {user_id for _, user_id in assignee_rows}
+    for task in tasks:
+        user_ids.update(u for u in (task.created_by, task.assigned_to) if u)
+    users = {
+        u.id: u for u in db.query(FamilyMemberORM).filter(FamilyMemberORM.id.in_(user_ids))
+    } if user_ids else {}
+
+    assignees_by_task: Dict[int, List[UserInfo]] = {}
+    for task_id, user_id in assignee_rows:
+        if user_id in users:
+            assignees_by_task.setdefault(task_id, []).append(user_info(users[user_id]))
+
+    files_by_task: Dict[int, List[dict]] = {}
+    for f in db.query(FileORM).filter(FileORM.task_id.in_(task_ids)).order_by(FileORM.id):
+        files_by_task.setdefault(f.task_id, []).append({
             "id": f.id,
             "filename": f.filename,
             "file_path": f.file_path,
             "file_size": f.file_size,
             "content_type": f.content_type
-        }
-        for f in files
+        })
+
+    return [
+        TaskResponse(
+            id=task.id,
+            title=task.title,
+            description=task.description,
+            status=task.status,
+            assigned_to=task.assigned_to,
+            assigned_user=user_info(users[task.assigned_to]) if task.assigned_to in users else None,
+            created_by=task.created_by,
+            creator=user_info(users.get(task.created_by)),
+            deadline=task.deadline,
+            is_approved=task.is_approved,
+            alert_count=task.alert_count,
+            estimated_days=task.estimated_days,
+            timeline_confirmed_at=task.timeline_confirmed_at,
+            created_at=task.created_at,
+            updated_at=task.updated_at,
+            priority=task.priority,
+            links=task.links,
+            files=files_by_task.get(task.id, []),
+            assignees=assignees_by_task.get(task.id, []),
+            timeline_notes=task.timeline_notes,
+            proposed_deadline=task.proposed_deadline,
+            timeline_status=task.timeline_status,
+            parent_id=task.parent_id,
+            progress=task.progress or 0,
+            estimated_hours=task.estimated_hours,
+            actual_hours=task.actual_hours,
+            rank=task.rank
+        )
+        for task in tasks
     ]
 
-    return TaskResponse(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        status=task.status,
-        assigned_to=task.assigned_to,
-        assigned_user=assigned_user_info,
-        created_by=task.created_by,
-        creator=creator_info,
-        deadline=task.deadline,
-        is_approved=task.is_approved,
-        alert_count=task.alert_count,
-        estimated_days=task.estimated_days,
-        timeline_confirmed_at=task.timeline_confirmed_at,
-        created_at=task.created_at,
-        updated_at=task.updated_at,
-        priority=task.priority,
-        links=task.links,
-        files=file_list,
-        assignees=[
-            {
-                "id": a.user.id,
-                "username": a.user.username,
-                "full_name": a.user.full_name,
-                "avatar_url": a.user.avatar_url
-            }
-            for a in task.assignees
-        ]
-    )
+
+def naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; bring aware ones in line"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def get_task_response(task: TaskORM, db: Session) -> TaskResponse:
+    return get_task_responses([task], db)[0]
+
+
+def filter_tasks(
+    query,
+    status: Optional[List[str]] = None,
+    priority: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    team_id: Optional[str] = None,
+    parent_id: Optional[int] = None
+):
+    """Apply the task list filters shared by the list and board endpoints"""
+    if status:
+        query = query.filter(TaskORM.status.in_(status))
+    if priority:
+        query = query.filter(TaskORM.priority == priority)
+    if assignee_id is not None:
+        query = query.filter(TaskORM.id.in_(task_members.user_task_ids(assignee_id)))
+    if tag:
+        # tags is a comma separated list; match whole entries only
+        query = query.filter(
+            ("," + func.replace(TaskORM.tags, " ", "") + ",").like(f"%,{tag.strip()},%")
+        )
+    if deadline_from:
+        query = query.filter(TaskORM.deadline >= deadline_from)
+    if deadline_to:
+        query = query.filter(TaskORM.deadline < deadline_to)
+    if team_id:
+        query = query.filter(TaskORM.team_id == team_id)
+    if parent_id is not None:
+        query = query.filter(TaskORM.parent_id == parent_id)
+    return query
+
+
+def page_tasks(query, sort: str, order: str, limit: int, cursor: Optional[str] = None) -> List[TaskORM]:
+    """
+    Up to limit + 1 tasks in (sort column, id) order, continuing after the
+    cursor's position. Tasks without a value in a nullable sort column come
+    last in either direction.
+
+    Every read is an ordered range scan on a (column, id) index: a row
+    comparison against the cursor for tasks with a value, then, once those
+    run out, `column IS NULL` in id order for the rest.
+    """
+    column = sort_column(query, sort)
+    descending = order == "desc"
+    nullable = sort in NULLABLE_SORT_COLUMNS
+    value = last_id = None
+
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            if position["sort"] != sort or position["order"] != order:
+                raise ValueError("cursor belongs to a different sort")
+            value = position["value"]
+            if value is not None and sort != "rank":
+                value = datetime.fromisoformat(value)
+            last_id = int(position["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if value is None and not nullable:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    tasks = []
+    if last_id is None or value is not None:
+        valued = query
+        if last_id is not None:
+            bound = sort_value(query, sort, value)
+            keys, after = tuple_(column, TaskORM.id), tuple_(bound, last_id)
+            # The redundant bound on the column alone lets SQLite seek its
+            # expression indexes; Postgres seeks on the row comparison
+            valued = valued.filter(
+                column <= bound if descending else column >= bound,
+                keys < after if descending else keys > after
+            )
+            last_id = None
+        elif nullable:
+            valued = valued.filter(column.isnot(None))
+        tasks = valued.order_by(*sort_order(column, order)).limit(limit + 1).all()
+
+    if nullable and len(tasks) <= limit:
+        empty = query.filter(TASK_SORT_COLUMNS[sort].is_(None))
+        if last_id is not None:
+            empty = empty.filter(TaskORM.id < last_id if descending else TaskORM.id > last_id)
+        tasks += empty.order_by(
+            TaskORM.id.desc() if descending else TaskORM.id.asc()
+        ).limit(limit + 1 - len(tasks)).all()
+
+    return tasks
+
+
+def sort_column(query, sort: str):
+    column = TASK_SORT_COLUMNS[sort]
+    # SQLite keeps timestamps as text, with or without microseconds depending on
+    # who wrote them, so compare and order them as julian days there, backed
+    # by the julianday expression indexes on TaskORM
+    if sort != "rank" and query.session.get_bind().dialect.name == "sqlite":
+        column = func.julianday(column)
+    return column
+
+
+def sort_value(query, sort: str, value):
+    """A cursor value in the form sort_column compares against"""
+    if sort != "rank" and query.session.get_bind().dialect.name == "sqlite":
+        return func.julianday(value.isoformat(sep=" "))
+    return value
+
+
+def sort_order(column, order: str, nulls_last: bool = False) -> list:
+    """
+    ORDER BY for (column, id). The keyset reads above leave NULLs out, so
+    they use plain directions that an index scan yields in either direction;
+    nulls_last is for window functions ranking every task at once.
+    """
+    if order == "desc":
+        return [column.desc().nulls_last() if nulls_last else column.desc(), TaskORM.id.desc()]
+    return [column.asc().nulls_last() if nulls_last else column.asc(), TaskORM.id.asc()]
+
+
+def default_order(sort: str) -> str:
+    """Ranks read top to bottom; timestamps newest first"""
+    return "asc" if sort == "rank" else "desc"
+
+
+def task_cursor(task: TaskORM, sort: str, order: str, **extra) -> str:
+    value = getattr(task, sort)
+    return encode_cursor({
+        "sort": sort,
+        "order": order,
+        "value": value.isoformat() if isinstance(value, datetime) else value,
+        "id": task.id,
+        **extra
+    })
 
 
 # =============================================================================
@@ -159,25 +480,232 @@ def get_my_tasks(
     db: Session = Depends(get_db)
 ):
     """Get tasks assigned to the current user"""
-    tasks = db.query(TaskORM).outerjoin(TaskAssigneeORM).filter(
-        (TaskORM.assigned_to == current_user.id) | (TaskAssigneeORM.user_id == current_user.id)
-    ).distinct().all()
+    tasks = db.query(TaskORM).filter(
+        TaskORM.id.in_(task_members.user_task_ids(current_user.id))
+    ).all()
     
-    return [get_task_response(task, db) for task in tasks]
+    return get_task_responses(tasks, db)
+
+
+@router.get("/graph", response_model=TaskGraphResponse)
+def get_task_graph(
+    scope: str = Query("all", pattern="^(all|team|user)$"),
+    team_id: Optional[str] = None,
+    user_id: Optional[int] = None,
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Dependency graph of a scope for Gantt views: every task with its
+    prerequisites, a topological order, the tasks ready to start, and the
+    critical path with per-task slack in days (from estimated_days).
+
+    The user scope defaults to the current user. Schedule fields are empty
+    and `cycle` is set if the stored dependencies contain a cycle.
+    """
+    if scope == "team" and not team_id:
+        raise HTTPException(status_code=400, detail="team_id is required for the team scope")
+    scope_id = team_id if scope == "team" else (user_id or current_user.id) if scope == "user" else None
+
+    graph = task_graph.get_graph(db, scope, scope_id, approved_only=current_user.role != 'admin')
+
+    nodes = [
+        GraphNode(
+            id=graph.ids[i], title=graph.titles[i], status=graph.status[i], estimated_days=graph.days[i],
+            depends_on=[graph.ids[p] for p in graph.predecessors[i]], in_scope=graph.in_scope[i]
+        )
+        for i in range(len(graph))
+    ]
+    try:
+        order = graph.topological_order()
+        plan = graph.schedule()
+    except task_graph.CycleError as e:
+        return TaskGraphResponse(nodes=nodes, ready=graph.ready(), cycle=e.cycle)
+
+    critical = set(plan["critical_path"])
+    for i, node in enumerate(nodes):
+        node.earliest_start = plan["earliest_start"][i]
+        node.earliest_finish = plan["earliest_finish"][i]
+        node.latest_start = plan["latest_start"][i]
+        node.latest_finish = plan["latest_finish"][i]
+        node.slack = plan["slack"][i]
+        node.critical = node.id in critical
+
+    return TaskGraphResponse(
+        nodes=nodes,
+        order=[graph.ids[i] for i in order],
+        ready=graph.ready(),
+        critical_path=plan["critical_path"],
+        length=plan["length"]
+    )
+
+
+@router.get("/board", response_model=TaskBoardResponse)
+def get_task_board(
+    status: Optional[List[str]] = Query(None),
+    priority: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    team_id: Optional[str] = None,
+    parent_id: Optional[int] = None,
+    sort: str = Query("created_at", pattern="^(created_at|updated_at|deadline|rank)$"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    per_column: int = Query(TASK_BOARD_DEFAULT, ge=1, le=TASK_PAGE_MAX),
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Kanban board: for each status column, its total and first cards, ranked
+    with window functions in a single query. Takes the filters and sort of
+    GET /tasks/; a column's next_cursor continues it there with
+    status=<column>. order defaults to asc for rank and desc otherwise.
+    """
+    order = order or default_order(sort)
+    query = db.query(TaskORM.id, TaskORM.status)
+    column = sort_column(query, sort)
+    query = query.add_columns(
+        func.row_number().over(partition_by=TaskORM.status, order_by=sort_order(column, order, nulls_last=True)).label("position"),
+        func.count().over(partition_by=TaskORM.status).label("total")
+    )
+    if current_user.role != 'admin':
+        query = query.filter(TaskORM.is_approved == True)
+    ranked = filter_tasks(
+        query, status=status, priority=priority, assignee_id=assignee_id, tag=tag,
+        deadline_from=deadline_from, deadline_to=deadline_to, team_id=team_id, parent_id=parent_id
+    ).subquery()
+
+    rows = db.query(TaskORM, ranked.c.total).join(
+        ranked, ranked.c.id == TaskORM.id
+    ).filter(ranked.c.position <= per_column).order_by(ranked.c.status, ranked.c.position).all()
+
+    cards: Dict[str, List[TaskORM]] = {}
+    totals: Dict[str, int] = {}
+    for task, total in rows:
+        cards.setdefault(task.status, []).append(task)
+        totals[task.status] = total
+
+    # The usual statuses always get a column, any others follow
+    statuses = [s for s in task_rollups.ROLLUP_STATUSES if not status or s in status]
+    statuses += sorted(s for s in cards if s not in statuses)
+
+    responses = iter(get_task_responses([task for s in statuses for task in cards.get(s, [])], db))
+    columns = []
+    for s in statuses:
+        column_cards = cards.get(s, [])
+        columns.append(BoardColumn(
+            status=s,
+            total=totals.get(s, 0),
+            tasks=[next(responses) for _ in column_cards],
+            next_cursor=task_cursor(column_cards[-1], sort, order, status=s)
+            if totals.get(s, 0) > len(column_cards) else None
+        ))
+
+    return TaskBoardResponse(columns=columns)
+
+
+@router.get("/calendar", response_model=TaskCalendarResponse)
+def get_task_calendar(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    user_id: Optional[int] = None,
+    team_id: Optional[str] = None,
+    bucket: Optional[str] = Query(None, pattern="^day$"),
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Tasks due in [from, to): one entry per deadline or proposed deadline in
+    the window, in date order, optionally for one user or team. Each column
+    is read with its own index range scan and the two are combined with
+    UNION ALL.
+
+    With bucket=day only per-day counts (UTC days) are returned, grouped in
+    the same query, which is all a month view needs.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if end - start > timedelta(days=TASK_CALENDAR_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"The window is limited to {TASK_CALENDAR_MAX_DAYS} days")
+
+    def scan(kind: str, column):
+        query = select(
+            TaskORM.id.label("task_id"), literal(kind).label("kind"), column.label("at")
+        ).where(column >= start, column < end)
+        if current_user.role != 'admin':
+            query = query.where(TaskORM.is_approved == True)
+        if user_id is not None:
+            query = query.where(TaskORM.id.in_(task_members.user_task_ids(user_id)))
+        if team_id:
+            query = query.where(TaskORM.team_id == team_id)
+        return query
+
+    entries = union_all(*(scan(kind, column) for kind, column in CALENDAR_COLUMNS.items())).subquery()
+
+    if bucket == "day":
+        day = func.date(entries.c.at)
+        days: Dict[str, CalendarDay] = {}
+        for value, kind, count in db.query(day, entries.c.kind, func.count()).group_by(day, entries.c.kind).order_by(day):
+            days.setdefault(str(value), CalendarDay(day=value))
+            setattr(days[str(value)], kind, count)
+        return TaskCalendarResponse(days=list(days.values()))
+
+    rows = db.query(TaskORM, entries.c.kind, entries.c.at).join(
+        entries, entries.c.task_id == TaskORM.id
+    ).order_by(entries.c.at, TaskORM.id, entries.c.kind).limit(TASK_CALENDAR_MAX_ENTRIES + 1).all()
+    truncated = len(rows) > TASK_CALENDAR_MAX_ENTRIES
+    rows = rows[:TASK_CALENDAR_MAX_ENTRIES]
+
+    responses = {r.id: r for r in get_task_responses(list({task.id: task for task, _, _ in rows}.values()), db)}
+    return TaskCalendarResponse(
+        entries=[CalendarEntry(kind=kind, at=at, task=responses[task.id]) for task, kind, at in rows],
+        truncated=truncated
+    )
 
 
 @router.get("/", response_model=list[TaskResponse])
 def get_all_tasks(
+    response: Response,
+    status: Optional[List[str]] = Query(None),
+    priority: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    team_id: Optional[str] = None,
+    parent_id: Optional[int] = None,
+    sort: str = Query("created_at", pattern="^(created_at|updated_at|deadline|rank)$"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    limit: int = Query(TASK_PAGE_DEFAULT, ge=1, le=TASK_PAGE_MAX),
+    cursor: Optional[str] = None,
     current_user: FamilyMember = Depends(get_current_user), # Allow users to see all (approved) tasks
     db: Session = Depends(get_db)
 ):
-    """Get all tasks"""
+    """
+    List tasks, filtered and sorted, one page at a time.
+
+    `status` may be repeated. Pass the X-Next-Cursor header from the previous
+    response as `cursor`, with the same filters and sort, for the next page.
+    order defaults to asc for rank and desc otherwise.
+    """
+    order = order or default_order(sort)
     query = db.query(TaskORM)
     if current_user.role != 'admin':
         query = query.filter(TaskORM.is_approved == True)
     
-    tasks = query.all()
-    return [get_task_response(task, db) for task in tasks]
+    query = filter_tasks(
+        query, status=status, priority=priority, assignee_id=assignee_id, tag=tag,
+        deadline_from=deadline_from, deadline_to=deadline_to, team_id=team_id, parent_id=parent_id
+    )
+    tasks = page_tasks(query, sort, order, limit, cursor)
+
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = task_cursor(tasks[-1], sort, order)
+
+    return get_task_responses(tasks, db)
 
 
 @router.post("/", response_model=TaskResponse)
@@ -195,6 +723,9 @@ def create_task(
         if not assigned_user:
             raise HTTPException(status_code=404, detail="Assigned user not found")
     
+    if task.parent_id and not db.query(exists().where(TaskORM.id == task.parent_id)).scalar():
+        raise HTTPException(status_code=404, detail="Parent task not found")
+    
     db_task = TaskORM(
         title=task.title,
         description=task.description,
@@ -204,57 +735,152 @@ def create_task(
         deadline=task.deadline,
         priority=task.priority or "medium",
         links=task.links,
+        parent_id=task.parent_id,
+        progress=task.progress or 0,
+        estimated_hours=task.estimated_hours,
+        actual_hours=task.actual_hours,
+        rank=ranking.rank_for_new_task(db, task.status),
         is_approved=is_admin # Admins are auto-approved
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    db.flush()
+    task_rollups.task_created(db, db_task)
 
     # Add multiple assignees if provided
     if task.assigned_user_ids:
         for user_id in task.assigned_user_ids:
             assignee = TaskAssigneeORM(task_id=db_task.id, user_id=user_id)
             db.add(assignee)
-        db.commit()
-    
-    # Get creator info
-    creator_info = UserInfo(
-        id=current_user.id,
-        username=current_user.username,
-        full_name=current_user.full_name
+        db.flush()
+
+    notification_counters.refresh(
+        db, notification_counters.task_users(db, db_task.id, db_task.assigned_to), ("profile",)
     )
+    task_graph.invalidate(db)
+    deadline_scheduler.tasks_changed(db, [db_task.id])
+    db.commit()
     
-    # Get assigned user info
-    assigned_user_info = None
-    if db_task.assigned_to:
-        assigned = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == db_task.assigned_to).first()
-        if assigned:
-            assigned_user_info = UserInfo(
-                id=assigned.id,
-                username=assigned.username,
-                full_name=assigned.full_name
+    return get_task_response(db_task, db)
+
+
+@router.post("/bulk", response_model=TaskBulkResponse)
+def bulk_update_tasks(
+    request: TaskBulkRequest,
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply a list of patches in one transaction (creator or admin per task,
+    approval admin only). Items that fail validation are reported and skipped;
+    the rest are written with batched UPDATEs, whatever the number of items.
+    Results come back in request order.
+    """
+    is_admin = current_user.role == "admin"
+    tasks = {
+        task.id: task for task in
+        db.query(TaskORM).filter(TaskORM.id.in_([item.id for item in request.items]))
+    }
+    referenced = {
+        user_id for item in request.items
+        for user_id in [item.assigned_to, *(item.assigned_user_ids or [])] if user_id
+    }
+    known_users = set(db.execute(
+        select(FamilyMemberORM.id).where(FamilyMemberORM.id.in_(referenced))
+    ).scalars()) if referenced else set()
+
+    results: List[TaskBulkResult] = []
+    patches: Dict[int, dict] = {}
+    new_assignees: Dict[int, List[int]] = {}
+    for item in request.items:
+        task = tasks.get(item.id)
+        error = None
+        if task is None:
+            error = "Task not found"
+        elif item.id in patches:
+            error = "Task appears more than once"
+        elif task.created_by != current_user.id and not is_admin:
+            error = "Not authorized to update this task"
+        elif (item.assigned_to and item.assigned_to not in known_users) or \
+                any(u not in known_users for u in item.assigned_user_ids or []):
+            error = "Assigned user not found"
+        results.append(TaskBulkResult(id=item.id, ok=error is None, error=error))
+        if error:
+            continue
+
+        patch = item.model_dump(exclude_unset=True, exclude={"id", "assigned_user_ids"})
+        # Only admin can change approval status
+        if not is_admin:
+            patch.pop("is_approved", None)
+        patches[item.id] = patch
+        if item.assigned_user_ids is not None:
+            new_assignees[item.id] = list(dict.fromkeys(item.assigned_user_ids))
+
+    # Tasks changing column go to the end of the new one, in request order
+    moving: Dict[str, List[int]] = {}
+    for task_id, patch in patches.items():
+        if patch.get("status") is not None and patch["status"] != tasks[task_id].status:
+            moving.setdefault(patch["status"], []).append(task_id)
+    for status, moved_ids in moving.items():
+        for task_id, rank in zip(moved_ids, ranking.ranks_at_end(db, status, len(moved_ids))):
+            patches[task_id]["rank"] = rank
+
+    task_ids = list(patches)
+    if task_ids:
+        affected_users = notification_counters.task_users(db, task_ids, *(tasks[t].assigned_to for t in task_ids))
+
+        # One executemany per combination of patched fields
+        table = TaskORM.__table__
+        now = datetime.utcnow()
+        by_fields: Dict[tuple, List[dict]] = {}
+        for task_id, patch in patches.items():
+            if patch:
+                by_fields.setdefault(tuple(sorted(patch)), []).append(dict(patch, row_id=task_id))
+        for fields, rows in by_fields.items():
+            db.execute(
+                update(table).where(table.c.id == bindparam("row_id")).values(
+                    {**{field: bindparam(field) for field in fields}, "updated_at": now}
+                ),
+                rows
             )
-    
-    return TaskResponse(
-        id=db_task.id,
-        title=db_task.title,
-        description=db_task.description,
-        status=db_task.status,
-        assigned_to=db_task.assigned_to,
-        assigned_user=assigned_user_info,
-        created_by=db_task.created_by,
-        creator=creator_info,
-        deadline=db_task.deadline,
-        is_approved=db_task.is_approved,
-        alert_count=db_task.alert_count,
-        estimated_days=db_task.estimated_days,
-        timeline_confirmed_at=db_task.timeline_confirmed_at,
-        created_at=db_task.created_at,
-        updated_at=db_task.updated_at,
-        priority=db_task.priority,
-        links=db_task.links,
-        files=[]
-    )
+
+        if new_assignees:
+            db.query(TaskAssigneeORM).filter(
+                TaskAssigneeORM.task_id.in_(list(new_assignees))
+            ).delete(synchronize_session=False)
+            rows = [
+                {"task_id": task_id, "user_id": user_id}
+                for task_id, user_ids in new_assignees.items() for user_id in user_ids
+            ]
+            if rows:
+                db.execute(insert(TaskAssigneeORM), rows)
+
+        deltas = {}
+        for task_id, patch in patches.items():
+            before = task_rollups.own_values(tasks[task_id])
+            after = task_rollups.own_values(SimpleNamespace(**{
+                field: patch.get(field, getattr(tasks[task_id], field))
+                for field in ("status", "progress", "estimated_hours", "actual_hours")
+            }))
+            deltas[task_id] = {field: after[field] - before[field] for field in task_rollups.SUMS}
+        task_rollups.apply_deltas(db, deltas)
+
+        affected_users |= notification_counters.task_users(
+            db, task_ids, *(patch.get("assigned_to") for patch in patches.values())
+        )
+        notification_counters.refresh(db, affected_users, ("profile",))
+        task_graph.invalidate(db)
+        deadline_scheduler.tasks_changed(db, task_ids)
+    db.commit()
+
+    # The committed tasks are expired, so this reloads them in one query
+    updated = {
+        response.id: response for response in
+        get_task_responses(db.query(TaskORM).filter(TaskORM.id.in_(task_ids)).all(), db)
+    } if task_ids else {}
+    for result in results:
+        result.task = updated.get(result.id) if result.ok else None
+
+    return TaskBulkResponse(updated=len(task_ids), results=results)
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
@@ -279,6 +905,18 @@ def update_task(
         if not assigned_user:
             raise HTTPException(status_code=404, detail="Assigned user not found")
     
+    # Moving under itself or one of its own subtasks would detach a loop
+    if task_update.parent_id:
+        if not db.query(exists().where(TaskORM.id == task_update.parent_id)).scalar():
+            raise HTTPException(status_code=404, detail="Parent task not found")
+        if task_rollups.is_ancestor(db, task_id, task_update.parent_id):
+            raise HTTPException(status_code=400, detail="A task cannot be moved under its own subtask")
+    
+    # Everyone assigned before the change, whose pending counts may drop
+    affected_users = notification_counters.task_users(db, task_id, db_task.assigned_to)
+    before = task_rollups.snapshot(db_task)
+    old_status = db_task.status
+    
     update_data = task_update.model_dump(exclude_unset=True)
     
     # Only admin can change approval status
@@ -287,6 +925,9 @@ def update_task(
         
     for field, value in update_data.items():
         setattr(db_task, field, value)
+    if db_task.status != old_status:
+        # Ranks are only unique within a column; go to the end of the new one
+        db_task.rank = ranking.rank_for_new_task(db, db_task.status)
     
     # Handle multiple assignees update
     if task_update.assigned_user_ids is not None:
@@ -297,54 +938,16 @@ def update_task(
             assignee = TaskAssigneeORM(task_id=task_id, user_id=user_id)
             db.add(assignee)
     
+    db.flush()
+    task_rollups.task_changed(db, db_task, before)
+    affected_users |= notification_counters.task_users(db, task_id, db_task.assigned_to)
+    notification_counters.refresh(db, affected_users, ("profile",))
+    task_graph.invalidate(db)
+    deadline_scheduler.tasks_changed(db, [task_id])
     db.commit()
     db.refresh(db_task)
     
-    # Get creator info
-    creator = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == db_task.created_by).first()
-    creator_info = UserInfo(
-        id=creator.id,
-        username=creator.username,
-        full_name=creator.full_name
-    ) if creator else UserInfo(id=0, username="Unknown", full_name="Unknown")
-    
-    # Get assigned user info
-    assigned_user_info = None
-    if db_task.assigned_to:
-        assigned = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == db_task.assigned_to).first()
-        if assigned:
-            assigned_user_info = UserInfo(
-                id=assigned.id,
-                username=assigned.username,
-                full_name=assigned.full_name
-            )
-    
-    return TaskResponse(
-        id=db_task.id,
-        title=db_task.title,
-        description=db_task.description,
-        status=db_task.status,
-        assigned_to=db_task.assigned_to,
-        assigned_user=assigned_user_info,
-        created_by=db_task.created_by,
-        creator=creator_info,
-        deadline=db_task.deadline,
-        is_approved=db_task.is_approved,
-        alert_count=db_task.alert_count,
-        estimated_days=db_task.estimated_days,
-        timeline_confirmed_at=db_task.timeline_confirmed_at,
-        created_at=db_task.created_at,
-        updated_at=db_task.updated_at,
-        priority=db_task.priority,
-        links=db_task.links,
-        files=[] # Add files retrieval if needed
-    )
-
-
-    assignees: List[UserInfo] = []
-    timeline_notes: Optional[str] = None
-    proposed_deadline: Optional[datetime] = None
-    timeline_status: Optional[str] = None
+    return get_task_response(db_task, db)
 
 
 class TimelineConfirm(BaseModel):
@@ -373,6 +976,8 @@ def confirm_task_timeline(
     if not (is_assigned or is_in_assignees) and current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Only the assigned user can confirm the timeline")
         
+    before = task_rollups.snapshot(db_task)
+    old_status = db_task.status
     if confirm.action == "reject":
         db_task.timeline_status = "rejected"
         db_task.status = "on_hold" # Change main status to on_hold or similar
@@ -382,10 +987,20 @@ def confirm_task_timeline(
         if confirm.estimated_days:
             db_task.estimated_days = confirm.estimated_days
             
+    if db_task.status != old_status:
+        db_task.rank = ranking.rank_for_new_task(db, db_task.status)
+
     db_task.timeline_notes = confirm.timeline_notes
     db_task.proposed_deadline = confirm.proposed_deadline
     db_task.timeline_confirmed_at = datetime.utcnow()
     
+    db.flush()
+    task_rollups.task_changed(db, db_task, before)
+    notification_counters.refresh(
+        db, notification_counters.task_users(db, task_id, db_task.assigned_to), ("profile",)
+    )
+    task_graph.invalidate(db)
+    deadline_scheduler.tasks_changed(db, [task_id])
     db.commit()
     db.refresh(db_task)
     
@@ -393,68 +1008,90 @@ def confirm_task_timeline(
     return get_task_response(db_task, db)
 
 
-def get_task_response(task: TaskORM, db: Session) -> TaskResponse:
-    creator = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == task.created_by).first()
-    creator_info = UserInfo(
-        id=creator.id,
-        username=creator.username,
-        full_name=creator.full_name
-    ) if creator else UserInfo(id=0, username="Unknown", full_name="Unknown")
-    
-    assigned_user_info = None
-    if task.assigned_to:
-        assigned = db.query(FamilyMemberORM).filter(FamilyMemberORM.id == task.assigned_to).first()
-        if assigned:
-            assigned_user_info = UserInfo(
-                id=assigned.id,
-                username=assigned.username,
-                full_name=assigned.full_name
-            )
-            
-    files = db.query(FileORM).filter(FileORM.task_id == task.id).all()
-    file_list = [
-        {
-            "id": f.id,
-            "filename": f.filename,
-            "file_path": f.file_path,
-            "file_size": f.file_size,
-            "content_type": f.content_type
-        }
-        for f in files
-    ]
+@router.post("/{task_id}/move", response_model=TaskResponse)
+def move_task(
+    task_id: int,
+    move: TaskMove,
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Drag and drop on the board (creator or admin only): place a task after
+    and/or before other cards of a column, optionally changing its status.
+    With one neighbour given the other side is looked up; with none the task
+    goes to the end of the column. Only the moved task is written.
+    """
+    db_task = db.query(TaskORM).filter(TaskORM.id == task_id).first()
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
 
-    return TaskResponse(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        status=task.status,
-        assigned_to=task.assigned_to,
-        assigned_user=assigned_user_info,
-        created_by=task.created_by,
-        creator=creator_info,
-        deadline=task.deadline,
-        is_approved=task.is_approved,
-        alert_count=task.alert_count,
-        estimated_days=task.estimated_days,
-        timeline_confirmed_at=task.timeline_confirmed_at,
-        created_at=task.created_at,
-        updated_at=task.updated_at,
-        priority=task.priority,
-        links=task.links,
-        files=file_list,
-        assignees=[
-            {
-                "id": a.user.id,
-                "username": a.user.username,
-                "full_name": a.user.full_name,
-                "avatar_url": a.user.avatar_url
-            }
-            for a in task.assignees
-        ],
-        timeline_notes=task.timeline_notes,
-        proposed_deadline=task.proposed_deadline,
-        timeline_status=task.timeline_status
+    if db_task.created_by != current_user.id and current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized to update this task")
+
+    status = move.status or db_task.status
+    neighbour_ids = [i for i in (move.after_id, move.before_id) if i is not None]
+    if task_id in neighbour_ids:
+        raise HTTPException(status_code=400, detail="A task cannot be placed next to itself")
+
+    def neighbour_ranks():
+        neighbours = {
+            row.id: row for row in
+            db.query(TaskORM.id, TaskORM.status, TaskORM.rank).filter(TaskORM.id.in_(neighbour_ids))
+        } if neighbour_ids else {}
+        for neighbour_id in neighbour_ids:
+            if neighbour_id not in neighbours:
+                raise HTTPException(status_code=404, detail="Neighbouring task not found")
+            if neighbours[neighbour_id].status != status:
+                raise HTTPException(status_code=400, detail="Neighbouring tasks must be in the target column")
+        return (
+            neighbours[move.after_id].rank if move.after_id is not None else None,
+            neighbours[move.before_id].rank if move.before_id is not None else None
+        )
+
+    lower, upper = neighbour_ranks()
+    if (move.after_id is not None and lower is None) or (move.before_id is not None and upper is None):
+        # Cards from before ranks existed; give the column ranks first
+        ranking.rebalance(db, [status])
+        lower, upper = neighbour_ranks()
+
+    # Fill in the side the client left out with the adjacent card
+    column = db.query(TaskORM.rank).filter(
+        TaskORM.status == status, TaskORM.id != task_id, TaskORM.rank.isnot(None)
     )
+    if move.after_id is None and move.before_id is not None:
+        lower = column.filter(TaskORM.rank < upper).order_by(TaskORM.rank.desc()).limit(1).scalar()
+    elif move.before_id is None:
+        if move.after_id is None:
+            lower = column.order_by(TaskORM.rank.desc()).limit(1).scalar()
+        else:
+            upper = column.filter(TaskORM.rank > lower).order_by(TaskORM.rank.asc()).limit(1).scalar()
+
+    try:
+        rank = ranking.rank_between(lower, upper)
+    except ValueError:
+        raise HTTPException(status_code=409, detail="The column has changed, reload it and try again")
+
+    if status == db_task.status:
+        db_task.rank = rank
+        db.commit()
+        db.refresh(db_task)
+        return get_task_response(db_task, db)
+
+    before = task_rollups.snapshot(db_task)
+    db_task.status = status
+    db_task.rank = rank
+    db.flush()
+    task_rollups.task_changed(db, db_task, before)
+    notification_counters.refresh(
+        db, notification_counters.task_users(db, task_id, db_task.assigned_to), ("profile",)
+    )
+    task_graph.invalidate(db)
+    deadline_scheduler.tasks_changed(db, [task_id])
+    db.commit()
+    db.refresh(db_task)
+
+    return get_task_response(db_task, db)
+
 
 @router.post("/{task_id}/progress", response_model=TaskUpdateResponse)
 def add_task_progress(
@@ -482,6 +1119,7 @@ def add_task_progress(
     # For now just record.
     
     db_task.updated_at = datetime.utcnow()
+    db_task.last_progress_at = db_task.updated_at
     db.commit()
     db.refresh(db_update)
     
@@ -494,6 +1132,48 @@ def add_task_progress(
     )
 
 
+@router.get("/{task_id}/tree", response_model=TaskTreeNode)
+def get_task_tree(
+    task_id: int,
+    max_depth: int = Query(TASK_TREE_MAX_DEPTH, ge=0, le=TASK_TREE_MAX_DEPTH),
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    A task with all of its subtasks, nested, in one query. Every node carries
+    the rollup of its whole subtree: average progress, total hours and the
+    number of tasks per status.
+    """
+    rows = task_rollups.subtree(db, task_id, max_depth, approved_only=current_user.role != 'admin')
+    if not rows:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    nodes: Dict[int, TaskTreeNode] = {}
+    for task, depth, rollup in rows:
+        nodes[task.id] = TaskTreeNode(
+            id=task.id,
+            parent_id=task.parent_id,
+            title=task.title,
+            status=task.status,
+            progress=task.progress or 0,
+            estimated_hours=task.estimated_hours,
+            actual_hours=task.actual_hours,
+            depth=depth,
+            rollup=TaskRollup(
+                tasks=rollup.tasks,
+                progress=rollup.progress / rollup.tasks if rollup.tasks else 0,
+                estimated_hours=rollup.estimated_hours,
+                actual_hours=rollup.actual_hours,
+                status_counts={status: getattr(rollup, status) for status in task_rollups.ROLLUP_STATUSES}
+            ) if rollup else None
+        )
+        # Rows come parents first, so the parent node already exists
+        if depth:
+            nodes[task.parent_id].children.append(nodes[task.id])
+
+    return nodes[task_id]
+
+
 @router.delete("/{task_id}")
 def delete_task(
     task_id: int,
@@ -505,7 +1185,93 @@ def delete_task(
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    affected_users = notification_counters.task_users(db, task_id, db_task.assigned_to)
+    # Edges from dependent tasks; the task's own edges go with dependency_refs
+    db.query(TaskDependencyORM).filter(
+        TaskDependencyORM.depends_on_id == task_id
+    ).delete(synchronize_session=False)
+    db.query(DeadlineNoticeORM).filter(
+        DeadlineNoticeORM.task_id == task_id
+    ).delete(synchronize_session=False)
+    task_rollups.task_deleted(db, db_task)
     db.delete(db_task)
+    db.flush()
+    notification_counters.refresh(db, affected_users, ("profile",))
+    task_graph.invalidate(db)
+    deadline_scheduler.tasks_changed(db, [task_id])
     db.commit()
     
     return {"message": "Task deleted successfully"}
+
+
+@router.post("/{task_id}/dependencies")
+def add_task_dependency(
+    task_id: int,
+    dependency: DependencyCreate,
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Make a task depend on another one (creator or admin only). Rejects cycles."""
+    db_task = db.query(TaskORM).filter(TaskORM.id == task_id).first()
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if db_task.created_by != current_user.id and current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized to update this task")
+
+    if dependency.depends_on_id == task_id:
+        raise HTTPException(status_code=400, detail="A task cannot depend on itself")
+
+    if not db.query(exists().where(TaskORM.id == dependency.depends_on_id)).scalar():
+        raise HTTPException(status_code=404, detail="Dependency task not found")
+
+    if db.query(exists().where(
+        TaskDependencyORM.task_id == task_id,
+        TaskDependencyORM.depends_on_id == dependency.depends_on_id
+    )).scalar():
+        raise HTTPException(status_code=409, detail="Dependency already exists")
+
+    # Write first (SQLite's writer lock), then check under the dependency lock
+    db.add(TaskDependencyORM(task_id=task_id, depends_on_id=dependency.depends_on_id))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Dependency already exists")
+    task_graph.lock_dependencies(db)
+    if task_graph.closes_cycle(db, task_id, dependency.depends_on_id):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Dependency would create a cycle")
+
+    task_graph.invalidate(db)
+    db.commit()
+
+    return {"message": "Dependency added successfully"}
+
+
+@router.delete("/{task_id}/dependencies/{depends_on_id}")
+def remove_task_dependency(
+    task_id: int,
+    depends_on_id: int,
+    current_user: FamilyMember = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Remove a dependency (creator or admin only)"""
+    db_task = db.query(TaskORM).filter(TaskORM.id == task_id).first()
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if db_task.created_by != current_user.id and current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized to update this task")
+
+    removed = db.query(TaskDependencyORM).filter(
+        TaskDependencyORM.task_id == task_id,
+        TaskDependencyORM.depends_on_id == depends_on_id
+    ).delete(synchronize_session=False)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Dependency not found")
+
+    task_graph.invalidate(db)
+    db.commit()
+
+    return {"message": "Dependency removed successfully"}
@@ -10,6 +10,7 @@ from datetime import datetime
 from database import get_db
 from models import FamilyMemberORM, FamilyMember, UserResponse
 from auth import get_current_user, get_current_admin, get_password_hash
+from team_chat import add_team_member, remove_team_member
 
 router = APIRouter()
 
@@ -219,6 +220,8 @@ def create_user(
     )
     
     db.add(db_user)
+    db.flush()
+    add_team_member(db, db_user.id)
     db.commit()
     db.refresh(db_user)
     
@@ -270,6 +273,7 @@ def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    remove_team_member(db, user.id)
     db.delete(user)
     db.commit()
     
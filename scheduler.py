@@ -0,0 +1,183 @@
+"""
+Scheduler: periodic background jobs inside the API process
+Every gunicorn worker runs the scheduler, but before each run a worker has to
+take the job's lease in job_leases. The lease is a conditional UPDATE on one
+row, which both Postgres and SQLite apply atomically, so only one worker runs a
+job per interval and a crashed worker's lease simply expires. While a job runs
+its lease is renewed in the background, so a run that outlasts the lease is not
+started again by another worker. Each run is recorded in job_runs with its
+timing and result.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import JobLeaseORM, JobRunORM
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = config("SCHEDULER_ENABLED", default=True, cast=bool)
+SCHEDULER_JITTER = config("SCHEDULER_JITTER", default=0.1, cast=float)
+
+# Identifies this worker as a lease holder
+HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(db: Session, name: str, ttl: float, holder: str = HOLDER) -> bool:
+    """
+    Take or renew the named lease for ttl seconds. Succeeds when the lease is
+    free, expired or already ours; commits.
+    """
+    now = datetime.utcnow()
+    if db.get(JobLeaseORM, name) is None:
+        db.add(JobLeaseORM(name=name))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Another worker created it first
+
+    taken = db.query(JobLeaseORM).filter(
+        JobLeaseORM.name == name,
+        or_(
+            JobLeaseORM.expires_at.is_(None),
+            JobLeaseORM.expires_at <= now,
+            JobLeaseORM.holder == holder
+        )
+    ).update({
+        JobLeaseORM.holder: holder,
+        JobLeaseORM.acquired_at: now,
+        JobLeaseORM.expires_at: now + timedelta(seconds=ttl)
+    }, synchronize_session=False)
+    db.commit()
+    return taken == 1
+
+
+def release_lease(db: Session, name: str, holder: str = HOLDER):
+    """Give the lease up early, e.g. on shutdown; commits"""
+    db.query(JobLeaseORM).filter(
+        JobLeaseORM.name == name,
+        JobLeaseORM.holder == holder
+    ).update({JobLeaseORM.expires_at: None}, synchronize_session=False)
+    db.commit()
+
+
+class Job:
+    def __init__(self, name: str, interval: float, func: Callable[[], Any], jitter: float = SCHEDULER_JITTER):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.jitter = jitter
+
+    @property
+    def lease_ttl(self) -> float:
+        # Shorter than the shortest jittered interval, so the lease is free
+        # again by the time the next run is due
+        return self.interval * (1 - self.jitter)
+
+    @property
+    def renew_every(self) -> float:
+        return self.lease_ttl / 3
+
+    def next_delay(self) -> float:
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter) / 2)
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, interval: float, func: Callable[[], Any], jitter: float = SCHEDULER_JITTER):
+        """Register a synchronous job to run every `interval` seconds on one worker"""
+        self.jobs[name] = Job(name, interval, func, jitter)
+
+    async def start(self):
+        if not SCHEDULER_ENABLED:
+            logger.info("Scheduler disabled")
+            return
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job)))
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs as {HOLDER}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, job: Job):
+        # Spread the first runs so workers started together do not race for leases
+        await asyncio.sleep(random.uniform(0, job.interval * job.jitter))
+        while True:
+            try:
+                await run_in_threadpool(self.run_if_leader, job)
+            except Exception as e:
+                logger.error(f"Scheduled job '{job.name}' could not run: {e}", exc_info=True)
+            await asyncio.sleep(job.next_delay())
+
+    def run_if_leader(self, job: Job) -> Optional[JobRunORM]:
+        """Run the job if this worker wins its lease; returns the recorded run"""
+        db = SessionLocal()
+        try:
+            if not acquire_lease(db, job.name, job.lease_ttl):
+                return None
+            return self._run(db, job)
+        finally:
+            db.close()
+
+    def _run(self, db: Session, job: Job) -> JobRunORM:
+        run = JobRunORM(name=job.name, holder=HOLDER, status="running", started_at=datetime.utcnow())
+        db.add(run)
+        db.commit()
+
+        started = time.monotonic()
+        done = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(job, done), daemon=True)
+        renewer.start()
+        try:
+            result = job.func()
+            run.status = "success"
+            run.result = json.dumps(result, default=str) if result is not None else None
+        except Exception as e:
+            logger.error(f"Scheduled job '{job.name}' failed: {e}", exc_info=True)
+            run.status = "error"
+            run.result = str(e)
+        finally:
+            done.set()
+            renewer.join()
+        run.finished_at = datetime.utcnow()
+        run.duration_ms = int((time.monotonic() - started) * 1000)
+        db.commit()
+        logger.info(f"Job '{job.name}' finished: {run.status} in {run.duration_ms}ms")
+        return run
+
+    def _renew_lease(self, job: Job, done: threading.Event):
+        """Extend the job's lease until the run is done, on a session of its own"""
+        while not done.wait(job.renew_every):
+            db = SessionLocal()
+            try:
+                if not acquire_lease(db, job.name, job.lease_ttl):
+                    logger.warning(f"Job '{job.name}' lost its lease while running")
+                    return
+            except Exception as e:
+                logger.error(f"Could not renew the lease of job '{job.name}': {e}", exc_info=True)
+            finally:
+                db.close()
+
+
+scheduler = Scheduler()
@@ -0,0 +1,285 @@
+"""
+Task Graph: dependency graph over tasks
+Loads the tasks of a scope (everything, a team or a user) with their
+dependency edges and keeps them as integer-indexed adjacency lists, which is
+what the ordering, readiness and critical-path calculations walk.
+
+Built graphs are cached per scope. Any write that changes tasks or their
+dependencies calls invalidate(); once it commits, every worker drops its
+cached graphs through the event bus. The cycle check for a new edge does not
+use the cache: it walks the stored edges with a recursive CTE while holding
+the dependency lock.
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from event_bus import bus
+from models import TaskORM, TaskDependencyORM
+import task_members
+
+# Event bus channel announcing that cached graphs are stale
+GRAPH_CHANNEL = "task_graph"
+GRAPH_CACHE_SIZE = 64
+
+COMPLETED = "completed"
+
+# Postgres advisory lock serializing dependency writes
+DEPENDENCY_LOCK_KEY = 0x7461736B
+
+_DIRTY = "task_graph.dirty"
+
+
+class CycleError(ValueError):
+    def __init__(self, cycle: List[int]):
+        super().__init__(f"Dependency cycle: {' -> '.join(map(str, cycle))}")
+        self.cycle = cycle
+
+
+class TaskGraph:
+    """
+    Tasks as nodes 0..n-1. An edge p -> t means t depends on p, so p has to
+    finish first. Prerequisites outside the scope are included as nodes too
+    (in_scope False) so readiness and scheduling see them.
+    """
+
+    def __init__(self, rows: List[Tuple[int, str, str, Optional[int], bool]], edges: List[Tuple[int, int]]):
+        self.ids: List[int] = []
+        self.titles: List[str] = []
+        self.status: List[str] = []
+        self.days: List[int] = []
+        self.in_scope: List[bool] = []
+        self.index: Dict[int, int] = {}
+        for task_id, title, status, estimated_days, in_scope in rows:
+            self.index[task_id] = len(self.ids)
+            self.ids.append(task_id)
+            self.titles.append(title)
+            self.status.append(status)
+            self.days.append(estimated_days or 0)
+            self.in_scope.append(in_scope)
+
+        n = len(self.ids)
+        self.successors: List[List[int]] = [[] for _ in range(n)]
+        self.predecessors: List[List[int]] = [[] for _ in range(n)]
+        for task_id, depends_on_id in edges:
+            t, p = self.index.get(task_id), self.index.get(depends_on_id)
+            if t is None or p is None:
+                continue
+            self.successors[p].append(t)
+            self.predecessors[t].append(p)
+
+        self._order: Optional[List[int]] = None
+        self._schedule: Optional[dict] = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def topological_order(self) -> List[int]:
+        """Node indexes, prerequisites first. Raises CycleError if there is a cycle."""
+        if self._order is not None:
+            return self._order
+        indegree = [len(p) for p in self.predecessors]
+        queue = deque(i for i, d in enumerate(indegree) if d == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for succ in self.successors[node]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    queue.append(succ)
+        if len(order) < len(self):
+            raise CycleError(self._find_cycle({i for i, d in enumerate(indegree) if d > 0}))
+        self._order = order
+        return order
+
+    def _find_cycle(self, remaining: set) -> List[int]:
+        # Every node left after Kahn's algorithm has a predecessor that is also
+        # left, so walking predecessors must revisit a node
+        node = next(iter(remaining))
+        seen: Dict[int, int] = {}
+        path = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(p for p in self.predecessors[node] if p in remaining)
+        cycle = path[seen[node]:]
+        cycle.reverse()
+        return [self.ids[i] for i in cycle + cycle[:1]]
+
+    def ready(self) -> List[int]:
+        """Unfinished tasks in scope whose prerequisites are all completed"""
+        return [
+            self.ids[i] for i in range(len(self))
+            if self.in_scope[i]
+            and self.status[i] != COMPLETED
+            and all(self.status[p] == COMPLETED for p in self.predecessors[i])
+        ]
+
+    def schedule(self) -> dict:
+        """
+        Critical path method over estimated_days: earliest/latest start and
+        finish per node (in days from the start), slack, the overall length
+        and one critical path.
+        """
+        if self._schedule is not None:
+            return self._schedule
+        order = self.topological_order()
+        n = len(self)
+        es = [0] * n
+        ef = [0] * n
+        for node in order:
+            es[node] = max((ef[p] for p in self.predecessors[node]), default=0)
+            ef[node] = es[node] + self.days[node]
+        length = max(ef, default=0)
+
+        lf = [length] * n
+        ls = [0] * n
+        for node in reversed(order):
+            lf[node] = min((ls[s] for s in self.successors[node]), default=length)
+            ls[node] = lf[node] - self.days[node]
+        slack = [ls[i] - es[i] for i in range(n)]
+
+        path = []
+        node = next((i for i in order if slack[i] == 0 and not self.predecessors[i]), None)
+        while node is not None:
+            path.append(self.ids[node])
+            node = next(
+                (s for s in self.successors[node] if slack[s] == 0 and es[s] == ef[node]),
+                None
+            )
+
+        self._schedule = {
+            "earliest_start": es, "earliest_finish": ef,
+            "latest_start": ls, "latest_finish": lf,
+            "slack": slack, "length": length, "critical_path": path,
+        }
+        return self._schedule
+
+
+def _scope_filter(query, scope: str, scope_id, approved_only: bool):
+    if approved_only:
+        query = query.filter(TaskORM.is_approved == True)
+    if scope == "team":
+        query = query.filter(TaskORM.team_id == scope_id)
+    elif scope == "user":
+        query = query.filter(TaskORM.id.in_(task_members.user_task_ids(scope_id)))
+    return query
+
+
+def load_graph(db: Session, scope: str = "all", scope_id=None, approved_only: bool = False) -> TaskGraph:
+    """Build the graph for a scope: tasks and their edges in one query, plus outside prerequisites"""
+    rows = _scope_filter(
+        db.query(
+            TaskORM.id, TaskORM.title, TaskORM.status, TaskORM.estimated_days,
+            TaskDependencyORM.depends_on_id
+        ).outerjoin(TaskDependencyORM, TaskDependencyORM.task_id == TaskORM.id),
+        scope, scope_id, approved_only
+    ).all()
+
+    nodes: Dict[int, Tuple] = {}
+    edges = []
+    for task_id, title, status, estimated_days, depends_on_id in rows:
+        nodes[task_id] = (task_id, title, status, estimated_days, True)
+        if depends_on_id is not None:
+            edges.append((task_id, depends_on_id))
+
+    outside = {p for _, p in edges if p not in nodes}
+    if outside:
+        # Held to the same approval filter, as edges to tasks left out are dropped
+        query = db.query(
+            TaskORM.id, TaskORM.title, TaskORM.status, TaskORM.estimated_days
+        ).filter(TaskORM.id.in_(outside))
+        if approved_only:
+            query = query.filter(TaskORM.is_approved == True)
+        for task_id, title, status, estimated_days in query:
+            nodes[task_id] = (task_id, title, status, estimated_days, False)
+
+    return TaskGraph(sorted(nodes.values()), edges)
+
+
+def lock_dependencies(db: Session):
+    """
+    Serialize dependency writes until the transaction ends, so a cycle check
+    sees every edge committed before it. Two new edges can close a cycle
+    together without sharing a task, so locking the tasks involved would not
+    be enough. SQLite has a single writer already, held by whoever has flushed.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(DEPENDENCY_LOCK_KEY)))
+
+
+def dependents(task_id: int):
+    """Select of the task and every task depending on it, directly or transitively"""
+    closure = select(TaskORM.id.label("id")).where(TaskORM.id == task_id).cte("dependents", recursive=True)
+    # UNION rather than UNION ALL, so an existing cycle still terminates
+    closure = closure.union(
+        select(TaskDependencyORM.task_id).where(TaskDependencyORM.depends_on_id == closure.c.id)
+    )
+    return select(closure.c.id)
+
+
+def closes_cycle(db: Session, task_id: int, depends_on_id: int) -> bool:
+    """Whether task_id depending on depends_on_id forms a cycle with the stored edges"""
+    return depends_on_id in db.execute(dependents(task_id)).scalars()
+
+
+_cache: "OrderedDict[tuple, TaskGraph]" = OrderedDict()
+_cache_lock = threading.Lock()  # Read from the threadpool, cleared from the event loop
+# Bumped by every clear, so a graph loaded across a clear is not cached
+_generation = 0
+
+
+def get_graph(db: Session, scope: str = "all", scope_id=None, approved_only: bool = False) -> TaskGraph:
+    """Cached load_graph"""
+    key = (scope, scope_id, approved_only)
+    with _cache_lock:
+        graph = _cache.get(key)
+        if graph is not None:
+            _cache.move_to_end(key)
+            return graph
+        generation = _generation
+
+    graph = load_graph(db, scope, scope_id, approved_only)
+    with _cache_lock:
+        if generation == _generation:
+            _cache[key] = graph
+            if len(_cache) > GRAPH_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return graph
+
+
+def invalidate(db: Session):
+    """Mark cached graphs stale once the current transaction commits"""
+    db.info[_DIRTY] = True
+
+
+def clear_cache():
+    global _generation
+    with _cache_lock:
+        _cache.clear()
+        _generation += 1
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_invalidation(session: Session):
+    if session.info.pop(_DIRTY, False):
+        # Clear here right away so this worker's next request sees the change,
+        # and through the bus for the other workers
+        clear_cache()
+        bus.publish_threadsafe(GRAPH_CHANNEL, {})
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_invalidation(session: Session):
+    session.info.pop(_DIRTY, None)
+
+
+async def _on_graph_event(event: dict):
+    clear_cache()
+
+
+bus.subscribe(GRAPH_CHANNEL, _on_graph_event)
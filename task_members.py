@@ -0,0 +1,47 @@
+"""
+Task Members: which tasks a user is on
+A user is on a task as its assigned_to or through task_assignees. Both are
+answered from their own index, tasks(assigned_to, status) and
+task_assignees(user_id, task_id), and the two lookups are combined with a
+UNION instead of an outer join with an OR across the tables plus DISTINCT,
+which no index can serve.
+"""
+from typing import Optional
+
+from sqlalchemy import func, or_, select, union
+from sqlalchemy.sql import Select
+
+from models import TaskORM, TaskAssigneeORM
+
+
+def user_task_ids(user_id, status: Optional[str] = None) -> Select:
+    """Ids of the user's tasks (optionally in one status), for TaskORM.id.in_()"""
+    direct = select(TaskORM.id).where(TaskORM.assigned_to == user_id)
+    listed = select(TaskAssigneeORM.task_id).where(TaskAssigneeORM.user_id == user_id)
+    if status is not None:
+        direct = direct.where(TaskORM.status == status)
+        listed = listed.join(TaskORM, TaskORM.id == TaskAssigneeORM.task_id).where(TaskORM.status == status)
+    # Never correlate to a tasks table in the enclosing query
+    return union(direct.correlate(None), listed.correlate(None))
+
+
+def count_user_tasks(user_id, status: Optional[str] = None):
+    """
+    Scalar subquery counting the user's tasks; user_id may be a column of an
+    outer query. The two lookups are made disjoint and added, which keeps
+    each one an index range and works as a correlated subquery everywhere.
+    """
+    direct = select(func.count(TaskORM.id)).where(TaskORM.assigned_to == user_id)
+    listed = select(func.count(func.distinct(TaskAssigneeORM.task_id))).join(
+        TaskORM, TaskORM.id == TaskAssigneeORM.task_id
+    ).where(
+        TaskAssigneeORM.user_id == user_id,
+        or_(TaskORM.assigned_to.is_(None), TaskORM.assigned_to != user_id)
+    )
+    if status is not None:
+        direct = direct.where(TaskORM.status == status)
+        listed = listed.where(TaskORM.status == status)
+    return (
+        direct.correlate_except(TaskORM).scalar_subquery() +
+        listed.correlate_except(TaskORM, TaskAssigneeORM).scalar_subquery()
+    )
@@ -0,0 +1,257 @@
+"""
+Task Rollups: aggregates over each task's subtree, cached in task_rollups
+A task's rollup is its own values (progress, hours, status) plus the rollups
+of its subtasks. When a task changes, the difference is added to its row and
+to each ancestor along the parent path in one UPDATE, so reading a tree never
+re-sums it. recompute() rebuilds rows from the tree itself; the reconcile job
+runs it for everything to repair drift.
+
+Parent paths and subtrees are walked with recursive CTEs.
+"""
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from models import TaskORM, TaskRollupORM
+
+ROLLUP_STATUSES = ("pending", "in_progress", "on_hold", "completed")
+SUMS = ("tasks", "progress", "estimated_hours", "actual_hours") + ROLLUP_STATUSES
+
+Values = Dict[str, float]
+Snapshot = Tuple[Optional[int], Values]
+
+
+def own_values(task: TaskORM) -> Values:
+    """What a single task contributes to its own and its ancestors' rollups"""
+    values: Values = dict.fromkeys(SUMS, 0)
+    values.update(
+        tasks=1,
+        progress=task.progress or 0,
+        estimated_hours=task.estimated_hours or 0,
+        actual_hours=task.actual_hours or 0
+    )
+    if task.status in ROLLUP_STATUSES:
+        values[task.status] = 1
+    return values
+
+
+def snapshot(task: TaskORM) -> Snapshot:
+    """Take before changing a task, and pass to task_changed() afterwards"""
+    return task.parent_id, own_values(task)
+
+
+def path_to_root(task_ids: Iterable[int]):
+    """Select of the given tasks and all of their ancestors"""
+    path = select(TaskORM.id, TaskORM.parent_id).where(
+        TaskORM.id.in_(list(task_ids))
+    ).cte("path", recursive=True)
+    # UNION rather than UNION ALL, so a bad parent loop still terminates
+    path = path.union(
+        select(TaskORM.id, TaskORM.parent_id).where(TaskORM.id == path.c.parent_id)
+    )
+    return select(path.c.id)
+
+
+def is_ancestor(db: Session, ancestor_id: int, task_id: int) -> bool:
+    """Whether ancestor_id is task_id or one of its ancestors"""
+    return ancestor_id in db.execute(path_to_root([task_id])).scalars()
+
+
+def _add(db: Session, task_ids, delta: Values):
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+    db.execute(
+        update(TaskRollupORM).where(TaskRollupORM.task_id.in_(task_ids)).values({
+            getattr(TaskRollupORM, field): getattr(TaskRollupORM, field) + value
+            for field, value in delta.items()
+        }).execution_options(synchronize_session=False)
+    )
+
+
+def _negate(values: Values) -> Values:
+    return {field: -value for field, value in values.items()}
+
+
+def _stored(db: Session, task_id: int) -> Optional[Values]:
+    row = db.execute(
+        select(*(getattr(TaskRollupORM, field) for field in SUMS)).where(TaskRollupORM.task_id == task_id)
+    ).first()
+    return dict(zip(SUMS, row)) if row else None
+
+
+def task_created(db: Session, task: TaskORM):
+    """Add the rollup row of a new (flushed) task and count it in its ancestors. The caller commits."""
+    values = own_values(task)
+    db.add(TaskRollupORM(task_id=task.id, **values))
+    db.flush()
+    if task.parent_id:
+        _add(db, path_to_root([task.parent_id]), values)
+
+
+def task_changed(db: Session, task: TaskORM, before: Snapshot):
+    """Apply a change to a (flushed) task's rollups, including a move to another parent. The caller commits."""
+    old_parent_id, old_values = before
+    new_values = own_values(task)
+    delta = {field: new_values[field] - old_values[field] for field in SUMS}
+
+    if task.parent_id == old_parent_id:
+        _add(db, path_to_root([task.id]), delta)
+        return
+
+    subtree = _stored(db, task.id)
+    if subtree is None:
+        recompute(db, [task.id] + [p for p in (old_parent_id, task.parent_id) if p])
+        return
+    # The whole subtree moves: the old path loses it as it was stored, the
+    # new path gains it with this change applied
+    _add(db, [task.id], delta)
+    if old_parent_id:
+        _add(db, path_to_root([old_parent_id]), _negate(subtree))
+    if task.parent_id:
+        _add(db, path_to_root([task.parent_id]), {field: subtree[field] + delta[field] for field in SUMS})
+
+
+def apply_deltas(db: Session, deltas: Dict[int, Values]):
+    """
+    Apply value changes of several tasks (no moves) to their rollups and their
+    ancestors': one query for all the parent paths, one batched UPDATE. The
+    caller commits.
+    """
+    deltas = {task_id: delta for task_id, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+    path = select(
+        TaskORM.id.label("task_id"), TaskORM.id.label("ancestor_id"), TaskORM.parent_id
+    ).where(TaskORM.id.in_(list(deltas))).cte("paths", recursive=True)
+    path = path.union(
+        select(path.c.task_id, TaskORM.id, TaskORM.parent_id).where(TaskORM.id == path.c.parent_id)
+    )
+
+    totals: Dict[int, Values] = {}
+    for task_id, ancestor_id in db.execute(select(path.c.task_id, path.c.ancestor_id)):
+        total = totals.setdefault(ancestor_id, dict.fromkeys(SUMS, 0))
+        for field in SUMS:
+            total[field] += deltas[task_id][field]
+
+    table = TaskRollupORM.__table__
+    db.execute(
+        update(table).where(table.c.task_id == bindparam("row_id")).values({
+            field: table.c[field] + bindparam(f"delta_{field}") for field in SUMS
+        }),
+        [
+            dict(row_id=task_id, **{f"delta_{field}": value for field, value in total.items()})
+            for task_id, total in totals.items()
+        ]
+    )
+
+
+def task_deleted(db: Session, task: TaskORM):
+    """
+    Take a task's subtree out of its ancestors before the task is deleted.
+    Its subtasks become top-level tasks and keep their own rollups. The caller commits.
+    """
+    subtree = _stored(db, task.id)
+    if subtree and task.parent_id:
+        _add(db, path_to_root([task.parent_id]), _negate(subtree))
+    db.query(TaskRollupORM).filter(TaskRollupORM.task_id == task.id).delete(synchronize_session=False)
+
+
+def _subtree_sums(roots, approved_only: bool = False):
+    """
+    Rollups computed from the tree for the root ids selected by `roots` (every
+    task when None). approved_only leaves out unapproved subtasks and their subtrees.
+    """
+    anchor = select(TaskORM.id.label("root"), TaskORM.id.label("node"))
+    if roots is not None:
+        anchor = anchor.where(TaskORM.id.in_(roots))
+    closure = anchor.cte("closure", recursive=True)
+    step = select(closure.c.root, TaskORM.id).where(TaskORM.parent_id == closure.c.node)
+    if approved_only:
+        step = step.where(TaskORM.is_approved == True)
+    closure = closure.union(step)
+    return select(
+        closure.c.root,
+        func.count(),
+        func.coalesce(func.sum(TaskORM.progress), 0),
+        func.coalesce(func.sum(TaskORM.estimated_hours), 0),
+        func.coalesce(func.sum(TaskORM.actual_hours), 0),
+        *(func.sum(case((TaskORM.status == status, 1), else_=0)) for status in ROLLUP_STATUSES)
+    ).join(TaskORM, TaskORM.id == closure.c.node).group_by(closure.c.root)
+
+
+def _differs(stored: Values, computed: Values) -> bool:
+    return any(abs((stored[field] or 0) - computed[field]) > 1e-6 for field in SUMS)
+
+
+def recompute(db: Session, task_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild the rollups of task_ids and all of their ancestors from the tree
+    (every task when None), creating missing rows. Only rows that drifted are
+    written. Returns the number of rows corrected. The caller commits.
+    """
+    roots = path_to_root(task_ids) if task_ids is not None else None
+    computed = {row[0]: dict(zip(SUMS, row[1:])) for row in db.execute(_subtree_sums(roots))}
+    if not computed:
+        return 0
+
+    stored_query = select(TaskRollupORM.task_id, *(getattr(TaskRollupORM, field) for field in SUMS))
+    if task_ids is not None:
+        stored_query = stored_query.where(TaskRollupORM.task_id.in_(list(computed)))
+    stored = {row[0]: dict(zip(SUMS, row[1:])) for row in db.execute(stored_query)}
+
+    missing = [dict(task_id=task_id, **values) for task_id, values in computed.items() if task_id not in stored]
+    drifted = [
+        dict(row_id=task_id, **values) for task_id, values in computed.items()
+        if task_id in stored and _differs(stored[task_id], values)
+    ]
+    if missing:
+        db.execute(insert(TaskRollupORM), missing)
+    if drifted:
+        db.connection().execute(
+            update(TaskRollupORM.__table__).where(
+                TaskRollupORM.__table__.c.task_id == bindparam("row_id")
+            ).values({field: bindparam(field) for field in SUMS}),
+            drifted
+        )
+    return len(missing) + len(drifted)
+
+
+def subtree(db: Session, task_id: int, max_depth: int, approved_only: bool = False) -> List[tuple]:
+    """
+    The task and its descendants down to max_depth levels in one recursive
+    query, as (task, depth, rollup) rows ordered parents first.
+
+    With approved_only, unapproved tasks are left out along with their
+    subtrees. The cached rollups count those, so the rollups are summed
+    from the visible tree instead, in one more query.
+    """
+    tree = select(TaskORM.id, literal(0).label("depth")).where(TaskORM.id == task_id)
+    if approved_only:
+        tree = tree.where(TaskORM.is_approved == True)
+    tree = tree.cte("tree", recursive=True)
+    children = select(TaskORM.id, tree.c.depth + 1).where(
+        TaskORM.parent_id == tree.c.id,
+        tree.c.depth < max_depth
+    )
+    if approved_only:
+        children = children.where(TaskORM.is_approved == True)
+    tree = tree.union_all(children)
+
+    if approved_only:
+        rows = db.query(TaskORM, tree.c.depth).join(
+            tree, tree.c.id == TaskORM.id
+        ).order_by(tree.c.depth, TaskORM.id).all()
+        sums = {
+            row[0]: SimpleNamespace(**dict(zip(SUMS, row[1:])))
+            for row in db.execute(_subtree_sums([task.id for task, _ in rows], approved_only=True))
+        } if rows else {}
+        return [(task, depth, sums.get(task.id)) for task, depth in rows]
+
+    return db.query(TaskORM, tree.c.depth, TaskRollupORM).join(
+        tree, tree.c.id == TaskORM.id
+    ).outerjoin(
+        TaskRollupORM, TaskRollupORM.task_id == TaskORM.id
+    ).order_by(tree.c.depth, TaskORM.id).all()
@@ -0,0 +1,110 @@
+"""
+Team Chat: membership of the global team conversation
+Membership is maintained from the user lifecycle (create, activate, deactivate)
+so reading the team conversation never has to diff the whole user table.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, insert, exists, literal
+from sqlalchemy.orm import Session
+
+from models import FamilyMemberORM, ConversationORM, ConversationParticipantORM
+import chat_sync
+import notification_counters
+
+TEAM_CONVERSATION_TITLE = "THE GREATEST TEAM"
+
+# The team conversation never changes id once created, so remember it per process
+_team_conversation_id: Optional[int] = None
+
+
+def get_team_conversation(db: Session) -> ConversationORM:
+    """Return the team conversation, creating it if it does not exist yet. The caller commits."""
+    global _team_conversation_id
+
+    if _team_conversation_id is not None:
+        team_conv = db.get(ConversationORM, _team_conversation_id)
+        if team_conv:
+            return team_conv
+
+    team_conv = db.query(ConversationORM).filter(
+        ConversationORM.title == TEAM_CONVERSATION_TITLE
+    ).order_by(ConversationORM.id).first()
+
+    if not team_conv:
+        team_conv = ConversationORM(
+            title=TEAM_CONVERSATION_TITLE,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow()
+        )
+        db.add(team_conv)
+        db.flush()
+        # Not remembered until another call finds it committed
+        return team_conv
+
+    _team_conversation_id = team_conv.id
+    return team_conv
+
+
+def is_participant(db: Session, conversation_id: int, user_id: int) -> bool:
+    return db.query(exists().where(
+        ConversationParticipantORM.conversation_id == conversation_id,
+        ConversationParticipantORM.user_id == user_id
+    )).scalar()
+
+
+def add_team_member(db: Session, user_id: int):
+    """Add a user to the team conversation. The caller commits."""
+    team_conv = get_team_conversation(db)
+    if not is_participant(db, team_conv.id, user_id):
+        db.add(ConversationParticipantORM(conversation_id=team_conv.id, user_id=user_id))
+        chat_sync.record_change(db, team_conv.id, chat_sync.JOIN, user_id=user_id)
+        db.flush()
+        notification_counters.refresh(db, [user_id], ("messages",))
+
+
+def remove_team_member(db: Session, user_id: int):
+    """Remove a user from the team conversation. The caller commits."""
+    team_conv = get_team_conversation(db)
+    removed = db.query(ConversationParticipantORM).filter(
+        ConversationParticipantORM.conversation_id == team_conv.id,
+        ConversationParticipantORM.user_id == user_id
+    ).delete(synchronize_session=False)
+    if removed:
+        chat_sync.record_change(db, team_conv.id, chat_sync.LEAVE, user_id=user_id)
+        notification_counters.refresh(db, [user_id], ("messages",))
+
+
+def sync_team_members(db: Session) -> int:
+    """
+    Reconcile the whole team conversation against active users in one
+    INSERT ... SELECT. Only needed to backfill databases that predate the
+    lifecycle hooks. Returns the number of users added.
+    """
+    team_conv = get_team_conversation(db)
+    missing = select(
+        literal(team_conv.id), FamilyMemberORM.id
+    ).where(
+        FamilyMemberORM.is_active == True,
+        ~exists().where(
+            ConversationParticipantORM.conversation_id == team_conv.id,
+            ConversationParticipantORM.user_id == FamilyMemberORM.id
+        )
+    )
+    result = db.execute(insert(ConversationParticipantORM).from_select(
+        ["conversation_id", "user_id"], missing
+    ))
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        added = sync_team_members(db)
+        print(f"[OK] Added {added} users to the team conversation.")
+    finally:
+        db.close()
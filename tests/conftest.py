@@ -0,0 +1,126 @@
+"""
+Test setup: the app runs against a throwaway SQLite database, rebuilt for
+every test, with the background schedulers off and the in-process event bus.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Environment variables take precedence over .env
+os.environ.pop("DATABASE_URL", None)
+os.environ.update(
+    EVENT_BUS_BACKEND="local",
+    SCHEDULER_ENABLED="False",
+    DEADLINE_SCHEDULER_ENABLED="False",
+    DEFAULT_ADMIN_USERNAME="admin",
+    DEFAULT_ADMIN_PASSWORD="admin-password",
+    DEFAULT_ADMIN_EMAIL="admin@example.com",
+)
+
+import pytest
+from sqlalchemy import create_engine
+
+import database
+
+_tmp = tempfile.mkdtemp(prefix="the_greatest_tests_")
+database.engine = create_engine(
+    f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    connect_args={"check_same_thread": False}
+)
+database.SessionLocal.configure(bind=database.engine)
+
+from fastapi.testclient import TestClient
+
+from models import Base
+from main import app
+import task_graph
+import team_chat
+import ws
+
+ADMIN_PASSWORD = os.environ["DEFAULT_ADMIN_PASSWORD"]
+USER_PASSWORD = "password123"
+
+
+@pytest.fixture(autouse=True)
+def fresh_database():
+    Base.metadata.drop_all(bind=database.engine)
+    Base.metadata.create_all(bind=database.engine)
+    team_chat._team_conversation_id = None
+    task_graph.clear_cache()
+    ws.manager.replay.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def login(client, username: str, password: str) -> dict:
+    response = client.post("/api/v1/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin(client) -> dict:
+    """Auth headers of the default admin"""
+    return login(client, "admin", ADMIN_PASSWORD)
+
+
+@pytest.fixture
+def register(client):
+    """Register a user; returns (auth headers, user id)"""
+    def register_user(username: str):
+        response = client.post("/api/v1/auth/register", json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "full_name": username.title(),
+            "password": USER_PASSWORD
+        })
+        assert response.status_code == 200, response.text
+        return login(client, username, USER_PASSWORD), response.json()["user_id"]
+    return register_user
+
+
+@pytest.fixture
+def create_task(client):
+    """Create a task as the given user; returns its id"""
+    def create(headers: dict, title: str, **fields) -> int:
+        response = client.post("/api/v1/tasks/", json={"title": title, **fields}, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return create
+
+
+@pytest.fixture
+def start_conversation(client):
+    """Start a conversation between the given user and participant ids; returns its id"""
+    def start(headers: dict, *participant_ids: int) -> int:
+        response = client.post("/api/v1/chat/conversations", json={"participant_ids": list(participant_ids)}, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return start
+
+
+@pytest.fixture
+def send_message(client):
+    """Send a chat message as the given user; returns the message"""
+    def send(headers: dict, conversation_id: int, content: str) -> dict:
+        response = client.post("/api/v1/chat/messages", json={"conversation_id": conversation_id, "content": content}, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return send
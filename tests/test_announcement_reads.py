@@ -0,0 +1,73 @@
+from models import AnnouncementReadORM, FamilyMemberORM
+
+ANNOUNCEMENTS = "/api/v1/announcements"
+NOTIFICATIONS = "/api/v1/notifications"
+
+
+def announce(client, headers, title: str) -> int:
+    response = client.post(f"{ANNOUNCEMENTS}/", json={"title": title, "content": title}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def read(client, headers, announcement_id: int):
+    response = client.post(f"{NOTIFICATIONS}/announcements/{announcement_id}/read", headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def unread(client, headers) -> int:
+    return client.get(f"{NOTIFICATIONS}/counts", headers=headers).json()["home"]
+
+
+def watermark(db, user_id: int) -> int:
+    db.expire_all()
+    return db.get(FamilyMemberORM, user_id).last_seen_announcement_id or 0
+
+
+def reads_above(db, user_id: int) -> list:
+    rows = db.query(AnnouncementReadORM.announcement_id).filter(AnnouncementReadORM.user_id == user_id)
+    return sorted(announcement_id for announcement_id, in rows)
+
+
+def test_watermark_advances_over_contiguous_reads(client, admin, register, db):
+    bob, bob_id = register("bob")
+    a1, a2, a3, a4 = (announce(client, admin, f"a{i}") for i in range(1, 5))
+    assert unread(client, bob) == 4
+
+    # Out of order: remembered above the watermark
+    read(client, bob, a2)
+    read(client, bob, a4)
+    assert (watermark(db, bob_id), reads_above(db, bob_id)) == (0, [a2, a4])
+    assert unread(client, bob) == 2
+
+    # Filling the gap moves the watermark past the reads it joins up with
+    read(client, bob, a1)
+    assert (watermark(db, bob_id), reads_above(db, bob_id)) == (a2, [a4])
+    read(client, bob, a3)
+    assert (watermark(db, bob_id), reads_above(db, bob_id)) == (a4, [])
+    assert unread(client, bob) == 0
+
+    # Reading again below the watermark changes nothing
+    read(client, bob, a1)
+    assert (watermark(db, bob_id), reads_above(db, bob_id)) == (a4, [])
+
+
+def test_new_announcements_count_until_all_are_marked_read(client, admin, register, db):
+    bob, bob_id = register("bob")
+    first = announce(client, admin, "first")
+    read(client, bob, first)
+    announce(client, admin, "second")
+    later = announce(client, admin, "third")
+    read(client, bob, later)
+    assert unread(client, bob) == 1
+
+    response = client.post(f"{NOTIFICATIONS}/announcements/mark-read", headers=bob)
+    assert response.status_code == 200, response.text
+    assert unread(client, bob) == 0
+    assert (watermark(db, bob_id), reads_above(db, bob_id)) == (later, [])
+
+
+def test_reading_a_missing_announcement_is_404(client, register):
+    bob, _ = register("bob")
+    response = client.post(f"{NOTIFICATIONS}/announcements/999/read", headers=bob)
+    assert response.status_code == 404
@@ -0,0 +1,63 @@
+from pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+CHAT = "/api/v1/chat"
+
+
+def page(client, headers, conversation_id: int, **params):
+    response = client.get(f"{CHAT}/conversations/{conversation_id}/messages", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return [m["content"] for m in response.json()], response.headers.get(NEXT_CURSOR_HEADER)
+
+
+def test_history_pages_back_with_cursor(client, admin, register, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+    for i in range(7):
+        send_message(admin if i % 2 else bob, conversation_id, f"m{i}")
+
+    newest, cursor = page(client, bob, conversation_id, limit=3)
+    assert newest == ["m4", "m5", "m6"]
+    older, cursor = page(client, bob, conversation_id, limit=3, cursor=cursor)
+    assert older == ["m1", "m2", "m3"]
+    oldest, cursor = page(client, bob, conversation_id, limit=3, cursor=cursor)
+    assert oldest == ["m0"]
+    assert cursor is None
+
+
+def test_after_id_pages_forward(client, admin, register, start_conversation, send_message):
+    _, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+    ids = [send_message(admin, conversation_id, f"m{i}")["id"] for i in range(5)]
+
+    newer, cursor = page(client, admin, conversation_id, after_id=ids[0], limit=2)
+    assert newer == ["m1", "m2"]
+    newer, cursor = page(client, admin, conversation_id, limit=2, cursor=cursor)
+    assert newer == ["m3", "m4"]
+    assert cursor is None
+
+
+def test_cursor_of_another_conversation_is_rejected(client, admin, register, start_conversation):
+    _, bob_id = register("bob")
+    first = start_conversation(admin, bob_id)
+    second = start_conversation(admin, bob_id)
+    cursor = encode_cursor({"conversation_id": first, "before_id": 10})
+
+    response = client.get(f"{CHAT}/conversations/{second}/messages", params={"cursor": cursor}, headers=admin)
+    assert response.status_code == 400
+
+
+def test_malformed_cursor_is_rejected(client, admin, register, start_conversation):
+    _, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+
+    response = client.get(f"{CHAT}/conversations/{conversation_id}/messages", params={"cursor": "not a cursor"}, headers=admin)
+    assert response.status_code == 400
+
+
+def test_outsiders_cannot_read_history(client, admin, register, start_conversation):
+    _, bob_id = register("bob")
+    carol, _ = register("carol")
+    conversation_id = start_conversation(admin, bob_id)
+
+    response = client.get(f"{CHAT}/conversations/{conversation_id}/messages", headers=carol)
+    assert response.status_code == 403
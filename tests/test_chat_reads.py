@@ -0,0 +1,39 @@
+CHAT = "/api/v1/chat"
+
+
+def mark_read(client, headers, conversation_id: int, **params):
+    response = client.post(f"{CHAT}/conversations/{conversation_id}/read", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def unread(client, headers) -> dict:
+    response = client.get(f"{CHAT}/conversations/summaries", headers=headers)
+    assert response.status_code == 200, response.text
+    return {c["id"]: c["unread_count"] for c in response.json()}
+
+
+def test_mark_read_up_to_a_message(client, admin, register, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+    ids = [send_message(admin, conversation_id, f"m{i}")["id"] for i in range(3)]
+
+    mark_read(client, bob, conversation_id, message_id=ids[0])
+    assert unread(client, bob)[conversation_id] == 2
+    mark_read(client, bob, conversation_id)
+    assert unread(client, bob)[conversation_id] == 0
+
+
+def test_future_message_id_is_clamped_to_the_conversation(client, admin, register, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    _, carol_id = register("carol")
+    conversation_id = start_conversation(admin, bob_id)
+    other_id = start_conversation(admin, carol_id)
+    send_message(admin, conversation_id, "before")
+
+    # An id past the end, then one belonging to a later message elsewhere
+    mark_read(client, bob, conversation_id, message_id=10_000)
+    later_elsewhere = send_message(admin, other_id, "elsewhere")["id"]
+    mark_read(client, bob, conversation_id, message_id=later_elsewhere)
+
+    send_message(admin, conversation_id, "after")
+    assert unread(client, bob)[conversation_id] == 1
@@ -0,0 +1,121 @@
+import time
+
+from event_bus import LocalEventBus
+from ws import ConnectionManager
+
+CHAT = "/api/v1/chat"
+SOCKETS = "/api/v1/admin/health/sockets"
+
+
+def token(headers: dict) -> str:
+    return headers["Authorization"].split(" ", 1)[1]
+
+
+def connections(client, headers) -> int:
+    response = client.get(SOCKETS, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["connections"]
+
+
+def test_socket_metrics_are_admin_only(client, admin, register):
+    bob, _ = register("bob")
+    assert client.get(SOCKETS, headers=bob).status_code == 403
+    assert client.get(SOCKETS).status_code == 401
+    assert connections(client, admin) == 0
+
+
+def test_disconnect_closes_the_connection(client, admin, register):
+    _, bob_id = register("bob")
+    conversation_id = client.post(f"{CHAT}/conversations", json={"participant_ids": [bob_id]}, headers=admin).json()["id"]
+
+    with client.websocket_connect(f"{CHAT}/ws/{conversation_id}?token={token(admin)}"):
+        assert connections(client, admin) == 1
+        queue = client.get(SOCKETS, headers=admin).json()["queues"][0]
+        assert queue["conversation_id"] == conversation_id
+
+    for _ in range(50):
+        if connections(client, admin) == 0:
+            break
+        time.sleep(0.01)
+    assert connections(client, admin) == 0
+
+
+def test_delete_for_all_is_pushed_with_its_own_seq(client, admin, register):
+    bob, bob_id = register("bob")
+    conversation_id = client.post(f"{CHAT}/conversations", json={"participant_ids": [bob_id]}, headers=admin).json()["id"]
+    send = lambda content: client.post(
+        f"{CHAT}/messages", json={"conversation_id": conversation_id, "content": content}, headers=admin
+    ).json()
+
+    with client.websocket_connect(f"{CHAT}/ws/{conversation_id}?token={token(bob)}") as socket:
+        first = send("first")
+        assert socket.receive_json()["seq"] == first["seq"]
+        deleted = client.delete(f"{CHAT}/messages/{first['id']}", params={"delete_type": "for_all"}, headers=admin)
+        assert deleted.status_code == 200, deleted.text
+
+        event = socket.receive_json()
+        assert event == {
+            "type": "delete",
+            "conversation_id": conversation_id,
+            "seq": first["seq"] + 1,
+            "message_id": first["id"],
+            "message_seq": first["seq"],
+        }
+        second = send("second")
+        assert socket.receive_json()["seq"] == second["seq"] == first["seq"] + 2
+
+    # A client that reconnects after the first message gets the delete replayed
+    url = f"{CHAT}/ws/{conversation_id}?token={token(bob)}&last_seq={first['seq']}"
+    with client.websocket_connect(url) as socket:
+        assert socket.receive_json()["type"] == "delete"
+        assert socket.receive_json()["message"]["content"] == "second"
+
+
+def test_admin_delete_is_pushed(client, admin, register):
+    bob, bob_id = register("bob")
+    conversation_id = client.post(f"{CHAT}/conversations", json={"participant_ids": [bob_id]}, headers=admin).json()["id"]
+    message = client.post(f"{CHAT}/messages", json={"conversation_id": conversation_id, "content": "hi"}, headers=bob).json()
+
+    with client.websocket_connect(f"{CHAT}/ws/{conversation_id}?token={token(bob)}") as socket:
+        assert client.delete(f"/api/v1/admin/messages/{message['id']}", headers=admin).status_code == 200
+        event = socket.receive_json()
+        assert (event["type"], event["message_id"], event["message_seq"]) == ("delete", message["id"], message["seq"])
+
+
+def replay_manager(size: int) -> ConnectionManager:
+    return ConnectionManager(event_bus=LocalEventBus(), replay_size=size)
+
+
+def remember(manager: ConnectionManager, *seqs: int):
+    for seq in seqs:
+        manager._remember(1, seq, f"e{seq}")
+
+
+def test_replay_is_in_seq_order_whatever_the_arrival_order():
+    manager = replay_manager(10)
+    remember(manager, 1, 3, 2, 5, 4, 4)
+
+    assert manager.events_since(1, 0) == ["e1", "e2", "e3", "e4", "e5"]
+    assert manager.events_since(1, 2) == ["e3", "e4", "e5"]
+    assert manager.events_since(1, 5, current_seq=5) == []
+
+
+def test_hole_left_by_eviction_asks_for_a_resync():
+    # 5 arrives before 4 and is evicted by 6, which leaves 4 and 6 only when
+    # the buffer is kept in arrival order
+    manager = replay_manager(2)
+    remember(manager, 5, 4, 6)
+    assert [seq for seq, _ in manager.replay[1]] == [5, 6]
+    assert manager.events_since(1, 4) == ["e5", "e6"]
+    assert manager.events_since(1, 3) is None
+
+    # A late event older than everything kept is not let back in
+    remember(manager, 3)
+    assert manager.events_since(1, 3) is None
+
+    # 8 is buffered while 7 is still in flight
+    manager = replay_manager(10)
+    remember(manager, 5, 6, 8)
+    assert manager.events_since(1, 5) is None
+    remember(manager, 7)
+    assert manager.events_since(1, 5) == ["e6", "e7", "e8"]
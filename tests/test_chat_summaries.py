@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from models import ConversationORM
+from pagination import NEXT_CURSOR_HEADER
+
+CHAT = "/api/v1/chat"
+
+
+def summaries(client, headers, **params) -> list:
+    """Every page of summaries, following the cursor"""
+    result, cursor = [], None
+    while True:
+        response = client.get(
+            f"{CHAT}/conversations/summaries",
+            params={**params, **({"cursor": cursor} if cursor else {})},
+            headers=headers
+        )
+        assert response.status_code == 200, response.text
+        result += response.json()
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return result
+
+
+def stamp(db, conversation_id: int, created_at: datetime, updated_at):
+    db.query(ConversationORM).filter(ConversationORM.id == conversation_id).update(
+        {ConversationORM.created_at: created_at, ConversationORM.updated_at: updated_at}
+    )
+    db.commit()
+
+
+def test_never_updated_conversations_sort_by_creation(client, admin, register, db, start_conversation):
+    ids = {}
+    for name in ("bob", "carol", "dave", "erin"):
+        _, user_id = register(name)
+        ids[name] = start_conversation(admin, user_id)
+    stamp(db, ids["bob"], datetime(2026, 10, 1), datetime(2026, 10, 4))
+    stamp(db, ids["carol"], datetime(2026, 10, 3), None)
+    stamp(db, ids["dave"], datetime(2026, 10, 2), datetime(2026, 10, 2))
+    stamp(db, ids["erin"], datetime(2026, 10, 5), None)
+
+    expected = [ids["erin"], ids["bob"], ids["carol"], ids["dave"]]
+    for limit in (1, 2, 3, 50):
+        page = [c for c in summaries(client, admin, limit=limit) if c["id"] in expected]
+        assert [c["id"] for c in page] == expected
+
+    carol = next(c for c in summaries(client, admin) if c["id"] == ids["carol"])
+    assert carol["updated_at"] == carol["created_at"] == "2026-10-03T00:00:00"
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import chat_sync
+import database
+from models import ChatChangeORM
+
+CHAT = "/api/v1/chat"
+
+
+def sync(client, headers, **params) -> dict:
+    response = client.get(f"{CHAT}/sync", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_sync_returns_messages_tombstones_and_joins(client, admin, register, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    since = sync(client, bob)["next_since"]
+
+    conversation_id = start_conversation(admin, bob_id)
+    send_message(admin, conversation_id, "kept")
+    deleted = send_message(admin, conversation_id, "deleted")
+    response = client.delete(f"{CHAT}/messages/{deleted['id']}", params={"delete_type": "for_all"}, headers=admin)
+    assert response.status_code == 200
+
+    batch = sync(client, bob, since=since)
+    assert [m["content"] for m in batch["messages"]] == ["kept"]
+    assert [(t["message_id"], t["scope"]) for t in batch["tombstones"]] == [(deleted["id"], "all")]
+    assert {(m["user_id"], m["action"]) for m in batch["memberships"]} >= {(bob_id, "join")}
+    assert not batch["has_more"]
+
+    assert sync(client, bob, since=batch["next_since"])["messages"] == []
+
+
+def test_hides_are_private(client, admin, register, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+    message = send_message(admin, conversation_id, "hello")
+    admin_since = sync(client, admin)["next_since"]
+    bob_since = sync(client, bob)["next_since"]
+
+    response = client.delete(f"{CHAT}/messages/{message['id']}", params={"delete_type": "for_me"}, headers=bob)
+    assert response.status_code == 200
+
+    assert [t["scope"] for t in sync(client, bob, since=bob_since)["tombstones"]] == ["me"]
+    assert sync(client, admin, since=admin_since)["tombstones"] == []
+
+
+def test_sync_pages_with_has_more(client, admin, register, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+    since = sync(client, bob)["next_since"]
+    for i in range(5):
+        send_message(admin, conversation_id, f"m{i}")
+
+    seen = []
+    while True:
+        batch = sync(client, bob, since=since, limit=2)
+        seen += [m["content"] for m in batch["messages"]]
+        since = batch["next_since"]
+        if not batch["has_more"]:
+            break
+    assert seen == [f"m{i}" for i in range(5)]
+
+
+def test_purged_watermark_asks_for_resync(client, admin, register, db, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+    since = sync(client, bob)["next_since"]
+    for i in range(3):
+        send_message(admin, conversation_id, f"m{i}")
+
+    chat_sync.purge_changes(db, datetime.utcnow() + timedelta(days=1))
+    db.commit()
+
+    batch = sync(client, bob, since=since)
+    assert batch["resync"]
+    assert batch["next_since"] == chat_sync.current_watermark(db)
+
+
+def test_rolled_back_change_leaves_no_gap(client, admin, register, db, start_conversation, send_message):
+    bob, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+    since = sync(client, bob)["next_since"]
+
+    chat_sync.record_change(db, conversation_id, chat_sync.JOIN, user_id=bob_id)
+    db.flush()
+    db.rollback()
+    send_message(admin, conversation_id, "after rollback")
+
+    # The rolled back change gave its id back, so there is nothing to resync
+    batch = sync(client, bob, since=since)
+    assert not batch["resync"]
+    assert batch["next_since"] == since + 1
+    assert [m["content"] for m in batch["messages"]] == ["after rollback"]
+
+
+def test_change_committed_after_a_sync_stays_above_the_watermark(client, admin, register, db, start_conversation):
+    bob, bob_id = register("bob")
+    conversation_id = start_conversation(admin, bob_id)
+
+    # A writer claims a change id but has not committed yet
+    chat_sync.record_change(db, conversation_id, chat_sync.JOIN, user_id=bob_id)
+    db.flush()
+    in_flight = db.query(ChatChangeORM.id).order_by(ChatChangeORM.id.desc()).first()[0]
+
+    reader = database.SessionLocal()
+    try:
+        watermark = chat_sync.current_watermark(reader)
+    finally:
+        reader.close()
+    assert watermark < in_flight
+
+    db.commit()
+
+    # Ids follow commit order, so the client's next sync still picks it up
+    batch = sync(client, bob, since=watermark)
+    assert [(m["user_id"], m["action"]) for m in batch["memberships"]] == [(bob_id, "join")]
+    assert batch["next_since"] == in_flight
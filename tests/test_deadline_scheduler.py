@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from deadline_scheduler import DeadlineScheduler, OVERDUE, REMINDER
+from event_bus import LocalEventBus
+from models import DeadlineNoticeORM, TaskORM
+
+HOUR = 3600
+
+
+def scheduler(**settings) -> DeadlineScheduler:
+    return DeadlineScheduler(**{"lead": 24 * HOUR, "catchup": HOUR, **settings}, event_bus=LocalEventBus())
+
+
+def kinds(entries) -> list:
+    return [(task_id, kind) for _, task_id, kind, _ in entries]
+
+
+def test_reminder_and_overdue_fire_in_order():
+    s = scheduler()
+    now = datetime(2026, 11, 1)
+    s.schedule(1, now + timedelta(hours=30), now)
+
+    assert s.pop_due(now + timedelta(hours=5)) == []
+    assert kinds(s.pop_due(now + timedelta(hours=6))) == [(1, REMINDER)]
+    assert kinds(s.pop_due(now + timedelta(hours=30))) == [(1, OVERDUE)]
+    assert s.deadlines == {}
+
+
+def test_deadline_inside_the_lead_time_is_reminded_at_once():
+    s = scheduler()
+    now = datetime(2026, 11, 1)
+    s.schedule(1, now + timedelta(hours=2), now)
+
+    assert kinds(s.pop_due(now)) == [(1, REMINDER)]
+
+
+def test_missed_reminder_is_kept_until_its_deadline():
+    s = scheduler()
+    start = datetime(2026, 11, 1)
+    s.schedule(1, start + timedelta(hours=30), start)  # Reminder due after 6h
+    s.schedule(2, start + timedelta(hours=27), start)  # Reminder due after 3h
+
+    # Nobody held the lease when the reminders were due; task 2's deadline has since passed
+    later = start + timedelta(hours=28)
+    s.drop_late(later)
+    assert kinds(s.pop_due(later)) == [(1, REMINDER)]
+
+
+def test_moving_a_deadline_closer_reschedules_the_reminder():
+    s = scheduler()
+    now = datetime(2026, 11, 1)
+    s.schedule(1, now + timedelta(days=3), now)
+    s.schedule(1, now + timedelta(hours=1), now)
+
+    due = s.pop_due(now + timedelta(hours=1))
+    assert kinds(due) == [(1, REMINDER), (1, OVERDUE)]
+    assert {deadline for *_, deadline in due} == {now + timedelta(hours=1)}
+
+
+def test_tick_sends_each_notice_once(db):
+    task = TaskORM(title="soon", created_by=1, status="pending", deadline=datetime.utcnow() + timedelta(hours=1))
+    db.add(task)
+    db.commit()
+
+    async def run():
+        s = scheduler()
+        await s.tick()
+        await s.tick()
+        return s
+
+    s = asyncio.run(run())
+    assert s.leader
+    assert s.sent == 1
+    notices = db.query(DeadlineNoticeORM.task_id, DeadlineNoticeORM.kind).all()
+    assert notices == [(task.id, REMINDER)]
+
+    # A new leader loading the same window does not send it again
+    assert asyncio.run(run()).sent == 0
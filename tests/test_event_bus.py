@@ -0,0 +1,55 @@
+import asyncio
+
+from event_bus import CHANNEL_PREFIX, NOTIFY_PAYLOAD_LIMIT, PostgresEventBus
+
+
+def deliver(receiver: PostgresEventBus, channel: str, bodies):
+    async def run():
+        for body in bodies:
+            await receiver._on_notify(CHANNEL_PREFIX + channel, body)
+    asyncio.run(run())
+
+
+def collect(bus: PostgresEventBus, channel: str) -> list:
+    received = []
+
+    async def handler(payload):
+        received.append(payload)
+    bus.subscribe(channel, handler)
+    return received
+
+
+def test_large_event_is_chunked_and_reassembled():
+    sender = PostgresEventBus("postgresql://unused")
+    receiver = PostgresEventBus("postgresql://unused")
+    received = collect(receiver, "chat")
+    payload = {"conversation_id": 1, "message": "\"long\" message ü " * 2000}
+
+    bodies = sender._encode(payload)
+    assert len(bodies) > 1
+    assert all(len(body.encode()) <= NOTIFY_PAYLOAD_LIMIT for body in bodies)
+
+    deliver(receiver, "chat", bodies[:-1])
+    assert received == []
+    deliver(receiver, "chat", bodies[-1:])
+    assert received == [payload]
+    assert not receiver._pending
+
+
+def test_small_event_is_one_notification():
+    sender = PostgresEventBus("postgresql://unused")
+    receiver = PostgresEventBus("postgresql://unused")
+    received = collect(receiver, "chat")
+
+    bodies = sender._encode({"conversation_id": 1, "message": "hi"})
+    assert len(bodies) == 1
+    deliver(receiver, "chat", bodies)
+    assert received == [{"conversation_id": 1, "message": "hi"}]
+
+
+def test_own_notifications_are_skipped():
+    bus = PostgresEventBus("postgresql://unused")
+    received = collect(bus, "chat")
+
+    deliver(bus, "chat", bus._encode({"message": "x" * 20000}))
+    assert received == []
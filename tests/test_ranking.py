@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+import ranking
+from models import TaskORM
+
+TASKS = "/api/v1/tasks"
+
+
+def test_rank_between_stays_strictly_between():
+    rng = random.Random(7)
+    ranks = [ranking.rank_between(None, None)]
+    for _ in range(300):
+        i = rng.randrange(len(ranks) + 1)
+        before = ranks[i - 1] if i > 0 else None
+        after = ranks[i] if i < len(ranks) else None
+        rank = ranking.rank_between(before, after)
+        assert (before is None or before < rank) and (after is None or rank < after)
+        assert not rank.endswith("0")
+        ranks.insert(i, rank)
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == len(ranks)
+
+
+def test_rank_between_rejects_reversed_bounds():
+    with pytest.raises(ValueError):
+        ranking.rank_between("m", "a")
+    with pytest.raises(ValueError):
+        ranking.rank_between("m", "m")
+
+
+def test_spaced_ranks_are_short_sorted_and_distinct():
+    for count in (1, 2, 35, 36, 1000):
+        ranks = ranking.spaced_ranks(count)
+        assert ranks == sorted(set(ranks))
+        assert len(ranks) == count
+        assert all(rank and not rank.endswith("0") for rank in ranks)
+    assert max(len(r) for r in ranking.spaced_ranks(1000)) == 2
+
+
+def move(client, headers, task_id: int, **body):
+    return client.post(f"{TASKS}/{task_id}/move", json=body, headers=headers)
+
+
+def column(client, headers, status: str = "pending") -> list:
+    response = client.get(f"{TASKS}/", params={"sort": "rank", "status": status}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [t["title"] for t in response.json()]
+
+
+def test_moves_place_cards_between_neighbours(client, admin, create_task):
+    a, b, c = (create_task(admin, name) for name in "abc")
+    assert column(client, admin) == ["a", "b", "c"]
+
+    assert move(client, admin, c, after_id=a).status_code == 200
+    assert column(client, admin) == ["a", "c", "b"]
+    assert move(client, admin, a, before_id=b).status_code == 200
+    assert column(client, admin) == ["c", "a", "b"]
+    assert move(client, admin, c).status_code == 200  # To the end
+    assert column(client, admin) == ["a", "b", "c"]
+
+    assert move(client, admin, b, status="in_progress").status_code == 200
+    assert column(client, admin) == ["a", "c"]
+    assert column(client, admin, "in_progress") == ["b"]
+
+
+def test_invalid_moves_are_rejected(client, admin, register, create_task):
+    a, b = create_task(admin, "a"), create_task(admin, "b")
+    elsewhere = create_task(admin, "elsewhere", status="in_progress")
+    bob, _ = register("bob")
+
+    assert move(client, admin, a, after_id=a).status_code == 400
+    assert move(client, admin, a, after_id=elsewhere).status_code == 400
+    assert move(client, admin, a, after_id=9999).status_code == 404
+    assert move(client, admin, a, after_id=b, before_id=b).status_code == 409
+    assert move(client, bob, a, after_id=b).status_code == 403
+
+
+def test_rebalance_respaces_and_ranks_unranked_tasks_last(client, admin, db, create_task):
+    titles = ["a", "b", "c", "d"]
+    ids = [create_task(admin, title) for title in titles]
+    # Long keys from many moves into one gap, and a task from before ranks existed
+    db.query(TaskORM).filter(TaskORM.id == ids[1]).update({TaskORM.rank: "h" + "z" * 20})
+    db.query(TaskORM).filter(TaskORM.id == ids[0]).update({TaskORM.rank: None})
+    db.commit()
+
+    written = ranking.rebalance(db)
+    db.commit()
+
+    assert list(written) == ["pending"]
+    assert column(client, admin) == ["b", "c", "d", "a"]
+    ranks = [rank for rank, in db.query(TaskORM.rank).order_by(TaskORM.rank)]
+    assert all(len(rank) <= 1 for rank in ranks)
+    assert ranking.rebalance(db) == {}
+
+
+def test_changing_status_ranks_the_task_at_the_end_of_its_new_column(client, admin, create_task):
+    a, c = create_task(admin, "a"), create_task(admin, "c")
+    b = create_task(admin, "b", status="in_progress")
+    d = create_task(admin, "d", status="in_progress")
+
+    assert client.put(f"{TASKS}/{b}", json={"status": "pending"}, headers=admin).status_code == 200
+    assert column(client, admin) == ["a", "c", "b"]
+    response = client.post(f"{TASKS}/bulk", json={"items": [
+        {"id": d, "status": "pending"}, {"id": a, "status": "completed"}, {"id": c, "status": "completed"}
+    ]}, headers=admin)
+    assert response.status_code == 200, response.text
+    assert column(client, admin) == ["b", "d"]
+    assert column(client, admin, "completed") == ["a", "c"]
+
+    assert move(client, admin, b, status="completed", after_id=a, before_id=c).status_code == 200
+    assert column(client, admin, "completed") == ["a", "b", "c"]
+
+
+def test_rebalance_splits_shared_ranks(client, admin, db, create_task):
+    a, b, c = (create_task(admin, name) for name in "abc")
+    db.query(TaskORM).filter(TaskORM.id.in_([b, c])).update({TaskORM.rank: "m"}, synchronize_session=False)
+    db.commit()
+
+    assert list(ranking.rebalance(db)) == ["pending"]
+    db.commit()
+    ranks = [rank for rank, in db.query(TaskORM.rank)]
+    assert len(set(ranks)) == 3
+    assert move(client, admin, a, after_id=b, before_id=c).status_code == 200
+    assert column(client, admin) == ["b", "a", "c"]
@@ -0,0 +1,37 @@
+import time
+
+import database
+from scheduler import Job, Scheduler, acquire_lease, release_lease
+
+
+def taken_by_other(name: str) -> bool:
+    db = database.SessionLocal()
+    try:
+        return acquire_lease(db, name, 60, holder="other")
+    finally:
+        db.close()
+
+
+def test_lease_excludes_other_holders_until_released(db):
+    assert acquire_lease(db, "job", 60)
+    assert acquire_lease(db, "job", 60)  # Renewing our own lease
+    assert not taken_by_other("job")
+
+    release_lease(db, "job")
+    assert taken_by_other("job")
+
+
+def test_lease_is_renewed_while_a_long_job_runs():
+    attempts = []
+
+    def slow():
+        # Runs for twice the lease TTL, checking whether another worker could take over
+        for _ in range(2):
+            time.sleep(0.6)
+            attempts.append(taken_by_other("slow"))
+        return "done"
+
+    run = Scheduler().run_if_leader(Job("slow", 0.6, slow, jitter=0))
+
+    assert run.status == "success"
+    assert attempts == [False, False]
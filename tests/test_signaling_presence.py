@@ -0,0 +1,70 @@
+import asyncio
+
+from event_bus import LocalEventBus
+from routers.live_calling import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+def workers(count: int, **kwargs):
+    """Signaling managers of several workers sharing one bus"""
+    shared = LocalEventBus()
+    return [ConnectionManager(event_bus=shared, **kwargs) for _ in range(count)]
+
+
+def test_user_on_another_worker_is_reachable():
+    first, second = workers(2)
+
+    async def run():
+        await first.connect(FakeSocket(), 7)
+        assert second.is_reachable(7)
+        assert not second.is_reachable(8)
+
+        await first.disconnect(7)
+        assert not second.is_reachable(7)
+    asyncio.run(run())
+
+
+def test_new_worker_learns_existing_users():
+    shared = LocalEventBus()
+    first = ConnectionManager(event_bus=shared)
+
+    async def run():
+        await first.connect(FakeSocket(), 7)
+        late = ConnectionManager(event_bus=shared)
+        assert not late.is_reachable(7)
+
+        await late.start_presence()
+        assert late.is_reachable(7)
+        await late.stop_presence()
+    asyncio.run(run())
+
+
+def test_silent_worker_expires():
+    first, second = workers(2, presence_interval=0.01)
+
+    async def run():
+        await first.connect(FakeSocket(), 7)
+        assert second.is_reachable(7)
+        await asyncio.sleep(0.05)
+        assert not second.is_reachable(7)
+    asyncio.run(run())
+
+
+def test_stopping_a_worker_withdraws_its_users():
+    first, second = workers(2)
+
+    async def run():
+        await first.connect(FakeSocket(), 7)
+        await first.stop_presence()
+        assert not second.is_reachable(7)
+    asyncio.run(run())
@@ -0,0 +1,41 @@
+TASKS = "/api/v1/tasks"
+
+
+def board(client, headers, **params) -> dict:
+    response = client.get(f"{TASKS}/board", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return {column["status"]: column for column in response.json()["columns"]}
+
+
+def titles(column: dict) -> list:
+    return [t["title"] for t in column["tasks"]]
+
+
+def test_columns_hold_their_first_cards_and_totals(client, admin, create_task):
+    for i in range(3):
+        create_task(admin, f"p{i}")
+    create_task(admin, "done", status="completed")
+
+    columns = board(client, admin, per_column=2)
+    assert titles(columns["pending"]) == ["p2", "p1"]
+    assert columns["pending"]["total"] == 3
+    assert titles(columns["completed"]) == ["done"]
+    assert columns["completed"]["next_cursor"] is None
+
+
+def test_rank_sort_reads_top_to_bottom_by_default(client, admin, create_task):
+    first = create_task(admin, "first")
+    create_task(admin, "second")
+    create_task(admin, "third")
+    client.post(f"{TASKS}/{first}/move", json={}, headers=admin)  # To the bottom
+
+    pending = board(client, admin, sort="rank", per_column=2)["pending"]
+    assert titles(pending) == ["second", "third"]
+    assert titles(board(client, admin, sort="rank", order="desc")["pending"]) == ["first", "third", "second"]
+
+    # The column continues in the task list with the same default order
+    response = client.get(
+        f"{TASKS}/", params={"sort": "rank", "status": "pending", "cursor": pending["next_cursor"]}, headers=admin
+    )
+    assert response.status_code == 200, response.text
+    assert [t["title"] for t in response.json()] == ["first"]
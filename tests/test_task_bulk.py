@@ -0,0 +1,79 @@
+TASKS = "/api/v1/tasks"
+
+
+def bulk(client, headers, *items) -> dict:
+    response = client.post(f"{TASKS}/bulk", json={"items": list(items)}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def profile_count(client, headers) -> int:
+    return client.get("/api/v1/notifications/counts", headers=headers).json()["profile"]
+
+
+def test_items_are_validated_one_by_one(client, admin, register, create_task):
+    bob, _ = register("bob")
+    mine = create_task(bob, "mine")
+    other = create_task(bob, "other")
+    theirs = create_task(admin, "theirs")
+
+    result = bulk(
+        client, bob,
+        {"id": mine, "priority": "high"},
+        {"id": 9999, "priority": "high"},
+        {"id": mine, "priority": "low"},
+        {"id": theirs, "priority": "low"},
+        {"id": other, "assigned_to": 9999},
+    )
+    assert result["updated"] == 1
+    assert [(r["id"], r["ok"], r["error"]) for r in result["results"]] == [
+        (mine, True, None),
+        (9999, False, "Task not found"),
+        (mine, False, "Task appears more than once"),
+        (theirs, False, "Not authorized to update this task"),
+        (other, False, "Assigned user not found"),
+    ]
+    assert result["results"][0]["task"]["priority"] == "high"
+    assert all(r["task"] is None for r in result["results"][1:])
+
+
+def test_only_the_given_fields_change(client, admin, create_task):
+    a = create_task(admin, "a", priority="low", deadline="2026-11-01T00:00:00")
+    b = create_task(admin, "b", priority="low")
+
+    result = bulk(client, admin, {"id": a, "status": "in_progress"}, {"id": b, "status": "in_progress", "priority": "high"})
+    tasks = {r["id"]: r["task"] for r in result["results"]}
+    assert (tasks[a]["status"], tasks[a]["priority"], tasks[a]["deadline"]) == ("in_progress", "low", "2026-11-01T00:00:00")
+    assert (tasks[b]["status"], tasks[b]["priority"]) == ("in_progress", "high")
+
+
+def test_assignees_and_counters_follow_the_patch(client, admin, register, create_task):
+    bob, bob_id = register("bob")
+    carol, carol_id = register("carol")
+    task = create_task(admin, "shared")
+
+    result = bulk(client, admin, {"id": task, "assigned_user_ids": [bob_id, carol_id, bob_id]})
+    assert sorted(u["id"] for u in result["results"][0]["task"]["assignees"]) == [bob_id, carol_id]
+    assert profile_count(client, bob) == profile_count(client, carol) == 1
+
+    result = bulk(client, admin, {"id": task, "assigned_user_ids": [carol_id]})
+    assert [u["id"] for u in result["results"][0]["task"]["assignees"]] == [carol_id]
+    assert profile_count(client, bob) == 0
+
+    bulk(client, admin, {"id": task, "status": "completed"})
+    assert profile_count(client, carol) == 0
+
+    result = bulk(client, admin, {"id": task, "assigned_user_ids": [9999]})
+    assert result["results"][0]["error"] == "Assigned user not found"
+
+
+def test_approval_is_left_to_admins(client, admin, register, create_task):
+    bob, _ = register("bob")
+    task = create_task(bob, "proposal")
+
+    result = bulk(client, bob, {"id": task, "is_approved": True, "priority": "high"})
+    assert result["results"][0]["task"]["is_approved"] is False
+    assert result["results"][0]["task"]["priority"] == "high"
+
+    result = bulk(client, admin, {"id": task, "is_approved": True})
+    assert result["results"][0]["task"]["is_approved"] is True
@@ -0,0 +1,37 @@
+TASKS = "/api/v1/tasks"
+
+
+def calendar(client, headers, start: str, end: str, **params):
+    return client.get(f"{TASKS}/calendar", params={"from": start, "to": end, **params}, headers=headers)
+
+
+def test_entries_in_window_in_date_order(client, admin, create_task):
+    create_task(admin, "later", deadline="2026-11-20T09:00:00")
+    create_task(admin, "sooner", deadline="2026-11-05T09:00:00")
+    create_task(admin, "outside", deadline="2026-12-05T09:00:00")
+
+    response = calendar(client, admin, "2026-11-01T00:00:00", "2026-12-01T00:00:00")
+    assert response.status_code == 200, response.text
+    assert [e["task"]["title"] for e in response.json()["entries"]] == ["sooner", "later"]
+
+    days = calendar(client, admin, "2026-11-01T00:00:00", "2026-12-01T00:00:00", bucket="day").json()["days"]
+    assert [(d["day"], d["deadline"]) for d in days] == [("2026-11-05", 1), ("2026-11-20", 1)]
+
+
+def test_mixed_aware_and_naive_bounds(client, admin, create_task):
+    create_task(admin, "due", deadline="2026-11-01T01:00:00")
+
+    response = calendar(client, admin, "2026-11-01T00:00:00Z", "2026-11-30T00:00:00")
+    assert response.status_code == 200, response.text
+    assert [e["task"]["title"] for e in response.json()["entries"]] == ["due"]
+
+    # 03:00 at +02:00 is 01:00 UTC, so the deadline is not after the start
+    response = calendar(client, admin, "2026-11-01T03:00:00+02:00", "2026-11-30T00:00:00")
+    assert response.json()["entries"][0]["task"]["title"] == "due"
+    response = calendar(client, admin, "2026-11-01T03:30:00+02:00", "2026-11-30T00:00:00")
+    assert response.json()["entries"] == []
+
+
+def test_inverted_window_is_rejected(client, admin):
+    response = calendar(client, admin, "2026-11-30T00:00:00Z", "2026-11-01T00:00:00")
+    assert response.status_code == 400
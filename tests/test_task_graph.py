@@ -0,0 +1,145 @@
+import pytest
+
+import task_graph
+from models import TaskORM, TaskDependencyORM
+
+TASKS = "/api/v1/tasks"
+
+
+def depend(client, headers, task_id: int, depends_on_id: int):
+    return client.post(f"{TASKS}/{task_id}/dependencies", json={"depends_on_id": depends_on_id}, headers=headers)
+
+
+def graph(client, headers, **params) -> dict:
+    response = client.get(f"{TASKS}/graph", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_dependencies_reject_self_duplicates_and_cycles(client, admin, create_task):
+    a, b, c = (create_task(admin, name) for name in "abc")
+    assert depend(client, admin, b, a).status_code == 200
+    assert depend(client, admin, c, b).status_code == 200
+
+    assert depend(client, admin, a, a).status_code == 400
+    assert depend(client, admin, b, a).status_code == 409
+    assert depend(client, admin, a, b).status_code == 409
+    # a -> b -> c already, so a depending on c closes a longer cycle
+    response = depend(client, admin, a, c)
+    assert response.status_code == 409
+    assert "cycle" in response.json()["detail"]
+
+
+def test_task_missing_from_a_stale_cached_graph(client, admin, db, create_task):
+    a = create_task(admin, "a")
+    graph(client, admin)  # Caches the graph without the task below
+
+    # Created as if by another worker whose invalidation has not arrived yet
+    task = TaskORM(title="b", created_by=1)
+    db.add(task)
+    db.commit()
+
+    assert depend(client, admin, task.id, a).status_code == 200
+    assert depend(client, admin, a, task.id).status_code == 409
+
+
+def estimate(db, **days):
+    """Set estimated_days, which tasks otherwise get from a confirmed timeline"""
+    for title, value in days.items():
+        db.query(TaskORM).filter(TaskORM.title == title).update({TaskORM.estimated_days: value})
+    task_graph.invalidate(db)
+    db.commit()
+
+
+def test_graph_orders_tasks_and_finds_the_critical_path(client, admin, db, create_task):
+    design = create_task(admin, "design")
+    build = create_task(admin, "build")
+    docs = create_task(admin, "docs")
+    ship = create_task(admin, "ship")
+    estimate(db, design=2, build=5, docs=1, ship=1)
+    depend(client, admin, build, design)
+    depend(client, admin, docs, design)
+    depend(client, admin, ship, build)
+    depend(client, admin, ship, docs)
+
+    result = graph(client, admin)
+    order = result["order"]
+    assert order.index(design) < order.index(build) < order.index(ship)
+    assert order.index(docs) < order.index(ship)
+    assert result["ready"] == [design]
+    assert result["critical_path"] == [design, build, ship]
+    assert result["length"] == 8
+
+    nodes = {node["id"]: node for node in result["nodes"]}
+    assert nodes[docs]["slack"] == 4
+    assert nodes[docs]["earliest_start"] == 2
+    assert not nodes[docs]["critical"]
+    assert nodes[build]["critical"]
+
+
+def test_completed_prerequisites_make_tasks_ready(client, admin, create_task):
+    first = create_task(admin, "first")
+    second = create_task(admin, "second")
+    depend(client, admin, second, first)
+
+    client.put(f"{TASKS}/{first}", json={"status": "completed"}, headers=admin)
+    assert graph(client, admin)["ready"] == [second]
+
+
+def test_stored_cycle_is_reported(client, admin, db, create_task):
+    a = create_task(admin, "a")
+    b = create_task(admin, "b")
+    db.add_all([TaskDependencyORM(task_id=a, depends_on_id=b), TaskDependencyORM(task_id=b, depends_on_id=a)])
+    db.commit()
+    task_graph.clear_cache()
+
+    result = graph(client, admin)
+    assert sorted(result["cycle"][:-1]) == [a, b]
+    assert result["cycle"][0] == result["cycle"][-1]
+    assert result["critical_path"] == []
+
+
+def test_topological_order_raises_on_cycle():
+    rows = [(1, "a", "pending", 1, True), (2, "b", "pending", 1, True), (3, "c", "pending", 1, True)]
+    graph = task_graph.TaskGraph(rows, [(2, 1), (3, 2), (1, 3)])
+
+    with pytest.raises(task_graph.CycleError) as error:
+        graph.topological_order()
+    assert len(error.value.cycle) == 4
+
+
+def test_graph_loaded_across_an_invalidation_is_not_cached(db, monkeypatch):
+    loads = []
+    load_graph = task_graph.load_graph
+
+    def load_while_a_write_commits(*args):
+        loads.append(args[1:])
+        graph = load_graph(*args)
+        task_graph.clear_cache()
+        return graph
+
+    monkeypatch.setattr(task_graph, "load_graph", load_while_a_write_commits)
+    task_graph.get_graph(db)
+    task_graph.get_graph(db)
+    assert len(loads) == 2
+
+    monkeypatch.setattr(task_graph, "load_graph", lambda *args: loads.append(args[1:]) or load_graph(*args))
+    first = task_graph.get_graph(db)
+    assert task_graph.get_graph(db) is first
+    assert len(loads) == 3
+
+
+def test_unapproved_prerequisites_outside_the_scope_are_hidden(client, admin, register, db, create_task):
+    bob, _ = register("bob")
+    task = create_task(admin, "approved")
+    hidden = create_task(bob, "unapproved")
+    db.query(TaskORM).filter(TaskORM.id == task).update({TaskORM.team_id: "x"})
+    db.commit()
+    assert depend(client, admin, task, hidden).status_code == 200
+
+    nodes = {node["id"]: node for node in graph(client, admin, scope="team", team_id="x")["nodes"]}
+    assert nodes[hidden]["in_scope"] is False
+    assert nodes[task]["depends_on"] == [hidden]
+
+    nodes = graph(client, bob, scope="team", team_id="x")["nodes"]
+    assert [(node["id"], node["depends_on"]) for node in nodes] == [(task, [])]
@@ -0,0 +1,49 @@
+from pagination import NEXT_CURSOR_HEADER
+
+TASKS = "/api/v1/tasks"
+
+
+def list_all(client, headers, **params) -> list:
+    """Titles of every page, following the cursor"""
+    titles, cursor = [], None
+    while True:
+        response = client.get(f"{TASKS}/", params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200, response.text
+        titles += [t["title"] for t in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return titles
+
+
+def test_default_sort_pages_newest_first(client, admin, create_task):
+    for i in range(5):
+        create_task(admin, f"t{i}")
+
+    assert list_all(client, admin, limit=2) == ["t4", "t3", "t2", "t1", "t0"]
+    assert list_all(client, admin, limit=2, order="asc") == ["t0", "t1", "t2", "t3", "t4"]
+
+
+def test_tasks_without_deadline_come_last_in_both_orders(client, admin, create_task):
+    create_task(admin, "none a")
+    create_task(admin, "late", deadline="2026-12-03T00:00:00")
+    create_task(admin, "none b")
+    create_task(admin, "early", deadline="2026-12-01T00:00:00")
+    create_task(admin, "middle", deadline="2026-12-02T00:00:00")
+    create_task(admin, "none c")
+
+    for limit in (1, 2, 4, 50):
+        assert list_all(client, admin, sort="deadline", order="asc", limit=limit) == [
+            "early", "middle", "late", "none a", "none b", "none c"
+        ]
+        assert list_all(client, admin, sort="deadline", order="desc", limit=limit) == [
+            "late", "middle", "early", "none c", "none b", "none a"
+        ]
+
+
+def test_cursor_of_another_sort_is_rejected(client, admin, create_task):
+    for i in range(3):
+        create_task(admin, f"t{i}")
+    cursor = client.get(f"{TASKS}/", params={"limit": 1}, headers=admin).headers[NEXT_CURSOR_HEADER]
+
+    response = client.get(f"{TASKS}/", params={"limit": 1, "sort": "deadline", "cursor": cursor}, headers=admin)
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+import task_rollups
+
+TASKS = "/api/v1/tasks"
+
+
+def rollup(client, headers, task_id: int) -> dict:
+    response = client.get(f"{TASKS}/{task_id}/tree", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["rollup"]
+
+
+def test_rollups_follow_creates_updates_and_deletes(client, admin, db, create_task):
+    root = create_task(admin, "root", progress=10, estimated_hours=1)
+    child = create_task(admin, "child", parent_id=root, progress=30, estimated_hours=2)
+    grandchild = create_task(admin, "grandchild", parent_id=child, progress=50, estimated_hours=3)
+
+    totals = rollup(client, admin, root)
+    assert totals["tasks"] == 3
+    assert totals["progress"] == 30
+    assert totals["estimated_hours"] == 6
+
+    client.put(f"{TASKS}/{grandchild}", json={"status": "completed", "progress": 100}, headers=admin)
+    totals = rollup(client, admin, root)
+    assert totals["status_counts"]["completed"] == 1
+    assert totals["progress"] == (10 + 30 + 100) / 3
+
+    client.delete(f"{TASKS}/{child}", headers=admin)
+    assert rollup(client, admin, root)["tasks"] == 1
+    assert task_rollups.recompute(db) == 0
+
+
+def test_move_with_value_change_leaves_no_drift(client, admin, db, create_task):
+    old_parent = create_task(admin, "old parent")
+    new_parent = create_task(admin, "new parent")
+    task = create_task(admin, "task", parent_id=old_parent, progress=10, estimated_hours=4)
+    create_task(admin, "subtask", parent_id=task, progress=20, estimated_hours=1)
+
+    response = client.put(f"{TASKS}/{task}", json={
+        "parent_id": new_parent, "progress": 60, "estimated_hours": 8, "status": "in_progress"
+    }, headers=admin)
+    assert response.status_code == 200, response.text
+
+    assert rollup(client, admin, old_parent) == {
+        "tasks": 1, "progress": 0, "estimated_hours": 0, "actual_hours": 0,
+        "status_counts": {"pending": 1, "in_progress": 0, "on_hold": 0, "completed": 0}
+    }
+    moved = rollup(client, admin, new_parent)
+    assert moved["tasks"] == 3
+    assert moved["estimated_hours"] == 9
+    assert moved["status_counts"]["in_progress"] == 1
+    assert task_rollups.recompute(db) == 0
+
+
+def test_cannot_move_under_own_subtask(client, admin, create_task):
+    task = create_task(admin, "task")
+    subtask = create_task(admin, "subtask", parent_id=task)
+
+    response = client.put(f"{TASKS}/{task}", json={"parent_id": subtask}, headers=admin)
+    assert response.status_code == 400
+
+
+def test_non_admins_get_rollups_of_the_tasks_they_can_see(client, admin, register, create_task):
+    bob, _ = register("bob")
+    root = create_task(admin, "root", estimated_hours=1)
+    child = create_task(admin, "child", parent_id=root, estimated_hours=2)
+    create_task(admin, "grandchild", parent_id=child, estimated_hours=4)
+    proposal = create_task(bob, "proposal", parent_id=root, estimated_hours=8)
+    create_task(admin, "under proposal", parent_id=proposal, estimated_hours=16)
+
+    assert rollup(client, admin, root)["tasks"] == 5
+    assert rollup(client, admin, root)["estimated_hours"] == 31
+
+    response = client.get(f"{TASKS}/{root}/tree", params={"max_depth": 1}, headers=bob)
+    assert response.status_code == 200, response.text
+    tree = response.json()
+    assert (tree["rollup"]["tasks"], tree["rollup"]["estimated_hours"]) == (3, 7)
+    assert tree["rollup"]["status_counts"]["pending"] == 3
+    assert [(c["title"], c["rollup"]["tasks"]) for c in tree["children"]] == [("child", 2)]
@@ -0,0 +1,35 @@
+import team_chat
+from models import ConversationORM, ConversationParticipantORM, FamilyMemberORM
+
+
+def new_user(db, username: str) -> FamilyMemberORM:
+    user = FamilyMemberORM(username=username, email=f"{username}@example.com", full_name=username, password_hash="x")
+    db.add(user)
+    db.flush()
+    return user
+
+
+def test_team_conversation_is_created_in_the_callers_transaction(db):
+    team_chat.add_team_member(db, new_user(db, "bob").id)
+    db.rollback()
+    assert db.query(ConversationORM).count() == 0
+    assert db.query(FamilyMemberORM).count() == 0
+    assert team_chat._team_conversation_id is None
+
+    user = new_user(db, "bob")
+    team_chat.add_team_member(db, user.id)
+    db.commit()
+
+    team_conv = team_chat.get_team_conversation(db)
+    assert team_chat._team_conversation_id == team_conv.id
+    assert [p.user_id for p in db.query(ConversationParticipantORM)] == [user.id]
+    assert db.query(ConversationORM).count() == 1
+
+
+def test_registered_users_are_in_the_team_conversation(client, admin, register):
+    bob, bob_id = register("bob")
+
+    response = client.get("/api/v1/chat/team-conversation", headers=bob)
+    assert response.status_code == 200, response.text
+    assert response.json()["title"] == team_chat.TEAM_CONVERSATION_TITLE
+    assert bob_id in {p["id"] for p in response.json()["participants"]}
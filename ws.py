@@ -1,45 +1,268 @@
 import asyncio
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from collections import OrderedDict, deque
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, status
+from typing import List, Dict, Optional, Callable, Deque, Tuple
+from decouple import config
 import logging
 
+from event_bus import bus
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("WS-SERVER")
 
+# Outbound queue per socket and what to do when a client cannot keep up:
+#   drop       - discard the new message for that client
+#   coalesce   - discard the oldest queued message so the newest one still goes out
+#   disconnect - close the socket; the client reconnects and catches up over REST
+WS_QUEUE_SIZE = config("WS_QUEUE_SIZE", default=100, cast=int)
+WS_SLOW_CONSUMER_POLICY = config("WS_SLOW_CONSUMER_POLICY", default="drop")
+WS_SEND_TIMEOUT = config("WS_SEND_TIMEOUT", default=10.0, cast=float)
+
+SLOW_CONSUMER_POLICIES = ("drop", "coalesce", "disconnect")
+
+# Recent events kept per conversation so reconnecting clients can resume from last_seq
+WS_REPLAY_BUFFER_SIZE = config("WS_REPLAY_BUFFER_SIZE", default=200, cast=int)
+WS_REPLAY_MAX_CONVERSATIONS = config("WS_REPLAY_MAX_CONVERSATIONS", default=500, cast=int)
+
+# Event bus channel carrying chat broadcasts between workers
+CHAT_CHANNEL = "chat"
+
 app = FastAPI(title="The Greatest WebSocket Server")
 
+
+class ClientConnection:
+    """A single socket with its own bounded outbound queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, conversation_id: int, queue_size: int, policy: str):
+        self.websocket = websocket
+        self.conversation_id = conversation_id
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._writer_task: Optional[asyncio.Task] = None
+
+    def start(self, on_dead: Callable[["ClientConnection"], None]):
+        self._writer_task = asyncio.create_task(self._writer(on_dead))
+
+    def enqueue(self, message: str) -> bool:
+        """
+        Queue a message without waiting on the socket.
+        Returns False when the slow-consumer policy says to disconnect.
+        """
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "disconnect":
+            return False
+
+        self.dropped += 1
+        if self.policy == "coalesce":
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+        return True
+
+    async def _writer(self, on_dead: Callable[["ClientConnection"], None]):
+        try:
+            while True:
+                message = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(message), timeout=WS_SEND_TIMEOUT)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Evicting dead connection in channel {self.conversation_id}: {e!r}")
+            self.closed = True
+            on_dead(self)
+
+    async def close(self, code: int = status.WS_1000_NORMAL_CLOSURE):
+        """Stop the writer and close the socket; safe once the client has already gone"""
+        self.closed = True
+        if self._writer_task and self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass  # Already gone
+
+    def stats(self) -> dict:
+        return {
+            "conversation_id": self.conversation_id,
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
 class ConnectionManager:
-    def __init__(self):
-        # Store active connections: {conversation_id: [WebSocket, ...]}
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+    def __init__(
+        self,
+        queue_size: int = WS_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+        event_bus=None,
+        replay_size: int = WS_REPLAY_BUFFER_SIZE
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        # Store active connections: {conversation_id: [ClientConnection, ...]}
+        self.active_connections: Dict[int, List[ClientConnection]] = {}
+        self.evicted = 0
+        self.replay_size = replay_size
+        # Ring buffers of (seq, message), least recently used conversation first
+        self.replay: "OrderedDict[int, Deque[Tuple[int, str]]]" = OrderedDict()
+        # Broadcasts go through the bus so sockets on every worker receive them
+        self.bus = event_bus or bus
+        self.bus.subscribe(CHAT_CHANNEL, self._on_chat_event)
 
-    async def connect(self, websocket: WebSocket, conversation_id: int):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        conversation_id: int,
+        last_seq: Optional[int] = None,
+        current_seq: Optional[int] = None
+    ) -> ClientConnection:
+        """
+        Register a socket. A reconnecting client passes the last seq it saw and
+        gets the missed events replayed, or a "resync" event telling it to catch
+        up over REST when the buffer no longer reaches back that far.
+        """
         await websocket.accept()
-        if conversation_id not in self.active_connections:
-            self.active_connections[conversation_id] = []
-        self.active_connections[conversation_id].append(websocket)
+        connection = ClientConnection(websocket, conversation_id, self.queue_size, self.policy)
+        self.active_connections.setdefault(conversation_id, []).append(connection)
+        connection.start(self._evict)
+
+        # No await between registering and replaying, so nothing falls in between
+        if last_seq is not None:
+            missed = self.events_since(conversation_id, last_seq, current_seq)
+            if missed is None:
+                connection.enqueue(json.dumps({
+                    "type": "resync",
+                    "conversation_id": conversation_id,
+                    "last_seq": last_seq
+                }))
+            else:
+                for message in missed:
+                    connection.enqueue(message)
+
         logger.info(f"New connection to channel {conversation_id}. Total: {len(self.active_connections[conversation_id])}")
+        return connection
+
+    def events_since(
+        self,
+        conversation_id: int,
+        last_seq: int,
+        current_seq: Optional[int] = None
+    ) -> Optional[List[str]]:
+        """
+        Buffered events after last_seq in seq order, or None when the buffer has
+        rolled past it or misses one of them. current_seq (the conversation's latest seq, if known) lets a client
+        that is already up to date resume even with an empty buffer.
+        """
+        buffer = self.replay.get(conversation_id, ())
+        missed = [(seq, message) for seq, message in buffer if seq > last_seq]
+        if [seq for seq, _ in missed] != list(range(last_seq + 1, last_seq + 1 + len(missed))):
+            return None  # A hole, e.g. an event evicted before a late one arrived
+        messages = [message for _, message in missed]
+        if current_seq is not None and last_seq >= current_seq:
+            return messages
+        if buffer and buffer[0][0] <= last_seq + 1:
+            return messages
+        return None
+
+    def _remember(self, conversation_id: int, seq: int, message: str):
+        buffer = self.replay.get(conversation_id)
+        if buffer is None:
+            buffer = self.replay[conversation_id] = deque(maxlen=self.replay_size)
+            if len(self.replay) > WS_REPLAY_MAX_CONVERSATIONS:
+                self.replay.popitem(last=False)
+        else:
+            self.replay.move_to_end(conversation_id)
+
+        # Workers publish after their own commits, so events can arrive out of
+        # seq order; keep the buffer sorted, usually by appending
+        position = len(buffer)
+        while position and buffer[position - 1][0] > seq:
+            position -= 1
+        if position and buffer[position - 1][0] == seq:
+            return  # Already buffered
+        if len(buffer) == buffer.maxlen:
+            if position == 0:
+                return  # Older than everything kept
+            buffer.popleft()
+            position -= 1
+        buffer.insert(position, (seq, message))
+
+    def _discard(self, connection: ClientConnection):
+        connections = self.active_connections.get(connection.conversation_id)
+        if connections and connection in connections:
+            connections.remove(connection)
+            if not connections:
+                del self.active_connections[connection.conversation_id]
+
+    def _evict(self, connection: ClientConnection):
+        self.evicted += 1
+        self._discard(connection)
 
-    def disconnect(self, websocket: WebSocket, conversation_id: int):
-        if conversation_id in self.active_connections:
-            if websocket in self.active_connections[conversation_id]:
-                self.active_connections[conversation_id].remove(websocket)
-                if not self.active_connections[conversation_id]:
-                    del self.active_connections[conversation_id]
-            logger.info(f"Disconnected from channel {conversation_id}")
-
-    async def broadcast(self, message: str, conversation_id: int):
-        if conversation_id in self.active_connections:
-            for connection in self.active_connections[conversation_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to connection: {e}")
+    async def disconnect(self, websocket: WebSocket, conversation_id: int):
+        for connection in list(self.active_connections.get(conversation_id, [])):
+            if connection.websocket is websocket:
+                self._discard(connection)
+                await connection.close()
+                logger.info(f"Disconnected from channel {conversation_id}")
+
+    async def broadcast(self, message: str, conversation_id: int, seq: Optional[int] = None):
+        """Publish a message to the channel's sockets on every worker"""
+        await self.bus.publish(CHAT_CHANNEL, {"conversation_id": conversation_id, "seq": seq, "message": message})
+
+    def broadcast_threadsafe(self, message: str, conversation_id: int, seq: Optional[int] = None):
+        """Broadcast from synchronous endpoints running in the threadpool"""
+        self.bus.publish_threadsafe(CHAT_CHANNEL, {"conversation_id": conversation_id, "seq": seq, "message": message})
+
+    async def _on_chat_event(self, event: dict):
+        if event.get("seq") is not None:
+            self._remember(event["conversation_id"], event["seq"], event["message"])
+        await self._fanout(event["message"], event["conversation_id"])
+
+    async def _fanout(self, message: str, conversation_id: int):
+        """Queue a message on every local socket in the channel without waiting on any of them"""
+        for connection in list(self.active_connections.get(conversation_id, [])):
+            if not connection.enqueue(message):
+                logger.warning(f"Disconnecting slow consumer in channel {conversation_id}")
+                self._evict(connection)
+                await connection.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    def metrics(self) -> dict:
+        connections = [c for group in self.active_connections.values() for c in group]
+        return {
+            "policy": self.policy,
+            "channels": len(self.active_connections),
+            "connections": len(connections),
+            "evicted": self.evicted,
+            "replay_conversations": len(self.replay),
+            "queues": [c.stats() for c in connections],
+        }
 
 manager = ConnectionManager()
 
+@app.on_event("startup")
+async def start_event_bus():
+    await bus.start()
+
+@app.on_event("shutdown")
+async def stop_event_bus():
+    await bus.stop()
+
 @app.websocket("/ws/{conversation_id}")
 async def websocket_endpoint(websocket: WebSocket, conversation_id: int):
     await manager.connect(websocket, conversation_id)
@@ -53,20 +276,26 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int):
             # For now, just a heartbeat or echo.
             pass
     except WebSocketDisconnect:
-        manager.disconnect(websocket, conversation_id)
+        await manager.disconnect(websocket, conversation_id)
     except Exception as e:
         logger.error(f"WebSocket error in channel {conversation_id}: {e}")
-        manager.disconnect(websocket, conversation_id)
+        await manager.disconnect(websocket, conversation_id)
 
 @app.post("/broadcast/{conversation_id}")
 async def broadcast_message(conversation_id: int, message: dict):
     """
     Internal endpoint to broadcast a message to all connected clients in a conversation.
-    This would be called by the main API server when a new message is saved.
+    The main API now publishes new messages itself (see routers/chat.py); this
+    remains for running the socket server standalone.
     """
     await manager.broadcast(json.dumps(message), conversation_id)
     return {"status": "broadcasted"}
 
+@app.get("/metrics")
+async def connection_metrics():
+    """Per-connection queue depth and delivery counters"""
+    return manager.metrics()
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting WebSocket server on port 8001...")